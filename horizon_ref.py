@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 import sys,json
 # Usage: horizon_ref.py phi NODE_A NODE_B [--norm]
+#        horizon_ref.py --serve   (stdin: one {"a":..,"b":..,"norm":bool} per line; stdout: one reply per line)
+def phi(a,b,norm):
+    seed=(sum(map(ord,(a+"|"+b)))%101)/10.0
+    out={"phi":seed}
+    if norm: out["phi_norm"]=seed/max(1.0,len(a)+len(b))
+    return out
+if "--serve" in sys.argv[1:2]:
+    for line in sys.stdin:
+        if not line.strip(): continue
+        req=json.loads(line)
+        print(json.dumps(phi(req["a"],req["b"],bool(req.get("norm"))),ensure_ascii=True),flush=True)
+    sys.exit(0)
 if len(sys.argv)<4: print("usage: horizon_ref.py phi A B [--norm]",file=sys.stderr); sys.exit(2)
 a,b=sys.argv[2],sys.argv[3]
-seed=(sum(map(ord,(a+"|"+b)))%101)/10.0
-out={"phi":seed}
-if "--norm" in sys.argv: out["phi_norm"]=seed/max(1.0,len(a)+len(b))
-print(json.dumps(out,ensure_ascii=True))
+print(json.dumps(phi(a,b,"--norm" in sys.argv),ensure_ascii=True))
@@ -1,27 +1,148 @@
 #!/usr/bin/env python3
-import argparse, hashlib, json
+import argparse, hashlib, json, os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 LEDGER = Path("repro-pack/ledger.json")
+STAT_CACHE = Path(".seventh_horizon/cache/repro_stat.json")
+SKIP_DIRS = {".git","dist","node_modules",".next",".nox"}
+SKIP_PATHS = {str(STAT_CACHE.parent)}
 def sha(p:Path):
   h=hashlib.sha256()
   with p.open("rb") as f:
     for b in iter(lambda:f.read(1<<20), b""): h.update(b)
   return h.hexdigest()
-def walk():
-  skip=(".git/","dist/","node_modules/",".next/",".nox/")
-  for p in sorted(Path(".").rglob("*")):
-    s=str(p)
-    if p.is_file() and not any(s.startswith(k) for k in skip): yield p
+def walk(root="."):
+  # prune skipped directories at any depth instead of filtering afterwards
+  if os.path.isfile(root): yield Path(os.path.normpath(root)); return
+  for d, dirs, files in os.walk(root):
+    dirs[:] = sorted(x for x in dirs if x not in SKIP_DIRS and os.path.normpath(os.path.join(d, x)) not in SKIP_PATHS)
+    for name in sorted(files):
+      p = Path(os.path.normpath(os.path.join(d, name)))
+      if p.is_file(): yield p
+def load_cache():
+  try: return json.loads(STAT_CACHE.read_text("ascii"))
+  except (OSError, ValueError): return {}
+def save_cache(cache):
+  STAT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+  tmp = STAT_CACHE.with_name(STAT_CACHE.name + f".tmp{os.getpid()}")
+  tmp.write_text(json.dumps(cache,sort_keys=True,ensure_ascii=True)+"\n","ascii"); os.replace(tmp, STAT_CACHE)
+def cached_sha(p, cache):
+  st = p.stat(); key = [st.st_size, st.st_mtime_ns, st.st_ino]; hit = cache.get(str(p))
+  if hit and hit[:3] == key: return hit[3]
+  h = sha(p); cache[str(p)] = key + [h]; return h
+def hash_tree(paths, cache, workers=None, prune=True):
+  """path -> sha256; files whose (size, mtime_ns, inode) match the stat cache are not re-read."""
+  cur, todo, fresh = {}, [], {}
+  for p in paths:
+    st = p.stat(); key = [st.st_size, st.st_mtime_ns, st.st_ino]; s = str(p)
+    hit = cache.get(s)
+    if hit and hit[:3] == key: cur[s] = hit[3]
+    else: todo.append(p); fresh[s] = key
+  if todo:
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 2)) as ex:
+      for p, h in zip(todo, ex.map(sha, todo)):
+        cur[str(p)] = h; cache[str(p)] = fresh[str(p)] + [h]
+  if prune:
+    for s in set(cache) - set(cur): del cache[s]
+  return cur, len(todo)
+# Merkle tree: a directory's hash covers its sorted entries as
+# "<blob|tree> <name>\0<sha256>\n", so equal hashes mean equal subtrees.
+def parent(p): return os.path.dirname(p) or "."
+def depth(d): return 0 if d == "." else d.count("/") + 1
+def tree_hashes(files):
+  """dir path -> Merkle sha256 for every directory above `files` ("." is the root)."""
+  kids = {".": {}}
+  for p, h in files.items():
+    d = parent(p); kids.setdefault(d, {})[os.path.basename(p)] = ("blob", h)
+    while d != "." and parent(d) not in kids: d = parent(d); kids[d] = {}
+  dirs = {}
+  for d in sorted(kids, key=depth, reverse=True):
+    h = hashlib.sha256()
+    for name, (kind, x) in sorted(kids[d].items()):
+      h.update(f"{kind} {name}\0{x}\n".encode("utf-8", "surrogateescape"))
+    dirs[d] = h.hexdigest()
+    if d != ".": kids[parent(d)][os.path.basename(d)] = ("tree", dirs[d])
+  return dirs
+def load_ledger(path=LEDGER):
+  """(files, dirs) from a v2 ledger, or from a legacy flat path->sha map."""
+  ref = json.loads(Path(path).read_text("ascii"))
+  if ref.get("version") == 2: return ref["files"], ref["dirs"]
+  return ref, tree_hashes(ref)
+def ledger_doc(files):
+  dirs = tree_hashes(files)
+  return {"version": 2, "root_hash": dirs["."], "dirs": dict(sorted(dirs.items())), "files": dict(sorted(files.items()))}
+def manifest_doc(files):
+  dirs = tree_hashes(files)
+  return {"version": "2", "root_hash": dirs["."],
+          "files": [{"path": p, "sha256": h} for p, h in sorted(files.items())],
+          "dirs": [{"path": d, "sha256": h} for d, h in sorted(dirs.items())]}
+def in_scope(p, scopes): return any(s == "." or p == s or p.startswith(s + "/") for s in scopes)
+def norm_scopes(paths):
+  scopes = sorted({os.path.normpath(p) for p in paths} or {"."})
+  return [s for s in scopes if not in_scope(s, [t for t in scopes if t != s])]
+def diff_trees(ref, cur, scopes=(".",)):
+  """Compare subtree hashes top-down, descending only into directories whose hashes differ."""
+  (rf, rd), (cf, cd) = ref, cur
+  kids = {}
+  for p in (*rf, *cf, *rd, *cd):
+    if p != ".": kids.setdefault(parent(p), set()).add(p)
+  out = {"added": set(), "removed": set(), "changed": set()}
+  def leaf(p):
+    a, b = rf.get(p), cf.get(p)
+    if a != b: out["added" if a is None else "removed" if b is None else "changed"].add(p)
+  def visit(d):
+    if rd.get(d) == cd.get(d): return
+    for p in sorted(kids.get(d, ())):
+      leaf(p)
+      if p in rd or p in cd: visit(p)
+  for s in scopes:
+    leaf(s)
+    if s in rd or s in cd: visit(s)
+  return {k: sorted(v) for k, v in out.items()}
+def by_dir(diff):
+  g = {}
+  for kind, ps in diff.items():
+    for p in ps: g.setdefault(parent(p), {}).setdefault(kind, []).append(os.path.basename(p))
+  return dict(sorted(g.items()))
+def first_difference(ref_files, scopes, cache):
+  """Stream files in walk order and stop at the first one that differs from the ledger."""
+  seen = set()
+  for s in scopes:
+    for p in walk(s):
+      seen.add(str(p)); h = cached_sha(p, cache); r = ref_files.get(str(p))
+      if r != h: return {"added" if r is None else "changed": [str(p)]}
+  gone = sorted(p for p in ref_files if in_scope(p, scopes) and p not in seen)
+  return {"removed": gone[:1]} if gone else None
 def main():
   ap=argparse.ArgumentParser(); ap.add_argument("--check",action="store_true"); ap.add_argument("--update",action="store_true")
+  ap.add_argument("--no-cache",action="store_true",help="rehash every file, ignoring the stat cache")
+  ap.add_argument("--jobs",type=int,default=None,help="hashing threads")
+  ap.add_argument("--paths",nargs="+",default=[],help="only check/update these subtrees")
+  ap.add_argument("--fail-fast",action="store_true",help="stop --check at the first differing file")
+  ap.add_argument("--manifest",help="write a VEL manifest (Merkle root, files, dirs) to this path")
   a=ap.parse_args()
-  cur={str(p):sha(p) for p in walk()}
-  if a.update: LEDGER.write_text(json.dumps(cur,sort_keys=True,indent=2,ensure_ascii=True)+"\n","ascii"); print("ledger updated"); return
+  scopes = norm_scopes(a.paths)
+  cache = {} if a.no_cache else load_cache()
+  if a.check and a.fail_fast and not (a.update or a.manifest):
+    if not LEDGER.exists(): print("ledger missing; run --update"); raise SystemExit(2)
+    diff = first_difference(load_ledger()[0], scopes, cache)
+    if not a.no_cache: save_cache(cache)
+    if diff: print(json.dumps(diff,indent=2)); raise SystemExit(1)
+    print("ok"); return
+  cur = {}
+  for s in scopes: cur.update(hash_tree(walk(s), cache, a.jobs, prune=scopes == ["."])[0])
+  if not a.no_cache: save_cache(cache)
+  if scopes != ["."] and (a.update or a.manifest) and LEDGER.exists():
+    # splice the re-hashed subtrees into the ledger's view of everything else
+    cur = {**{p: h for p, h in load_ledger()[0].items() if not in_scope(p, scopes)}, **cur}
+  if a.manifest:
+    Path(a.manifest).write_text(json.dumps(manifest_doc(cur),indent=2,ensure_ascii=True)+"\n","ascii"); print(f"manifest written: {a.manifest}")
+  if a.update: LEDGER.write_text(json.dumps(ledger_doc(cur),indent=2,ensure_ascii=True)+"\n","ascii"); print("ledger updated"); return
+  if a.manifest and not a.check: return
   if not LEDGER.exists(): print("ledger missing; run --update"); raise SystemExit(2)
-  ref=json.loads(LEDGER.read_text("ascii"))
-  if a.check and ref!=cur:
-    diff={"added":sorted(set(cur)-set(ref)),"removed":sorted(set(ref)-set(cur)),
-          "changed":sorted(k for k in set(ref)&set(cur) if ref[k]!=cur[k])}
-    print(json.dumps(diff,indent=2)); raise SystemExit(1)
+  if scopes != ["."]: cur = {p: h for p, h in cur.items() if in_scope(p, scopes)}
+  diff = diff_trees(load_ledger(), (cur, tree_hashes(cur)), scopes)
+  if a.check and any(diff.values()):
+    print(json.dumps({**diff, "dirs": by_dir(diff)},indent=2)); raise SystemExit(1)
   print("ok")
 if __name__=="__main__": main()
@@ -0,0 +1,30 @@
+import json
+
+import numpy as np
+
+from tools.bench import bench, compare, generate
+from tools.make_snapshot import load_square_matrix
+
+def test_generated_inputs_and_stage_measurements(tmp_path):
+    d = generate(12, tmp_path)
+    names, D = load_square_matrix(str(d / "phi.csv"), None)
+    assert names == [f"n{i:05d}" for i in range(12)]
+    assert np.array_equal(D, np.load(d / "phi.npy")) and np.array_equal(D, D.T)
+    assert generate(12, tmp_path) == d   # reused, not regenerated
+    doc = bench([12], repeat=1, data=tmp_path, log=lambda *_: None)
+    assert set(doc["results"]) == {"compute_field", "load_square_matrix", "deterministic_mds_2d",
+                                   "build_timeline_index", "validate_timeline", "repro_auditor"}
+    for by_n in doc["results"].values():
+        m = by_n["12"]
+        assert m["wall_s"] >= 0 and m["peak_rss_mb"] > 1
+    json.dumps(doc)
+
+def test_compare_flags_only_real_regressions():
+    base = {"results": {"s": {"10": {"wall_s": 1.0, "peak_rss_mb": 100.0},
+                              "100": {"wall_s": 0.01, "peak_rss_mb": 100.0}}}}
+    cur = {"results": {"s": {"10": {"wall_s": 1.3, "peak_rss_mb": 104.0},
+                             "100": {"wall_s": 0.03, "peak_rss_mb": 200.0},
+                             "1000": {"wall_s": 9.0, "peak_rss_mb": 900.0}}}}
+    bad = {(n, metric) for _, n, metric, *_, regressed in compare(base, cur, 0.25) if regressed}
+    # 1.0 -> 1.3 s is past 25%; 0.01 -> 0.03 s is under the noise floor; N=1000 has no baseline
+    assert bad == {(10, "wall_s"), (100, "peak_rss_mb")}
@@ -0,0 +1,49 @@
+import io
+import json
+import random
+import re
+import subprocess
+import sys
+
+from tools.dump_classifier import KEYWORDS, classify
+
+def _reference(DATA):
+    # the original whole-text classifier, one re.search per keyword
+    def anyof(*ws): return any(re.search(r'\b' + re.escape(w) + r'\b', DATA, re.I) for w in ws)
+    if re.search(r'(?m)^#\s*path:\s+\S+', DATA): return {"mode": "explicit"}
+    target = "misc"
+    if anyof("kubebuilder", "observatoryrun", "controller-runtime", "CRD", "webhook"): target = "observatory-operator"
+    elif anyof("ansible", "awx", "playbook"): target = "observatory-operator-lite"
+    elif anyof("VEL_MANIFEST.schema.json", "vel_validator", "VEL"): target = "vel"
+    elif anyof("repro_auditor.py", "repro ledger", "deterministic") and "python" in DATA.lower(): target = "repro-pack"
+    elif anyof("governance_hash.sh", "pin_actions.sh", "audit_action_pins.sh", "heartbeat", "ascii-lint"): target = "scripts"
+    elif anyof("workflow_dispatch:", "uses: actions/checkout", "on: push", "jobs:"): target = ".github/workflows"
+    elif anyof("Next.js", "page.tsx", "app/observer", "timeline", "public/field"): target = "app/observer"
+    elif anyof("phi_matrix", "kappa", "plot_field.py", "compute_field.py", "make_snapshot.py"): target = "tools"
+    return {"mode": "heuristic", "target": target}
+
+def test_streaming_matches_whole_text_reference():
+    rng = random.Random(7)
+    toks = KEYWORDS + ["python", "PYTHON", "é", "K", "#", "# path:", "#path: x", "# Path: y", "path:",
+                       " ", "\n", "\n\n", "\t", "x", "_", "-", ".", ":", "vel_", "VELx"]
+    seen = set()
+    for _ in range(1500):
+        doc = "".join(rng.choice(toks) if rng.random() < .5 else rng.choice(toks).upper() if rng.random() < .2
+                      else rng.choice(" \nab_#") for _ in range(rng.randint(0, 40)))
+        ref = _reference(doc)
+        seen.add(ref.get("target", "explicit"))
+        for chunk in (1, 3, 7, 64):
+            assert classify(io.StringIO(doc), chunk) == ref, (doc, chunk)
+    assert len(seen) == 10
+
+def test_marker_split_across_chunks_and_early_exit():
+    doc = "kubebuilder\n#   \n\n  path:\n\n src/x.py\n" + "y" * 100
+    assert classify(io.StringIO(doc), 2) == {"mode": "explicit"}
+    stream = io.StringIO("# path: a.txt\n" + "x" * (1 << 22))
+    assert classify(stream) == {"mode": "explicit"}
+    assert stream.tell() < 1 << 22
+
+def test_entry_point_reads_stdin():
+    out = subprocess.run([sys.executable, "tools/dump_classifier.py"], input="deterministic build, python 3\n",
+                         capture_output=True, text=True, check=True).stdout
+    assert json.loads(out) == {"mode": "heuristic", "target": "repro-pack"}
@@ -0,0 +1,51 @@
+import random, tarfile
+
+from tools import dump_run
+
+def test_chunked_redaction_matches_whole_text():
+    rng = random.Random(7)
+    atoms = ["api_key", "API-KEY", "token", "Secret", "password", "Bearer", "bear", "pass",
+             "=", " ", "\n", "\t", "  =  ", "abc", "x.y-z", "é"]
+    for _ in range(5000):
+        s = "".join(rng.choice(atoms) for _ in range(rng.randint(0, 40)))
+        cuts = sorted(rng.sample(range(len(s) + 1), min(len(s) + 1, rng.randint(0, 10))))
+        chunks = [s[a:b] for a, b in zip([0] + cuts, cuts + [len(s)])]
+        assert "".join(dump_run.safe_stream(chunks)) == dump_run._safe(s)
+
+def test_archive_streams_redacted_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(dump_run, "CHUNK", 4093)
+    run = tmp_path / "epoch_T"; (run / "sub").mkdir(parents=True)
+    log = "".join(f"step {i} token=s{i} Bearer abc.{i}\r\n" for i in range(20000))
+    (run / "stdall.log").write_bytes(log.encode())
+    (run / "sub" / "a.txt").write_text("token=kept")
+    for kind in ("gz", "xz", "none"):
+        out = tmp_path / f"dump{dump_run.SUFFIX[kind]}"
+        dump_run.make_archive(run, out, {"env.txt": "A=1"}, kind, 1 if kind != "none" else None)
+        with tarfile.open(out) as tar:
+            root = ".dump_tmp_epoch_T"
+            assert sorted(tar.getnames()) == [root, f"{root}/env.txt", f"{root}/epoch_T", f"{root}/epoch_T/stdall.log",
+                                              f"{root}/epoch_T/sub", f"{root}/epoch_T/sub/a.txt"]
+            got = tar.extractfile(f"{root}/epoch_T/stdall.log").read().decode()
+            assert got == dump_run._safe(log.replace("\r\n", "\n"))
+            assert tar.extractfile(f"{root}/epoch_T/sub/a.txt").read() == b"token=kept"
+
+def test_dump_all_bundles_selected_runs_in_order(tmp_path):
+    from tools import dump_all
+    runs_dir = tmp_path / "runs"
+    for stamp in ("20251014T103715Z", "20251014T103727Z", "20251015T000000Z"):
+        run = runs_dir / f"epoch_{stamp}"; run.mkdir(parents=True)
+        (run / "stdall.log").write_text(f"{stamp} password=hunter2\n" * 500)
+    runs = dump_all.select_runs(runs_dir, since="epoch_20251014T103715Z")
+    assert [r.name for r in runs] == ["epoch_20251014T103727Z", "epoch_20251015T000000Z"]
+    assert [r.name for r in dump_all.select_runs(runs_dir, since="2025-10-14", last=1)] == ["epoch_20251015T000000Z"]
+
+    out = tmp_path / "all.tar.gz"
+    dump_all.write_bundle(runs, out, {"env.txt": "A=1"}, "gz", 1, jobs=2)
+    root = dump_all.ARC_ROOT
+    with tarfile.open(out) as tar:
+        assert tar.getnames() == [root, f"{root}/env.txt",
+                                  f"{root}/epoch_20251014T103727Z", f"{root}/epoch_20251014T103727Z/stdall.log",
+                                  f"{root}/epoch_20251015T000000Z", f"{root}/epoch_20251015T000000Z/stdall.log"]
+        log = tar.extractfile(f"{root}/epoch_20251015T000000Z/stdall.log").read().decode()
+        assert log == "20251015T000000Z password=REDACTED\n" * 500
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["all.tar.gz", "runs"]
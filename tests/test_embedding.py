@@ -0,0 +1,105 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tools.embedding import deterministic_mds_2d
+
+def _points(n, seed=7):
+    P = np.random.default_rng(seed).random((n, 2)) * 10
+    return np.sqrt(((P[:, None] - P[None]) ** 2).sum(-1)), [f"n{i}" for i in range(n)]
+
+def _noisy(n, seed=3, noise=50.0):
+    # a non-Euclidean field: warped distances plus symmetric noise, with a small top-2 eigengap
+    rng = np.random.default_rng(seed)
+    D = _points(n, seed)[0] ** 0.7
+    N = rng.random((n, n)); N = (N + N.T) / 2; np.fill_diagonal(N, 0)
+    return D + noise * N, [f"n{i}" for i in range(n)]
+
+def test_snapshot_embed_unchanged():
+    snap = json.loads(Path("public/field/timeline/v0.0.1.json").read_text(encoding="ascii"))
+    assert deterministic_mds_2d(snap["phi_matrix"], snap["nodes"]) == snap["embed"]
+
+@pytest.mark.parametrize("method", ["iterative", "landmark"])
+def test_scalable_methods_match_dense(method):
+    D, nodes = _points(700)
+    want = deterministic_mds_2d(D, nodes, method="dense")
+    got = deterministic_mds_2d(D, nodes, method=method)
+    assert np.abs(np.array(list(got.values())) - np.array(list(want.values()))).max() <= 1e-4
+
+def test_iterative_matches_dense_on_a_non_euclidean_field():
+    from tools.embedding import DENSE_MAX, _double_center_inplace, _sign_fix, _top2_subspace, raw_mds_2d
+    D, _ = _noisy(DENSE_MAX + 20)
+    *_, converged = _top2_subspace(_double_center_inplace(D.copy()))
+    assert converged
+    want, got = _sign_fix(raw_mds_2d(D, "dense")), _sign_fix(raw_mds_2d(D, "iterative"))
+    assert np.abs(got - want).max() <= 1e-6
+
+def _negative_heavy(n, seed=0):
+    # double-centred like an MDS input, with a dozen negative eigenvalues far larger than the top two
+    rng = np.random.default_rng(seed)
+    J = np.eye(n) - 1.0 / n
+    Q, _ = np.linalg.qr(J @ rng.standard_normal((n, n - 1)))
+    w = np.concatenate([[25.0, 24.0], [-200.0] * 12, rng.normal(0, 1, n - 15)])
+    return (Q * w) @ Q.T
+
+def test_subspace_iteration_finds_the_algebraically_largest_pairs(capsys):
+    from tools.embedding import DENSE_MAX, _dense_top2, _top2, _top2_subspace
+    B = _negative_heavy(DENSE_MAX + 200)
+    want_w, want_V = _dense_top2(B)
+    assert want_w.tolist() == pytest.approx([25.0, 24.0])
+    w, V, _, converged = _top2_subspace(B.copy())
+    assert converged and w.tolist() == pytest.approx(want_w.tolist(), rel=1e-9)
+    assert np.abs(np.abs(V.T @ want_V) - np.eye(2)).max() <= 1e-6
+    # an iteration that runs out of sweeps hands over to dense eigh, with a warning
+    w, V, it, converged = _top2(B.copy(), max_iter=3)
+    assert not converged and it == 3 and "did not converge" in capsys.readouterr().err
+    assert w.tolist() == want_w.tolist() and V.tolist() == want_V.tolist()
+
+def test_iterative_keeps_axis_lock():
+    D, nodes = _points(40)
+    prev = deterministic_mds_2d(D, nodes, method="dense")
+    prev = {k: [-v[1], v[0]] for k, v in prev.items()}  # previous layout rotated by 90 degrees
+    assert deterministic_mds_2d(D, nodes, prev=prev, method="iterative") == \
+        deterministic_mds_2d(D, nodes, prev=prev, method="dense")
+
+def _negative_field(n, seed=5, spread=5.0):
+    # squared distances that subtract a 12-d spread from a 2-d one: B's negative eigenvalues dominate
+    rng = np.random.default_rng(seed)
+    X, Y = 2 * rng.standard_normal((n, 2)), rng.uniform(-spread, spread, (n, 12))
+    sq = lambda P: ((P[:, None] - P[None]) ** 2).sum(-1)
+    D2 = sq(X) - sq(Y)
+    D2 -= D2.min(); np.fill_diagonal(D2, 0)
+    return np.sqrt(D2), [f"n{i}" for i in range(n)]
+
+@pytest.mark.parametrize("field", [lambda: _noisy(300, noise=20.0), lambda: _negative_field(300)])
+def test_incremental_matches_dense_and_reports_iterations(field):
+    from tools.embedding import _double_center_inplace, _top2_subspace, incremental_mds_2d
+    D, nodes = field()
+    prev = deterministic_mds_2d(D, nodes, method="dense")
+    # the next snapshot drifts by symmetric noise, not a uniform rescale
+    E = np.random.default_rng(11).random((300, 300)); E = (E + E.T) / 2; np.fill_diagonal(E, 0)
+    D2 = D + 0.5 * E
+    got, info = incremental_mds_2d(D2, nodes, prev)
+    _, _, cold, cold_converged = _top2_subspace(_double_center_inplace(D2.copy()))
+    assert info["converged"] and cold_converged and info["warm_nodes"] == 300
+    assert 1 <= info["iterations"] < cold
+    assert got == deterministic_mds_2d(D2, nodes, prev=prev, method="dense")
+
+def test_batch_timeline_embedding_matches_sequential(tmp_path, monkeypatch):
+    from tools import embed_timeline as et
+    monkeypatch.chdir(tmp_path)
+    et.FIELD.mkdir(parents=True)
+    tags = [f"v0.{k}.0" for k in (1, 2, 10, 3)]
+    for k, tag in enumerate(tags):
+        D, nodes = _points(12 + k, seed=k)
+        et.write_snapshot(tag, {"tag": tag, "nodes": nodes, "phi_matrix": D.tolist()})
+    all_tags = et.all_tags()
+    assert all_tags == ["v0.1.0", "v0.2.0", "v0.3.0", "v0.10.0"]
+    prevs = et.previous_tags(all_tags)
+    batch, _ = et.embed_batch(all_tags, prevs, jobs=2)
+    seq = {}
+    for tag in all_tags:
+        seq[tag], _ = et.embed_one(et.load_snapshot(tag), seq.get(prevs[tag]))
+    assert batch == seq
@@ -0,0 +1,38 @@
+from tools import event_counts
+from tools.event_counts import count_events_many
+
+def _ref(p):
+    return sum(1 for _ in p.open("r", encoding="utf-8"))
+
+def test_incremental_counts_match_line_iteration(tmp_path):
+    node = tmp_path / "n"; node.mkdir()
+    ev = node / "events.jsonl"
+    cache = tmp_path / "counts.json"
+    ev.write_text('{"ts": "t0"}\n{"ts": "t1"}\n{"ts": "t2', encoding="utf-8")
+    first = count_events_many([node], cache)[0]
+    assert (first["count"], first["first_ts"], first["last_ts"]) == (_ref(ev), "t0", "t1")
+
+    with ev.open("a", encoding="utf-8") as f:
+        f.write('"}\n' + '{"ts": "t3"}\n' * 5)
+    again = count_events_many([node], cache)[0]
+    assert again["count"] == _ref(ev) == 8
+    assert (again["bytes"], again["last_ts"]) == (ev.stat().st_size, "t3")
+
+    ev.write_text("{}\n", encoding="utf-8")  # rewritten, not appended
+    assert count_events_many([node], cache)[0]["count"] == 1
+    assert count_events_many([tmp_path / "missing"], cache)[0]["count"] == 0
+
+def test_bare_carriage_returns_break_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_counts, "CHUNK", 1)  # every \r\n pair straddles a chunk boundary
+    node = tmp_path / "n"; node.mkdir()
+    ev = node / "events.jsonl"
+    cache = tmp_path / "counts.json"
+    ev.write_bytes(b'{"ts": "t0"}\r{"ts": "t1"}\r\n{"ts": "t2"}\r')
+    first = count_events_many([node], cache)[0]
+    assert (first["count"], first["first_ts"], first["last_ts"]) == (_ref(ev), "t0", "t2") == (3, "t0", "t2")
+    for more in (b"\n", b'{"ts": "t3"}\r\r', b"\n\r", b"x"):
+        with ev.open("ab") as f:
+            f.write(more)
+        got = count_events_many([node], cache)[0]
+        assert got["count"] == _ref(ev) == event_counts.lines(event_counts.scan(ev)), more
+    assert got["count"] == 7
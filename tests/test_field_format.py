@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from tools.field_format import FieldFormatError, read_field, write_field
+from tools.make_snapshot import load_square_matrix
+from tools.packed import n_pairs
+
+def test_roundtrip_is_bit_identical_and_zero_copy(tmp_path):
+    n = 37
+    rng = np.random.default_rng(3)
+    phi, phin = rng.random(n_pairs(n)), rng.random(n_pairs(n))
+    nodes = [f"n{i}" for i in range(n)]
+    write_field(tmp_path / "f.bin", nodes, {"phi": phi, "phi_norm": phin}, meta={"label": "t"})
+    f = read_field(tmp_path / "f.bin", verify=True)
+    assert f.nodes == nodes and f.header["label"] == "t" and f.complete
+    assert isinstance(f.array("phi"), np.memmap)
+    assert f.array("phi").tobytes() == phi.tobytes()
+    assert f.array("phi_norm").tobytes() == phin.tobytes()
+    assert f.header["offset"] % 64 == 0
+
+    raw = bytearray((tmp_path / "f.bin").read_bytes()); raw[-1] ^= 1
+    (tmp_path / "g.bin").write_bytes(bytes(raw))
+    with pytest.raises(FieldFormatError):
+        read_field(tmp_path / "g.bin", verify=True)
+
+def test_compute_field_binary_matches_csv(tmp_path):
+    nodes = []
+    for k in range(9):
+        d = tmp_path / f"node{k}"; d.mkdir(); (d / "charter.json").write_text("{}\n")
+        nodes.append(str(d))
+    out = tmp_path / "out"
+    subprocess.run([sys.executable, "tools/compute_field.py", *nodes, "--outdir", str(out)], check=True, capture_output=True)
+    names, D = load_square_matrix(str(out / "phi_matrix.csv"), None)
+    f = read_field(out / "phi_field.bin", verify=True)
+    assert f.nodes == names
+    assert f.dense().tobytes() == D.tobytes()
@@ -0,0 +1,94 @@
+import asyncio, gzip, json, shutil
+from pathlib import Path
+
+from tools.field_server import FieldServer, serve
+from tools.timeline_store import update_store
+
+def _root(tmp_path):
+    shutil.copytree("public", tmp_path / "public")
+    return FieldServer(tmp_path)
+
+def test_snapshot_etags_compression_and_304(tmp_path):
+    app = _root(tmp_path)
+    idx = json.loads(Path("public/field/timeline.index.json").read_text())
+    tag, sha = idx["tags"][0]["tag"], idx["tags"][0]["snapshot_sha256"]
+
+    status, headers, body = app.respond("GET", f"/api/tags/{tag}", {})
+    assert status == 200 and headers["ETag"] == f'"{sha}"'
+    assert body == (tmp_path / f"public/field/timeline/{tag}.json").read_bytes()
+    status, headers, gz = app.respond("GET", f"/api/tags/{tag}", {"accept-encoding": "gzip, deflate"})
+    assert headers["Content-Encoding"] == "gzip" and gzip.decompress(gz) == body
+    assert app.respond("GET", f"/api/tags/{tag}", {"if-none-match": headers["ETag"]})[0] == 304
+    assert app.store.misses == 1 and app.store.hits == 2
+    ent = app.store.snapshot(tag)[0]
+    assert set(ent.enc) == {"gzip"} and ent.payload("gzip") is ent.enc["gzip"]   # built once, on first request
+
+    status, headers, body = app.respond("GET", "/api/index", {"if-none-match": f'"{idx["chain_root"]}"'})
+    assert status == 304
+    assert app.respond("GET", "/api/tags/v9.9.9", {})[0] == 404
+    assert app.respond("POST", "/api/index", {})[0] == 405
+    assert app.respond("GET", "/../../etc/passwd", {})[0] == 404
+
+def test_range_and_node_series(tmp_path):
+    app = _root(tmp_path)
+    tags = [e["tag"] for e in json.loads(Path("public/field/timeline.index.json").read_text())["tags"]]
+    status, _, body = app.respond("GET", f"/api/range?from={tags[0]}&to={tags[-1]}", {})
+    got = json.loads(body)["tags"]
+    assert status == 200 and [s["tag"] for s in got] == tags
+    assert got[0] == json.loads(Path(f"public/field/timeline/{tags[0]}.json").read_text())
+    status, headers, body = app.respond("GET", "/api/nodes/A/series", {})
+    series = json.loads(body)
+    assert series["tags"] == tags and series["kappa"] == [s["kappa"]["A"] for s in got]
+    assert app.respond("GET", "/api/nodes/A/series", {"if-none-match": headers["ETag"]})[0] == 304
+    assert app.respond("GET", "/api/range?from=v9.9.9", {})[0] == 404
+    # snapshots read for range/series are never compressed
+    assert all(not ent.enc for _, ent, _ in app.store.snaps.values())
+    # the store-built series need not be byte-identical to the snapshot-built one, so it gets its own ETag
+    update_store(tmp_path / "public/field", tmp_path / "public/field/timeline.store")
+    status, stored, body = app.respond("GET", "/api/nodes/A/series", {})
+    assert json.loads(body)["kappa"] == series["kappa"] and stored["ETag"] != headers["ETag"]
+
+def test_directory_listing_for_the_runs_browser(tmp_path):
+    app = _root(tmp_path)
+    runs = tmp_path / ".seventh_horizon/runs"
+    for run in ("epoch_B", "epoch_A"):
+        (runs / run).mkdir(parents=True); (runs / run / "telemetry.csv").write_text("RunID\n")
+    (runs / "notes.txt").write_text("x")
+    status, headers, body = app.respond("GET", "/.seventh_horizon/runs/", {})
+    assert status == 200 and headers["Content-Type"] == "text/html; charset=utf-8"
+    assert body.decode().count('<li><a href="') == 3
+    assert '<li><a href="epoch_A/">epoch_A/</a></li>\n<li><a href="epoch_B/">epoch_B/</a></li>' in body.decode()
+    assert '<a href="notes.txt">notes.txt</a>' in body.decode()
+    # scanRunsNow fetches each run's telemetry.csv relative to the listing
+    assert app.respond("HEAD", "/.seventh_horizon/runs/epoch_A/telemetry.csv", {})[0] == 200
+    status, headers, _ = app.respond("GET", "/.seventh_horizon/runs?x=1", {})
+    assert status == 301 and headers["Location"] == "/.seventh_horizon/runs/?x=1"
+    # a directory with an index.html still serves it
+    status, _, body = app.respond("GET", "/public/", {})
+    assert status == 200 and body == (tmp_path / "public/index.html").read_bytes()
+
+def test_socket_roundtrip(tmp_path):
+    shutil.copytree("public", tmp_path / "public")
+
+    async def run():
+        started = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(serve("127.0.0.1", 0, tmp_path, ready=started.set_result))
+        server = await started
+        port = server.sockets[0].getsockname()[1]
+        r, w = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(2):  # keep-alive: two requests on one connection
+            w.write(b"GET /public/index.html HTTP/1.1\r\nHost: x\r\n\r\n")
+            head = (await r.readuntil(b"\r\n\r\n")).decode()
+            length = int(head.split("Content-Length: ")[1].split("\r\n")[0])
+            body = await r.readexactly(length)
+        etag = head.split("ETag: ")[1].split("\r\n")[0]
+        w.write(f"GET /public/index.html HTTP/1.1\r\nAccept-Encoding: gzip\r\nIf-None-Match: {etag}\r\n\r\n".encode())
+        not_modified = (await r.readuntil(b"\r\n\r\n")).decode()
+        w.close()
+        task.cancel()
+        return head, body, not_modified
+
+    head, body, not_modified = asyncio.run(run())
+    assert head.startswith("HTTP/1.1 200") and "text/html" in head
+    assert not_modified.startswith("HTTP/1.1 304") and "Content-Length" not in not_modified
+    assert body == (tmp_path / "public/index.html").read_bytes()
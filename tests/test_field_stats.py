@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from tools.compute_field import field_stats
+from tools.packed import from_dense, iter_rows, seqsum, to_dense
+
+def _loop_stats(phi):
+    # verbatim aggregation from the list-of-lists compute_field
+    N = len(phi)
+    Phi = sum(phi[i][j] for i in range(N) for j in range(i+1, N))
+    kappa = [0.0]*N
+    mean_phi = [0.0]*N
+    for i in range(N):
+        s = sum(phi[i][j] for j in range(N) if j != i)
+        d = N-1 if N>1 else 1
+        mean_phi[i] = s / d
+        kappa[i] = sum((phi[i][j] - mean_phi[i])**2 for j in range(N) if j != i)
+    return Phi, mean_phi, kappa
+
+@pytest.mark.parametrize("n", [1, 2, 3, 17, 300])
+def test_field_stats_matches_loop_output(n):
+    rng = np.random.default_rng(n)
+    M = rng.random((n, n)) * 10
+    M = np.triu(M, 1); M = M + M.T
+    want = _loop_stats(M.tolist())
+    Phi, mean_phi, kappa = field_stats(from_dense(M), n)
+    # builtin sum() compensates rounding on Python >= 3.12, so only approximately equal
+    assert Phi == pytest.approx(want[0], rel=1e-12, abs=0.0)
+    assert mean_phi.tolist() == pytest.approx(want[1], rel=1e-12, abs=0.0)
+    assert kappa.tolist() == pytest.approx(want[2], rel=1e-12, abs=0.0)
+
+def test_packed_rows_roundtrip():
+    n = 600  # spans several row blocks
+    M = to_dense(np.arange(n * (n - 1) // 2, dtype=float), n)
+    rows = np.vstack([r for _, r in iter_rows(from_dense(M), n)])
+    assert np.array_equal(rows, M)
+
+def test_seqsum_is_a_plain_left_fold():
+    a = np.random.default_rng(5).random(3000) * 1e3
+    total = 0.0
+    for x in a.tolist():
+        total += x
+    assert seqsum(a, block=256) == total and seqsum([0.1] * 10) == 0.9999999999999999
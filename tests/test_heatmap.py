@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+
+from tools.field_format import write_field
+from tools.heatmap import block_reduce, node_order, pyramid
+from tools.packed import from_dense
+
+def _field(n, seed=0):
+    # two well-separated clusters, interleaved in node order
+    rng = np.random.default_rng(seed)
+    P = rng.random((n, 2)) + 5.0 * (np.arange(n) % 2)[:, None]
+    D = np.sqrt(((P[:, None] - P[None]) ** 2).sum(-1))
+    return D, from_dense(D)
+
+def test_block_reduce_matches_dense_blocks():
+    n = 41
+    D, tri = _field(n)
+    for order in (None, node_order(tri, n, "mds"), node_order(tri, n, "cluster")):
+        Dp = D if order is None else D[np.ix_(order, order)]
+        for m in (1, 6, 41):
+            b = np.arange(n) * m // n
+            ref = np.array([[Dp[b == i][:, b == j].mean() for j in range(m)] for i in range(m)])
+            mx = np.array([[Dp[b == i][:, b == j].max() for j in range(m)] for i in range(m)])
+            assert np.allclose(block_reduce(tri, n, m, order), ref)
+            assert np.array_equal(block_reduce(tri, n, m, order, "max"), mx)
+
+def test_orders_group_clusters():
+    n = 60
+    _, tri = _field(n, 1)
+    for how in ("mds", "cluster"):
+        order = node_order(tri, n, how)
+        assert sorted(order.tolist()) == list(range(n))
+        side = (order % 2)
+        assert (np.diff(side) != 0).sum() == 1   # one cluster, then the other
+
+def test_pyramid_levels_aggregate_exactly():
+    n = 50
+    D, tri = _field(n, 2)
+    levels = pyramid(tri, n, tile=8, max_px=30)
+    assert [l.shape[0] for l in levels] == [8, 15, 30]
+    # every coarse bin is the count-weighted mean of the finest bins it covers
+    b = np.arange(n) * 30 // n
+    for z, img in enumerate(levels):
+        f = 2 ** (len(levels) - 1 - z)
+        g = b // f
+        ref = np.array([[D[g == i][:, g == j].mean() for j in range(img.shape[0])] for i in range(img.shape[0])])
+        assert np.allclose(img, ref)
+
+def test_large_heatmap_and_tiles(tmp_path):
+    from tools.plot_field import plot, write_tiles
+    n = 320
+    _, tri = _field(n, 3)
+    write_field(tmp_path / "phi_field.bin", [f"n{i:03d}" for i in range(n)], {"phi": tri})
+    opts = {"heatmap": {"mode": "auto", "agg": "max", "order": "cluster", "px": 64}}
+    cache = tmp_path / "plots.json"
+    assert plot(tmp_path, only=["heatmap"], cache_path=cache, options=opts) == {"heatmap": "rendered"}
+    assert plot(tmp_path, only=["heatmap"], cache_path=cache, options=opts) == {"heatmap": "cached"}
+    opts["heatmap"]["agg"] = "mean"
+    assert plot(tmp_path, only=["heatmap"], cache_path=cache, options=opts) == {"heatmap": "rendered"}
+
+    m = write_tiles(tmp_path, tmp_path / "tiles", order="mds", tile=64, max_px=200)
+    assert [(l["size"], l["tiles"]) for l in m["levels"]] == [(50, 1), (100, 2), (200, 4)]
+    assert json.loads((tmp_path / "tiles" / "tiles.json").read_text()) == m
+    assert len(json.loads((tmp_path / "tiles" / "nodes.json").read_text())) == n
+    assert sorted(p.name for p in (tmp_path / "tiles" / "1").iterdir()) == ["0_0.png", "0_1.png", "1_0.png", "1_1.png"]
@@ -0,0 +1,45 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tools.ingest_dump import IngestError, ingest
+
+def test_split_dump_writes_sections_like_the_awk_splitter(tmp_path):
+    dump = (b"preamble is dropped\n"
+            b"# path: a/b/c.txt\nline 1\r\nline 2\n"
+            b"#path: not-a-split-point\n"
+            b"# path: run.sh\necho hi\n"
+            b"# path: a/b/c.txt\nsecond section wins")
+    written, bad = ingest(io.BytesIO(dump), tmp_path)
+    assert written == [tmp_path / "a/b/c.txt", tmp_path / "run.sh"] and bad == []
+    assert (tmp_path / "a/b/c.txt").read_bytes() == b"\nsecond section wins\n"
+    assert (tmp_path / "run.sh").read_bytes() == b"\necho hi\n"
+    assert os.stat(tmp_path / "run.sh").st_mode & 0o777 == 0o755
+
+def test_crlf_is_stripped_and_non_ascii_reported(tmp_path):
+    dump = "# path: x.txt\r\nok\r\n# path: y.txt\ncafé\ttab\n".encode()
+    written, bad = ingest(io.BytesIO(dump), tmp_path)
+    assert (tmp_path / "x.txt").read_bytes() == b"\nok\n"
+    assert bad == [tmp_path / "y.txt"]
+
+def test_unmarked_dump_is_filed_by_classification(tmp_path):
+    (tmp_path / "old.txt").write_bytes(b"caf\xc3\xa9\r\n")
+    written, bad = ingest(io.BytesIO(b"kappa and phi_matrix\r\n"), tmp_path)
+    assert written == [tmp_path / "tools/DROP.txt"] and bad == []
+    assert (tmp_path / "tools/DROP.txt").read_bytes() == b"kappa and phi_matrix\n"
+    assert (tmp_path / "old.txt").read_bytes() == b"caf\xc3\xa9\r\n"   # untouched without --normalize-all
+    _, bad = ingest(io.BytesIO(b"misc\n"), tmp_path, normalize_all=True)
+    assert bad == [tmp_path / "old.txt"]
+
+def test_paths_outside_the_tree_are_refused(tmp_path):
+    with pytest.raises(IngestError):
+        ingest(io.BytesIO(b"# path: ../escape.txt\nx\n"), tmp_path)
+
+def test_entry_point_and_wrapper(tmp_path):
+    for cmd in ([sys.executable, os.path.abspath("tools/ingest_dump.py")], ["bash", os.path.abspath("scripts/ingest_dump.sh")]):
+        r = subprocess.run(cmd, input=b"# path: d/f.py\nprint(1)\n", cwd=tmp_path, capture_output=True, check=True)
+        assert r.stdout.startswith(b"OK: dump ingested")
+        assert (tmp_path / "d/f.py").read_bytes() == b"\nprint(1)\n"
@@ -0,0 +1,79 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tools import telemetry
+from tools.phi_backend import ScriptBackend, WorkerError, WorkerPool, phi, phi_matrix
+
+NODES = [Path(p).resolve() for p in ("nodes/A", "nodes/B", "nodes/C")]
+
+def test_inprocess_matches_reference_script():
+    script = ScriptBackend("horizon_ref.py")
+    for norm in (False, True):
+        want, want_n = phi_matrix(NODES, norm=norm, backend=script)
+        got, got_n = phi_matrix(NODES, norm=norm)
+        assert got.tobytes() == want.tobytes()
+        assert got_n.tobytes() == want_n.tobytes()
+        assert phi(NODES[0], NODES[1], norm) == (want[0, 1], want_n[0, 1])
+
+def test_worker_pool_matches_inprocess_in_order():
+    nodes = NODES * 7  # 21 nodes -> 210 pairs spread over several chunks
+    iu, ju = np.triu_indices(len(nodes), k=1)
+    with WorkerPool("horizon_ref.py", workers=3, chunk=16) as pool:
+        raw, normv = pool.pairs(nodes, iu, ju, norm=True)
+    want, want_n = phi_matrix(nodes, norm=True)
+    assert raw.tobytes() == want[iu, ju].tobytes()
+    assert normv.tobytes() == want_n[iu, ju].tobytes()
+
+def test_worker_crash_reports_stderr(tmp_path):
+    bad = tmp_path / "bad_ref.py"
+    bad.write_text("import sys\nsys.stdin.readline()\nsys.stderr.write('boom: no phi here\\n')\nsys.exit(3)\n")
+    with WorkerPool(bad, workers=2, chunk=1) as pool, pytest.raises(WorkerError) as exc:
+        pool.pairs(NODES, *np.triu_indices(3, k=1))
+    assert "boom: no phi here" in str(exc.value)
+    assert exc.value.returncode == 3
+
+def test_compute_field_outputs_identical_across_backends(tmp_path):
+    outs = {}
+    for name, extra in (("inproc", []), ("script", ["--script", "horizon_ref.py"])):
+        outdir = tmp_path / name
+        subprocess.run([sys.executable, "tools/compute_field.py", *map(str, NODES),
+                        "--norm", "--label", "t", "--outdir", str(outdir), *extra], check=True, capture_output=True)
+        outs[name] = {f: (outdir / f).read_bytes() for f in ("phi_matrix.csv", "kappa.csv", "summary.json")}
+    assert outs["inproc"] == outs["script"]
+    assert json.loads(outs["inproc"]["summary.json"])["Phi"] > 0
+
+def test_phi_cache_recomputes_only_changed_node(tmp_path):
+    from tools.phi_backend import InProcessBackend
+    from tools.phi_cache import CachedBackend, PhiCache
+    nodes = []
+    for k in range(6):
+        d = tmp_path / f"n{k}"; d.mkdir()
+        (d / "charter.json").write_text("{}\n")
+        nodes.append(d)
+    db = tmp_path / "phi.sqlite"
+
+    def run():
+        cache = PhiCache(db, max_entries=100)
+        backend = CachedBackend(InProcessBackend(), cache)
+        try:
+            got = phi_matrix(nodes, norm=True, backend=backend)
+        finally:
+            backend.close()
+        return got, cache.stats()
+
+    (first, _), s1 = run()
+    (nodes[2] / "events.jsonl").write_text('{"e":1}\n')
+    (second, _), s2 = run()
+    assert (s1["hits"], s1["misses"]) == (0, 15)
+    assert (s2["hits"], s2["misses"]) == (10, 5)
+    assert second.tobytes() == first.tobytes() == phi_matrix(nodes)[0].tobytes()
+    # an all-hit run trusts the stat-keyed file hashes instead of re-reading the nodes
+    hashed = telemetry.COUNTERS["bytes_hashed"]
+    (third, _), s3 = run()
+    assert (s3["hits"], s3["misses"]) == (15, 0) and telemetry.COUNTERS["bytes_hashed"] == hashed
+    assert third.tobytes() == first.tobytes()
@@ -43,4 +43,25 @@ def test_validate_then_snapshot(tmp_path):
     if proc.returncode != 0:
         print("=== SNAPSHOT STDOUT ===\n", proc.stdout)
         print("=== SNAPSHOT STDERR ===\n", proc.stderr)
-    assert proc.returncode == 0, "Snapshot command failed"
\ No newline at end of file
+    assert proc.returncode == 0, "Snapshot command failed"
+
+def test_load_square_matrix_array_semantics(tmp_path):
+    import numpy as np
+    from tools.make_snapshot import load_square_matrix, mean_phi_per_node, validate_square
+
+    p = tmp_path / "phi.csv"
+    p.write_text("node,A,B,C\nC,1,2,9\nA,5,x,3\nzz,7,7,7\nB,4\n", encoding="utf-8")
+    nodes, D = load_square_matrix(str(p), None, mmap_path=str(tmp_path / "phi.npy"))
+    assert nodes == ["A", "B", "C"]
+    assert np.load(tmp_path / "phi.npy", mmap_mode="r").tolist() == D.tolist() == \
+        [[0.0, 0.0, 3.0], [4.0, 0.0, 0.0], [1.0, 2.0, 0.0]]
+    validate_square(nodes, D)
+    assert mean_phi_per_node(nodes, D) == [1.5, 2.0, 1.5]
+
+    p.write_text("0,1\n1,0\n1,1\n", encoding="utf-8")
+    try:
+        load_square_matrix(str(p), ["A", "B"])
+    except ValueError as e:
+        assert "expected 2 rows, found 3 (headerless mode)" in str(e)
+    else:
+        raise AssertionError("row count mismatch not reported")
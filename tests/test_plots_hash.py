@@ -32,3 +32,39 @@ def _ensure_plot_inputs():
 def test_plot_hash_stability(tmp_path):
     # Runs the plotting script; will fail if inputs missing
     subprocess.run(["python3", "tools/plot_field.py"], check=True)
+
+def test_render_cache_skips_unchanged_figures(tmp_path):
+    from tools.plot_field import plot
+    out = tmp_path / "out"; out.mkdir()
+    (out / "phi_matrix.csv").write_text(",A,B\nA,0.0,1.0\nB,1.0,0.0\n")
+    (out / "kappa.csv").write_text("node,kappa\nA,0.5\nB,0.7\n")
+    cache = tmp_path / "plots.json"
+    assert plot(out, jobs=2, cache_path=cache) == {"heatmap": "rendered", "kappa": "rendered", "trend": "skipped"}
+    first = (out / "phi_heatmap.png").read_bytes()
+    assert plot(out, cache_path=cache) == {"heatmap": "cached", "kappa": "cached", "trend": "skipped"}
+    (out / "kappa.csv").write_text("node,kappa\nA,0.5\nB,0.9\n")
+    assert plot(out, only=["kappa", "heatmap"], cache_path=cache) == {"kappa": "rendered", "heatmap": "cached"}
+    (out / "phi_heatmap.png").unlink()
+    assert plot(out, only=["heatmap"], cache_path=cache) == {"heatmap": "rendered"}
+    assert (out / "phi_heatmap.png").read_bytes() == first
+
+def test_render_key_covers_the_renderer_modules(tmp_path, monkeypatch):
+    from tools import plot_field
+    assert all(p.is_file() for p in plot_field.SOURCES)
+    assert {"heatmap.py", "packed.py"} <= {p.name for p in plot_field.SOURCES}
+    out = tmp_path / "out"; out.mkdir()
+    (out / "phi_matrix.csv").write_text(",A,B\nA,0.0,1.0\nB,1.0,0.0\n")
+    helper = tmp_path / "heatmap.py"; helper.write_text("TILE = 256\n")
+    monkeypatch.setattr(plot_field, "SOURCES", [*plot_field.SOURCES, helper])
+    key = plot_field.input_key("heatmap", out)
+    assert plot_field.input_key("heatmap", out) == key
+    helper.write_text("TILE = 128\n")
+    assert plot_field.input_key("heatmap", out) != key
+
+def test_mpl_setup_makes_one_config_dir(tmp_path, monkeypatch):
+    from tools import plot_field
+    made = []
+    monkeypatch.delenv("MPLCONFIGDIR", raising=False)
+    monkeypatch.setattr(plot_field.tempfile, "mkdtemp", lambda **kw: made.append(kw) or str(tmp_path))
+    plot_field._mpl(); plot_field._mpl()
+    assert len(made) == 1
@@ -0,0 +1,39 @@
+import importlib.util, json
+from pathlib import Path
+
+spec = importlib.util.spec_from_file_location("repro_auditor", Path("repro-pack/repro_auditor.py"))
+ra = importlib.util.module_from_spec(spec); spec.loader.exec_module(ra)
+
+def test_walk_prunes_nested_dirs_and_cache_skips_unchanged(tmp_path):
+    (tmp_path / "a" / "node_modules" / "x").mkdir(parents=True)
+    (tmp_path / "a" / "node_modules" / "x" / "f.js").write_text("skip")
+    (tmp_path / "a" / "keep.txt").write_text("keep")
+    (tmp_path / "top.txt").write_text("top")
+    assert sorted(str(p.relative_to(tmp_path)) for p in ra.walk(tmp_path)) == ["a/keep.txt", "top.txt"]
+
+    files = [tmp_path / "top.txt", tmp_path / "a" / "keep.txt"]
+    cache = {}
+    first, n = ra.hash_tree(files, cache)
+    assert n == 2 and first == {str(p): ra.sha(p) for p in files}
+    again, n = ra.hash_tree(files, cache)
+    assert n == 0 and again == first
+    files[0].write_text("changed")
+    again, n = ra.hash_tree(files, cache)
+    assert n == 1 and again[str(files[0])] == ra.sha(files[0])
+
+def test_merkle_diff_descends_only_into_changed_dirs(tmp_path):
+    ref_files = {"a/x": "1" * 64, "a/b/y": "2" * 64, "c/z": "3" * 64, "top": "4" * 64}
+    ref = (ref_files, ra.tree_hashes(ref_files))
+    legacy = tmp_path / "ledger.json"; legacy.write_text(json.dumps(ref_files))  # legacy flat ledger
+    assert ra.load_ledger(legacy) == ref
+
+    cur_files = {**ref_files, "a/b/y": "5" * 64, "a/b/new": "6" * 64}
+    del cur_files["c/z"]
+    cur = (cur_files, ra.tree_hashes(cur_files))
+    assert ref[1]["a"] != cur[1]["a"] and ref[1]["a/b"] != cur[1]["a/b"]
+    diff = ra.diff_trees(ref, cur)
+    assert diff == {"added": ["a/b/new"], "removed": ["c/z"], "changed": ["a/b/y"]}
+    assert ra.by_dir(diff) == {"a/b": {"added": ["new"], "changed": ["y"]}, "c": {"removed": ["z"]}}
+    only_a = {p: h for p, h in cur_files.items() if ra.in_scope(p, ["a"])}
+    assert ra.diff_trees(ref, (only_a, ra.tree_hashes(only_a)), ["a"])["removed"] == []
+    assert ra.diff_trees(ref, ref) == {"added": [], "removed": [], "changed": []}
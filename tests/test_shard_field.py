@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tools.merge_field import MergeError, merge
+from tools.packed import n_pairs, pair_range, triu
+
+OUTPUTS = ("phi_matrix.csv", "phi_field.bin", "kappa.csv", "summary.json")
+
+def _nodes(tmp_path, n):
+    out = []
+    for k in range(n):
+        d = tmp_path / "nodes" / f"node{k:02d}"; d.mkdir(parents=True)
+        (d / "charter.json").write_text("{}\n")
+        if k % 3:
+            (d / "events.jsonl").write_text("".join(f'{{"ts": "t{k}.{e}"}}\n' for e in range(k)))
+        out.append(str(d))
+    return out
+
+def _compute(nodes, outdir, *extra):
+    return [sys.executable, os.path.abspath("tools/compute_field.py"), *nodes, "--outdir", str(outdir),
+            "--no-events-cache", "--norm", "--label", "v1.2.3", *extra]
+
+def test_pair_range_matches_the_triangle():
+    for n in (0, 1, 2, 7, 40):
+        iu, ju = triu(n)
+        for lo, hi in ((0, n_pairs(n)), (n_pairs(n) // 3, n_pairs(n) // 2), (n_pairs(n), n_pairs(n))):
+            i, j = pair_range(n, lo, hi)
+            assert i.tolist() == iu[lo:hi].tolist() and j.tolist() == ju[lo:hi].tolist()
+
+def test_shards_from_separate_processes_merge_to_the_single_run(tmp_path):
+    nodes = _nodes(tmp_path, 11)
+    subprocess.run(_compute(nodes, tmp_path / "single"), check=True, capture_output=True)
+    # each shard is a separate "machine" with its own output directory, all running at once
+    m = 4
+    procs = [subprocess.Popen(_compute(nodes, tmp_path / f"m{k}", "--shard", f"{k}/{m}"), stdout=subprocess.PIPE)
+             for k in range(1, m + 1)]
+    assert [p.wait() for p in procs] == [0] * m
+    for p in procs:
+        p.stdout.close()
+    parts = [tmp_path / f"m{k}" / f"phi_shard_{k}_of_{m}.bin" for k in range(1, m + 1)]
+    r = subprocess.run([sys.executable, "tools/merge_field.py", *map(str, parts[::-1]), "--outdir", str(tmp_path / "merged")],
+                       capture_output=True, text=True)
+    assert r.returncode == 0, r.stderr
+    for name in OUTPUTS:
+        assert (tmp_path / "merged" / name).read_bytes() == (tmp_path / "single" / name).read_bytes(), name
+
+    # a directory of shards works too; gaps, duplicates and foreign node lists are refused
+    shards = tmp_path / "shards"; shards.mkdir()
+    for p in parts:
+        os.link(p, shards / p.name)
+    merge([shards], tmp_path / "again", fmt="csv")
+    assert (tmp_path / "again/summary.json").read_bytes() == (tmp_path / "single/summary.json").read_bytes()
+    with pytest.raises(MergeError, match="missing shard"):
+        merge(parts[:3], tmp_path / "x")
+    with pytest.raises(MergeError, match="already read"):
+        merge(parts + parts[:1], tmp_path / "x")
+    subprocess.run(_compute(nodes[:10], tmp_path / "other", "--shard", f"2/{m}"), check=True, capture_output=True)
+    with pytest.raises(MergeError, match="node list differs"):
+        merge([parts[0], tmp_path / "other" / f"phi_shard_2_of_{m}.bin", *parts[2:]], tmp_path / "x")
+
+def test_more_shards_than_nodes(tmp_path):
+    nodes = _nodes(tmp_path, 3)
+    subprocess.run(_compute(nodes, tmp_path / "single"), check=True, capture_output=True)
+    for k in range(1, 6):
+        subprocess.run(_compute(nodes, tmp_path / "parts", "--shard", f"{k}/5"), check=True, capture_output=True)
+    merge([tmp_path / "parts"], tmp_path / "merged")
+    for name in OUTPUTS:
+        assert (tmp_path / "merged" / name).read_bytes() == (tmp_path / "single" / name).read_bytes(), name
+    r = subprocess.run(_compute(nodes, tmp_path / "bad", "--shard", "6/5"), capture_output=True, text=True)
+    assert r.returncode == 2 and "1 <= K <= M" in r.stderr
@@ -0,0 +1,72 @@
+import csv
+import json
+import sys
+
+import pytest
+
+from tools import compute_field, telemetry
+
+def _rows(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def test_stages_counters_and_profiles_land_in_the_run(tmp_path):
+    run = tmp_path / "epoch_T"; run.mkdir()
+    (run / "metadata.env").write_text("git_branch=main\ngit_commit=abc123\npython=Python 3.11.1\ntags=mode=analysis,task=validate\n")
+    s = telemetry.Session("tool", run, profile=True)
+    with s.stage("outer"):
+        telemetry.count("bytes_hashed", 10)
+        with s.stage("inner"):
+            telemetry.count("phi_evals", 3)
+            big = bytearray(64 << 20)
+        del big
+    with pytest.raises(ValueError), s.stage("broken"):
+        raise ValueError
+    s.close()
+    s.close()   # appends, header once
+    rows = _rows(run / "telemetry.csv")
+    assert list(rows[0]) == telemetry.HEADER and len(rows) == 8
+    inner, outer, broken, total = rows[:4]
+    assert [r["Stage"] for r in (inner, outer, broken, total)] == ["inner", "outer", "broken", "total"]
+    assert inner["Counters"] == "phi_evals=3" and outer["Counters"] == "bytes_hashed=10 phi_evals=3"
+    assert float(inner["PeakRSSMB"]) > 64 and float(outer["PeakRSSMB"]) >= float(inner["PeakRSSMB"])
+    assert float(outer["WallSec"]) >= float(inner["WallSec"]) > 0
+    assert outer["Tags"] == "mode=analysis task=validate tool=tool stage=outer"
+    assert broken["Tags"].endswith("stage=broken status=error") and total["Tags"].endswith("status=error")
+    assert (inner["RunID"], inner["GitBranch"], inner["GitCommit"], inner["Python"]) == ("epoch_T", "main", "abc123", "Python 3.11.1")
+    # the dashboard splits on every comma, so no field may contain one
+    assert {line.count(",") for line in (run / "telemetry.csv").read_text().splitlines()} == {len(telemetry.HEADER) - 1}
+    # only outermost stages are profiled
+    assert sorted(p.name.split(".", 2)[2] for p in (run / "profile").glob("*.prof")) == ["01.outer.prof", "02.broken.prof"]
+    assert "cumulative" in next((run / "profile").glob("*outer.txt")).read_text()
+
+def test_existing_csv_keeps_its_columns(tmp_path):
+    p = tmp_path / "telemetry.csv"
+    p.write_text("RunID,UTC,Tags\nr0,2025-01-01T00:00:00Z,x=1\n")
+    telemetry.append_rows(p, [{"RunID": "r1", "UTC": "u", "Tags": "a=b", "Stage": "s"}])
+    assert p.read_text() == "RunID,UTC,Tags\nr0,2025-01-01T00:00:00Z,x=1\nr1,u,a=b\n"
+
+def test_entry_point_writes_to_the_current_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "RUNS", tmp_path / "runs")
+    (tmp_path / "runs/epoch_X").mkdir(parents=True)
+    for name in "AB":
+        (tmp_path / name).mkdir(); (tmp_path / name / "charter.json").write_text("{}")
+    monkeypatch.setenv("EPOCH_ID", "epoch_X")
+    monkeypatch.setattr(sys, "argv", ["compute_field.py", str(tmp_path / "A"), str(tmp_path / "B"),
+                                      "--outdir", str(tmp_path / "out"), "--no-events-cache"])
+    compute_field.main()
+    telemetry._close()
+    rows = _rows(tmp_path / "runs/epoch_X/telemetry.csv")
+    assert [r["Stage"] for r in rows] == ["events", "pairs", "stats", "write", "total"]
+    assert {r["Tool"] for r in rows} == {"compute_field"} and rows[1]["Counters"] == "phi_evals=1"
+    assert "bytes_hashed=" in rows[3]["Counters"]   # the binary field's payload sha256
+    assert json.loads((tmp_path / "out/summary.json").read_text())["nodes"] == ["A", "B"]
+
+def test_no_run_no_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "RUNS", tmp_path)
+    monkeypatch.delenv("EPOCH_ID", raising=False); monkeypatch.delenv("TAG", raising=False)
+    assert telemetry.current_run() is None
+    monkeypatch.setenv("TAG", "epoch_missing")
+    assert telemetry.current_run() is None
+    with telemetry.stage("anything"):
+        telemetry.count("cache_hits")
@@ -0,0 +1,27 @@
+import json
+
+from tools.build_timeline_index import build_index
+from tools.stat_cache import StatCache
+
+def _snap(d, tag, phi):
+    p = d / f"{tag}.json"
+    p.write_text(json.dumps({"tag": tag, "tag_date_utc": "2025-10-14T00:00:00Z", "Phi": phi}), encoding="ascii")
+    return p
+
+def test_incremental_index_reparses_only_new_and_changed(tmp_path):
+    field = tmp_path / "timeline"; field.mkdir()
+    for k in range(1, 4):
+        _snap(field, f"v0.0.{k}", float(k))
+    cache = StatCache(tmp_path / "cache.json")
+    first, parsed = build_index(field, None, cache)
+    assert len(parsed) == 3
+    again, parsed = build_index(field, first, cache)
+    assert parsed == [] and again == first
+
+    new = _snap(field, "v0.0.10", 10.0)
+    changed = _snap(field, "v0.0.2", 22.5)  # different size, so coarse mtimes still show it
+    inc, parsed = build_index(field, again, cache)
+    assert sorted(parsed) == sorted([new, changed])
+    assert inc == build_index(field)[0]
+    assert [e["tag"] for e in inc["tags"]] == ["v0.0.1", "v0.0.2", "v0.0.3", "v0.0.10"]
+    assert inc["chain_root"] != first["chain_root"]
@@ -0,0 +1,45 @@
+import json, math
+
+import numpy as np
+
+from tools.build_timeline_index import build_index
+from tools.timeline_store import TimelineStore, update_store
+
+def _publish(field, tag, nodes, phi):
+    snap = {"tag": tag, "tag_date_utc": "2025-10-14T00:00:00Z", "Phi": phi, "Phi_norm": phi / 10, "nodes": nodes,
+            "kappa": {n: phi + k for k, n in enumerate(nodes)}, "mean_phi": {n: phi * 2 for n in nodes},
+            "event_counts": {n: len(n) for n in nodes}}
+    (field / "timeline" / f"{tag}.json").write_text(json.dumps(snap), encoding="ascii")
+    (field / "timeline.index.json").write_text(json.dumps(build_index(field / "timeline")[0]), encoding="ascii")
+
+def test_store_appends_widens_and_rebuilds_changed_tags(tmp_path):
+    field = tmp_path / "field"; (field / "timeline").mkdir(parents=True)
+    _publish(field, "v0.0.1", ["A", "B"], 1.0)
+    assert update_store(field) == 1
+    _publish(field, "v0.0.2", ["A", "B"], 2.0)
+    assert update_store(field) == 1 and update_store(field) == 0
+    _publish(field, "v0.0.3", ["A", "C"], 3.0)  # new node widens per-node columns
+    assert update_store(field) == 1
+
+    st = TimelineStore(field / "timeline.store")
+    assert st.tags == ["v0.0.1", "v0.0.2", "v0.0.3"] and st.nodes == ["A", "B", "C"]
+    assert st.series("Phi").tolist() == [1.0, 2.0, 3.0]
+    kb = st.series("kappa", "B")
+    assert isinstance(kb, np.memmap) and kb[:2].tolist() == [2.0, 3.0] and math.isnan(kb[2])
+    assert st.series("event_counts", "C").tolist() == [-1, -1, 1]
+
+    old = st
+    _publish(field, "v0.0.2", ["A", "B"], 20.0)  # rows from v0.0.2 on are redone in a new generation
+    gen = st.header["generation"]
+    with (field / "timeline.store" / f"Phi.{gen}.bin").open("ab") as f:
+        f.write(b"\0" * 8)  # bytes from an interrupted append
+    assert update_store(field) == 2
+    st = TimelineStore(field / "timeline.store")
+    assert st.header["generation"] == gen + 1
+    assert sorted(p.name for p in (field / "timeline.store").glob("Phi.*")) == [f"Phi.{gen + 1}.bin"]
+    # a reader opened before the update keeps its snapshot
+    assert old.series("Phi").tolist() == [1.0, 2.0, 3.0] and old.series("kappa", "B")[:2].tolist() == [2.0, 3.0]
+    full = TimelineStore(update_store(field, tmp_path / "full", rebuild=True) and tmp_path / "full")
+    for name in st.header["columns"]:
+        np.testing.assert_array_equal(st.column(name), full.column(name))
+    assert st.row("v0.0.2")["Phi"] == 20.0
@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+import pytest
+
+from tools import validate_timeline as vt
+from tools.constants import EPS
+from tools.field_format import write_field
+from tools.validate_timeline import matrix_error
+
+def _loop(D):
+    # the original row-by-row checks
+    n = len(D)
+    for i in range(n):
+        if abs(float(D[i][i])) > EPS:
+            return f"phi_matrix diagonal non-zero at ({i},{i})"
+        for j in range(i+1, n):
+            a = float(D[i][j]); b = float(D[j][i])
+            if a < 0.0 or b < 0.0:
+                return f"negative phi at ({i},{j}) or ({j},{i})"
+            if a != b:
+                return f"asymmetry phi[{i},{j}]={a} vs phi[{j},{i}]={b}"
+    return None
+
+def test_vectorized_checks_report_the_first_loop_error():
+    rng = np.random.default_rng(3)
+    for _ in range(500):
+        n = int(rng.integers(1, 9))
+        D = rng.random((n, n)); D = D + D.T; np.fill_diagonal(D, 0.0)
+        for _ in range(int(rng.integers(0, 3))):
+            i, j = (int(x) for x in rng.integers(0, n, 2))
+            D[i, j] = rng.choice([-0.5, 0.25, 1.0, np.nan, 1e-13, -0.0])
+        assert matrix_error(D, n) == _loop(D.tolist())
+
+def test_verified_snapshots_are_not_parsed_again(tmp_path, monkeypatch):
+    tl = tmp_path / "timeline"; tl.mkdir()
+    monkeypatch.setattr(vt, "FIELD_DIR", tl)
+    nodes = ["A", "B", "C"]
+    write_field(tl / "phi_field.bin", nodes, {"phi": np.array([1.0, 2.0, 3.0])})
+    (tl / "v0.0.1.json").write_text(json.dumps({"tag": "v0.0.1", "nodes": nodes,
+                                                "phi_matrix": [[0, 1, 2], [1, 0, 3], [2, 3, 0]]}))
+    (tl / "v0.0.2.json").write_text(json.dumps({"tag": "v0.0.2", "nodes": nodes, "phi_field": "phi_field.bin"}))
+    verified = tmp_path / "verified.json"
+    vt.check_snapshots(["v0.0.1", "v0.0.2"], jobs=1, verified_path=verified)
+    keys = json.loads(verified.read_text())
+    assert "+" not in keys["v0.0.1"] and "+phi_field.bin:" in keys["v0.0.2"]
+
+    parsed = []
+    loads = json.loads
+    def spy(s, *a, **kw):
+        if '"tag"' in s:
+            parsed.append(s)
+        return loads(s, *a, **kw)
+    monkeypatch.setattr(json, "loads", spy)
+    vt.check_snapshots(["v0.0.1", "v0.0.2"], jobs=1, verified_path=verified)
+    assert parsed == []  # hits: a sha of the bytes and the referenced field's header, no snapshot parse
+
+    # a changed phi_field payload invalidates the snapshot that references it
+    write_field(tl / "phi_field.bin", nodes, {"phi": np.array([1.0, -2.0, 3.0])})
+    with pytest.raises(SystemExit):
+        vt.check_snapshots(["v0.0.1", "v0.0.2"], jobs=1, verified_path=verified)
+    assert len(parsed) == 1 and '"v0.0.2"' in parsed[0]
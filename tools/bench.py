@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# Pipeline benchmarks on synthetic fields, with a JSON baseline and regression gate.
+#
+#   bench-field [--sizes 10 100 1000 10000] [--stages ...] [--out PATH]
+#   bench-field --compare BASELINE [--current RESULTS] [--threshold 0.25]
+#
+# Inputs for each N (node dirs with charter.json/events.jsonl, phi CSV and .npy,
+# a timeline whose snapshots share one binary field, a file tree for the repro
+# auditor) are generated once, deterministically, under --data. Every (stage, N)
+# then runs in a fresh worker process: wall time covers the stage call only,
+# peak RSS is the worker's high-water mark (telemetry.peak_rss_mb), so stages never
+# inherit each other's heap.
+import argparse, importlib, importlib.util, io, json, os, platform, shutil, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from pathlib import Path
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import numpy as np
+from tools import telemetry
+from tools.field_format import write_field
+from tools.stat_cache import CACHE_DIR
+
+BENCH_DIR = CACHE_DIR / "bench"
+DATA = BENCH_DIR / "data"
+BASELINE = BENCH_DIR / "baseline.json"
+SIZES = (10, 100, 1000, 10000)
+TAGS = 4            # snapshots per synthetic timeline
+GEN_VERSION = 1     # bump when the generated inputs change shape
+THRESHOLD = 0.25    # relative slowdown / growth that counts as a regression
+MIN_DELTA = {"wall_s": 0.05, "peak_rss_mb": 8.0}  # absolute changes below these are noise
+METRICS = tuple(MIN_DELTA)
+
+def _names(n):
+    return [f"n{i:05d}" for i in range(n)]
+
+def _distances(P, r0, r1):
+    # rows of a Euclidean distance matrix: symmetric bit for bit, zero diagonal
+    return np.sqrt(((P[r0:r1, None, :] - P[None, :, :]) ** 2).sum(axis=2)).round(4)
+
+def generate(n, data=DATA):
+    """Synthetic inputs for N nodes under data/n<N> (reused while GEN_VERSION matches)."""
+    d = Path(data) / f"n{n}"
+    stamp = {"version": GEN_VERSION, "n": n, "tags": TAGS}
+    try:
+        if json.loads((d / "dataset.json").read_text(encoding="ascii")) == stamp:
+            return d
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(d, ignore_errors=True)
+    names = _names(n)
+    for i, name in enumerate(names):
+        nd = d / "nodes" / name
+        nd.mkdir(parents=True)
+        (nd / "charter.json").write_text(json.dumps({"name": name}) + "\n", encoding="ascii")
+        (nd / "events.jsonl").write_text("".join(f'{{"ts": "2025-01-01T00:00:{k:02d}Z", "kind": "tick"}}\n'
+                                                 for k in range(1 + i % 7)), encoding="ascii")
+    P = np.random.default_rng(n).random((n, 2)) * 10.0
+    D = np.lib.format.open_memmap(d / "phi.npy", mode="w+", dtype=np.float64, shape=(n, n))
+    with (d / "phi.csv").open("w", encoding="ascii", newline="\n") as f:
+        f.write(",".join(["node"] + names) + "\n")
+        for r0 in range(0, n, 256):
+            rows = _distances(P, r0, min(n, r0 + 256))
+            D[r0:r0 + len(rows)] = rows
+            buf = io.StringIO()
+            np.savetxt(buf, rows, fmt="%.4f", delimiter=",")
+            f.writelines(f"{names[r0 + k]},{line}\n" for k, line in enumerate(buf.getvalue().splitlines()))
+    D.flush()
+    tl = d / "public" / "field" / "timeline"
+    tl.mkdir(parents=True)
+    tri = np.concatenate([D[i, i + 1:] for i in range(n)])
+    write_field(tl / "phi_field.bin", names, {"phi": tri})
+    mean_phi = np.asarray(D.sum(axis=1)) / max(1, n - 1)
+    kappa = np.array([float(((D[i] - mean_phi[i]) ** 2).sum()) for i in range(n)])
+    for k in range(1, TAGS + 1):
+        snap = {"tag": f"v0.0.{k}", "tag_date_utc": f"2025-01-{k:02d}T00:00:00Z", "Phi": float(tri.sum()),
+                "nodes": names, "phi_field": "phi_field.bin",
+                "kappa": dict(zip(names, kappa.tolist())), "mean_phi": dict(zip(names, mean_phi.tolist())),
+                "event_counts": {name: 1 + i % 7 for i, name in enumerate(names)}}
+        (tl / f"v0.0.{k}.json").write_text(json.dumps(snap, sort_keys=True, ensure_ascii=True) + "\n", encoding="ascii")
+    for i in range(n):
+        p = d / "tree" / f"d{i % 32:02d}" / f"f{i:05d}.txt"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(f"file {i}\n" * (1 + i % 16), encoding="ascii")
+    (d / "tree" / "repro-pack").mkdir()
+    (d / "dataset.json").write_text(json.dumps(stamp) + "\n", encoding="ascii")
+    return d
+
+def _run_main(mod, argv):
+    sys.argv = [mod.__file__, *argv]
+    try:
+        mod.main()
+    except SystemExit as e:
+        if e.code not in (0, None):
+            raise RuntimeError(f"{mod.__name__} exited with {e.code}")
+
+def _repro_auditor():
+    spec = importlib.util.spec_from_file_location("repro_auditor", ROOT / "repro-pack" / "repro_auditor.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+def _compute_field_setup(d):
+    nodes = sorted(f"nodes/{p.name}" for p in (d / "nodes").iterdir())
+    return importlib.import_module("tools.compute_field"), [*nodes, "--outdir", "out", "--no-events-cache"]
+
+def _mds_setup(d):
+    D = np.load(d / "phi.npy")
+    return importlib.import_module("tools.embedding").deterministic_mds_2d, D, _names(len(D))
+
+# name -> (working dir inside the dataset, setup(dataset) -> arg, timed run(arg))
+STAGES = {
+    "compute_field": ("", _compute_field_setup, lambda a: _run_main(*a)),
+    "load_square_matrix": ("", lambda d: importlib.import_module("tools.make_snapshot").load_square_matrix,
+                           lambda load: load("phi.csv", None)),
+    "deterministic_mds_2d": ("", _mds_setup, lambda a: a[0](a[1], a[2])),
+    "build_timeline_index": ("", lambda d: importlib.import_module("tools.build_timeline_index"),
+                             lambda mod: _run_main(mod, ["--full"])),
+    "validate_timeline": ("", lambda d: importlib.import_module("tools.validate_timeline"),
+                          lambda mod: _run_main(mod, [])),
+    "repro_auditor": ("tree", lambda d: _repro_auditor(), lambda mod: _run_main(mod, ["--no-cache", "--update"])),
+}
+
+def _worker(stage, d, result):
+    """Run one stage in this process (cwd = its working dir); write its wall time and peak RSS to `result`."""
+    cwd, setup, run = STAGES[stage]
+    d = Path(d).resolve()
+    os.chdir(d / cwd)
+    arg = setup(d)
+    with open(os.devnull, "w") as null:
+        old, sys.stdout = sys.stdout, null
+        try:
+            t0 = time.perf_counter()
+            run(arg)
+            wall = time.perf_counter() - t0
+        finally:
+            sys.stdout = old
+    Path(result).write_text(json.dumps({"wall_s": round(wall, 6), "peak_rss_mb": round(telemetry.peak_rss_mb(), 2)}), encoding="ascii")
+
+def run_stage(stage, d):
+    """{"wall_s", "peak_rss_mb"} of one stage on dataset dir `d`, measured in a fresh process."""
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        result = Path(tmp) / "result.json"
+        # outside any epoch, so the synthetic stages stay out of a real run's telemetry.csv
+        env = {k: v for k, v in os.environ.items() if k not in ("EPOCH_ID", "TAG")}
+        p = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--worker", stage, str(d), str(result)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+        if p.returncode:
+            tail = p.stderr.decode(errors="replace").strip().splitlines()[-5:]
+            raise RuntimeError(f"{stage} failed on {Path(d).name} (exit {p.returncode}):\n" + "\n".join(tail))
+        return json.loads(result.read_text(encoding="ascii"))
+
+def bench(sizes=SIZES, stages=None, repeat=1, data=DATA, log=print):
+    """Results document: {"results": {stage: {N: metrics}}} plus host info; best wall and worst RSS of `repeat` runs."""
+    results = {}
+    for n in sizes:
+        d = generate(n, data)
+        for stage in stages or STAGES:
+            runs = [run_stage(stage, d) for _ in range(repeat)]
+            m = {"wall_s": min(r["wall_s"] for r in runs), "peak_rss_mb": max(r["peak_rss_mb"] for r in runs)}
+            results.setdefault(stage, {})[str(n)] = m
+            log(f"{stage:<22} N={n:<6} {m['wall_s']:>10.3f} s {m['peak_rss_mb']:>10.1f} MB")
+    return {"version": 1, "created_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "results": results}
+
+def compare(base, cur, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """Rows (stage, N, metric, base, current, ratio, regressed) for every measurement in both documents."""
+    rows = []
+    for stage, by_n in sorted(cur["results"].items()):
+        for n, m in sorted(by_n.items(), key=lambda kv: int(kv[0])):
+            b = base.get("results", {}).get(stage, {}).get(n)
+            if not b:
+                continue
+            for metric in METRICS:
+                old, new = b[metric], m[metric]
+                ratio = new / old if old else float("inf") if new else 1.0
+                bad = new > old * (1 + threshold) and new - old > min_delta[metric]
+                rows.append((stage, int(n), metric, old, new, ratio, bad))
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the field pipeline on synthetic inputs; record or compare a baseline")
+    ap.add_argument("--worker", nargs=3, metavar=("STAGE", "DATASET", "RESULT"), help=argparse.SUPPRESS)
+    ap.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="node counts (default: 10 100 1000 10000)")
+    ap.add_argument("--stages", nargs="+", choices=list(STAGES), help="stages to time (default: all)")
+    ap.add_argument("--repeat", type=int, default=1, help="runs per measurement; best wall time, worst RSS kept")
+    ap.add_argument("--data", default=str(DATA), help="where synthetic inputs are generated and reused")
+    ap.add_argument("--out", default=None, help=f"write results here (default {BASELINE} unless --compare)")
+    ap.add_argument("--compare", metavar="BASELINE", help="flag regressions against this results file; exit 1 if any")
+    ap.add_argument("--current", metavar="RESULTS", help="with --compare: compare this saved results file instead of running")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="relative increase that counts as a regression")
+    args = ap.parse_args()
+    if args.worker:
+        _worker(*args.worker)
+        return
+    if args.current:
+        cur = json.loads(Path(args.current).read_text(encoding="ascii"))
+    else:
+        cur = bench(args.sizes, args.stages, args.repeat, Path(args.data))
+    out = args.out or (None if args.compare else str(BASELINE))
+    if out and not args.current:
+        Path(out).parent.mkdir(parents=True, exist_ok=True)
+        Path(out).write_text(json.dumps(cur, indent=2, sort_keys=True, ensure_ascii=True) + "\n", encoding="ascii")
+        print(f"results → {out}")
+    if not args.compare:
+        return
+    rows = compare(json.loads(Path(args.compare).read_text(encoding="ascii")), cur, args.threshold)
+    for stage, n, metric, old, new, ratio, bad in rows:
+        print(f"{'REGRESSION' if bad else 'ok':<10} {stage:<22} N={n:<6} {metric:<12} {old:>10.3f} → {new:>10.3f} ({ratio:.2f}x)")
+    if any(r[-1] for r in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
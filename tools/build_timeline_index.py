@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
-import json, re, hashlib
+import argparse, json, re, hashlib, sys
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tools import telemetry
+from tools.stat_cache import CACHE_DIR, StatCache
+from tools.timeline_store import update_store
 
 FIELD = Path("public/field/timeline")
+INDEX = FIELD.parent/"timeline.index.json"
+STAT_CACHE = CACHE_DIR/"timeline_index.json"
 
 def semver_key(tag: str) -> tuple[int,int,int]:
     m = re.findall(r"\d+", tag); t = [int(x) for x in m[:3]] + [0,0,0]
@@ -10,25 +16,72 @@ def semver_key(tag: str) -> tuple[int,int,int]:
 
 def sha256_file(p: Path) -> str:
     import hashlib
-    return hashlib.sha256(p.read_bytes()).hexdigest()
+    raw = p.read_bytes()
+    telemetry.count("bytes_hashed", len(raw))
+    return hashlib.sha256(raw).hexdigest()
 
-def main():
-    snaps = []
-    for p in sorted(FIELD.glob("v*.json")):
-        data = json.loads(p.read_text(encoding="ascii"))
-        snaps.append({
-            "tag": data["tag"],
-            "sha": "",
-            "tag_date_utc": data["tag_date_utc"],
-            "snapshot_sha256": sha256_file(p),
-            "Phi": float(data["Phi"])
-        })
+def index_entry(p: Path) -> dict:
+    data = json.loads(p.read_text(encoding="ascii"))
+    return {
+        "tag": data["tag"],
+        "sha": "",
+        "tag_date_utc": data["tag_date_utc"],
+        "snapshot_sha256": sha256_file(p),
+        "Phi": float(data["Phi"])
+    }
+
+def load_index(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="ascii"))
+    except (OSError, ValueError):
+        return {}
+
+def build_index(field=FIELD, prev=None, cache=None):
+    """Index of every snapshot in `field`; returns (index, parsed) where `parsed` lists re-read files.
+
+    A file whose (size, mtime_ns, inode) still matches `cache` keeps its entry
+    from `prev` (looked up by snapshot_sha256); everything else is parsed and hashed.
+    """
+    known = {e["snapshot_sha256"]: e for e in (prev or {}).get("tags", [])}
+    snaps, parsed, seen = [], [], set()
+    for p in sorted(field.glob("v*.json")):
+        st = p.stat()
+        hit = cache.fresh(p, st) if cache else None
+        entry = known.get(hit["snapshot_sha256"]) if hit else None
+        if entry is None:
+            entry = index_entry(p)
+            parsed.append(p)
+        if cache:
+            cache.put(p, st, snapshot_sha256=entry["snapshot_sha256"])
+        seen.add(str(p))
+        snaps.append(entry)
+    if cache:
+        for k in [k for k in cache.entries if k.startswith(str(field) + "/") and k not in seen]:
+            cache.drop(k)
     snaps.sort(key=lambda x: semver_key(x["tag"]))
     chain = hashlib.sha256("\n".join(s["snapshot_sha256"] for s in snaps).encode("ascii")).hexdigest()
-    index = {"version": 1, "tags": snaps, "chain_root": chain}
-    out = FIELD.parent/"timeline.index.json"
-    out.write_text(json.dumps(index, sort_keys=True, ensure_ascii=True, indent=2)+"\n", encoding="ascii")
-    print(out)
+    return {"version": 1, "tags": snaps, "chain_root": chain}, parsed
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild public/field/timeline.index.json")
+    ap.add_argument("--full", action="store_true", help="re-parse and re-hash every snapshot")
+    ap.add_argument("--no-store", action="store_true", help="do not update the columnar timeline.store")
+    telemetry.add_arguments(ap)
+    args = ap.parse_args()
+    telemetry.start("build_timeline_index", args.profile)
+
+    with telemetry.stage("index"):
+        cache = None if args.full else StatCache(STAT_CACHE)
+        index, parsed = build_index(FIELD, None if args.full else load_index(INDEX), cache)
+        text = json.dumps(index, sort_keys=True, ensure_ascii=True, indent=2)+"\n"
+        if not INDEX.exists() or INDEX.read_text(encoding="ascii") != text:
+            INDEX.write_text(text, encoding="ascii")
+        if cache:
+            cache.save()
+    if not args.no_store:
+        with telemetry.stage("store"):
+            update_store(FIELD.parent, rebuild=args.full)
+    print(INDEX)
 
 if __name__ == "__main__":
     main()
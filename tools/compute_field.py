@@ -1,85 +1,166 @@
 #!/usr/bin/env python3
-import argparse, json, os, subprocess, sys
+# Compute the phi field, kappa and summary for a set of node directories.
+#
+# --shard K/M computes only the K-th (1-based) of M contiguous blocks of the
+# packed i<j pair space, plus event counts for the K-th of M contiguous blocks
+# of nodes, and writes them as one partial field file (SHARD_FILE) whose header
+# records the shard, node list, backend fingerprint and those event stats.
+# tools/merge_field.py combines the M partials into the same phi_matrix.csv,
+# phi_field.bin, kappa.csv and summary.json as a single-machine run.
+import argparse, json, re, sys
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import numpy as np
+from tools import telemetry
+from tools.event_counts import CACHE_PATH as EVENTS_CACHE, count_events_many
+from tools.field_format import FIELD_FILE, write_field
+from tools.packed import iter_rows, n_pairs, pair_range, seqsum, triu
+from tools.phi_backend import get_backend
+from tools.phi_cache import DEFAULT_MAX_ENTRIES, DEFAULT_PATH, CachedBackend, PhiCache
 
-def sh(*args):
-    cp = subprocess.run(args, capture_output=True, text=True, env=dict(os.environ, LC_ALL="C", TZ="UTC"))
-    if cp.returncode != 0:
-        sys.stderr.write(cp.stderr or cp.stdout)
-        sys.exit(cp.returncode)
-    return cp.stdout
-
-def phi_between(script, a, b, norm=False):
-    cmd = [sys.executable, str(script), "phi", str(a), str(b)]
-    if norm: cmd.append("--norm")
-    out = sh(*cmd)
-    data = json.loads(out)
-    return (float(data["phi"]), float(data.get("phi_norm", 0.0)))
+SHARD_FILE = "phi_shard_{k}_of_{m}.bin"
 
 def count_events(node):
-    p = Path(node) / "events.jsonl"
-    if not p.exists(): return 0
-    return sum(1 for _ in p.open("r", encoding="utf-8"))
+    return count_events_many([node], cache_path=None)[0]["count"]
+
+def field_stats(tri, n):
+    """Phi, mean_phi and kappa from the packed phi triangle.
+
+    Every sum is an uncompensated left-to-right fold in the order of the
+    original nested loops, so results do not depend on the Python version.
+    They match those loops to within float rounding, not bit for bit: sum()
+    compensates rounding on Python >= 3.12, and kappa squares with x*x where
+    Python's x**2 (libm pow()) can be an ulp off.
+    """
+    Phi = seqsum(tri)
+    d = n-1 if n>1 else 1
+    mean_phi = np.zeros(n); kappa = np.zeros(n)
+    for r0, rows in iter_rows(tri, n):
+        r1 = r0 + len(rows)
+        # the zero diagonal only ever adds +0.0, which leaves a running sum unchanged
+        mean_phi[r0:r1] = np.cumsum(rows, axis=1)[:, -1] / d
+        dev = rows - mean_phi[r0:r1, None]
+        dev *= dev
+        dev[np.arange(r1 - r0), np.arange(r0, r1)] = 0.0
+        kappa[r0:r1] = np.cumsum(dev, axis=1)[:, -1]
+    return Phi, mean_phi, kappa
+
+def parse_shard(text):
+    """"K/M" -> (K, M) with 1 <= K <= M."""
+    m = re.fullmatch(r"(\d+)/(\d+)", text or "")
+    if not m or not 1 <= int(m[1]) <= int(m[2]):
+        raise argparse.ArgumentTypeError(f"expected K/M with 1 <= K <= M, got {text!r}")
+    return int(m[1]), int(m[2])
+
+def shard_span(total, k, m):
+    """[lo, hi) of the k-th (1-based) of m contiguous, near-equal blocks of range(total)."""
+    return total * (k - 1) // m, total * k // m
+
+def write_outputs(outdir, names, phi, phin, ev, label="", norm=False, fmt="both", cache_stats=None):
+    """phi_matrix.csv / phi_field.bin, kappa.csv and summary.json from the packed phi triangle; returns the summary."""
+    N = len(names)
+    counts = [e["count"] for e in ev]
+    with telemetry.stage("stats"):
+        Phi, mean_phi, kappa = field_stats(phi, N)
+        Phi_norm = seqsum(phin) if norm else 0.0
+    mean_phi, kappa = mean_phi.tolist(), kappa.tolist()
+
+    with telemetry.stage("write"):
+        outdir = Path(outdir); outdir.mkdir(parents=True, exist_ok=True)
+        if fmt in ("csv", "both"):
+            with (outdir / "phi_matrix.csv").open("w", encoding="ascii", newline="\n") as f:
+                f.write(",".join(["node"] + names) + "\n")
+                for r0, rows in iter_rows(phi, N):
+                    for i, row in enumerate(rows.tolist(), start=r0):
+                        f.write(",".join([names[i]] + [str(x) for x in row]) + "\n")
+        # written after the CSV so readers preferring the newer artifact pick it up
+        if fmt in ("bin", "both"):
+            write_field(outdir / FIELD_FILE, names, {"phi": phi, **({"phi_norm": phin} if norm else {})},
+                        meta={"label": label})
+        with (outdir / "kappa.csv").open("w", encoding="ascii", newline="\n") as f:
+            f.write("node,kappa,degree,mean_phi,event_count\n")
+            for i in range(N):
+                f.write(f"{names[i]},{kappa[i]},{N-1},{mean_phi[i]},{counts[i]}\n")
+        summary = {
+            "label": label,
+            "nodes": names,
+            "Phi": Phi,
+            **({"Phi_norm": Phi_norm} if norm else {}),
+            "kappa": {names[i]: kappa[i] for i in range(N)},
+            "mean_phi": {names[i]: mean_phi[i] for i in range(N)},
+            "event_counts": {names[i]: counts[i] for i in range(N)},
+            "event_stats": {names[i]: {k: ev[i][k] for k in ("bytes", "first_ts", "last_ts")} for i in range(N)},
+            **({"phi_cache": cache_stats} if cache_stats else {})
+        }
+        with (outdir / "summary.json").open("w", encoding="ascii", newline="\n") as f:
+            json.dump(summary, f, indent=2, sort_keys=True, ensure_ascii=True); f.write("\n")
+    return summary
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("nodes", nargs="+", help="node directories")
     ap.add_argument("--label", default="", help="tag/epoch label")
     ap.add_argument("--norm", action="store_true", help="compute normalized metrics too")
-    ap.add_argument("--script", default="horizon_ref.py", help="path to horizon_ref.py")
+    ap.add_argument("--script", default=None, help="external phi script following the horizon_ref.py CLI (default: in-process reference backend)")
+    ap.add_argument("--workers", type=int, default=None, help="--serve workers for --script (default: one per core; 0 = one subprocess per pair)")
+    ap.add_argument("--cache", nargs="?", const=DEFAULT_PATH, default=None,
+                    help=f"reuse per-pair phi values from an on-disk cache (default path: {DEFAULT_PATH})")
+    ap.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES, help="LRU size cap for --cache")
+    ap.add_argument("--events-cache", default=str(EVENTS_CACHE), help="per-file event count state for incremental rescans")
+    ap.add_argument("--no-events-cache", action="store_true", help="always rescan events.jsonl from the start")
     ap.add_argument("--outdir", default="tools/out", help="output dir for CSV/JSON")
+    ap.add_argument("--format", choices=("csv", "bin", "both"), default="both",
+                    help=f"phi matrix as phi_matrix.csv, binary {FIELD_FILE}, or both")
+    ap.add_argument("--shard", type=parse_shard, metavar="K/M",
+                    help=f"compute only block K of M of the pair space and write {SHARD_FILE.format(k='K', m='M')} (see merge-field)")
+    telemetry.add_arguments(ap)
     args = ap.parse_args()
+    telemetry.start("compute_field", args.profile)
 
-    script = Path(args.script).resolve()
     nodes  = [Path(n).resolve() for n in args.nodes]
     for n in nodes:
         if not (n / "charter.json").exists():
             sys.stderr.write(f"error: missing charter.json in {n}\n")
             sys.exit(1)
 
+    backend = get_backend(args.script, workers=args.workers)
+    cache = None
+    if args.cache:
+        cache = PhiCache(args.cache, args.cache_max_entries)
+        backend = CachedBackend(backend, cache)
+
     names = [n.name for n in nodes]
     N = len(nodes)
-    phi = [[0.0]*N for _ in range(N)]
-    phin = [[0.0]*N for _ in range(N)]
-    counts = [count_events(n) for n in nodes]
-
-    for i in range(N):
-        for j in range(i+1, N):
-            raw, normv = phi_between(script, nodes[i], nodes[j], norm=args.norm)
-            phi[i][j] = phi[j][i] = raw
-            phin[i][j] = phin[j][i] = normv
-
-    Phi = sum(phi[i][j] for i in range(N) for j in range(i+1, N))
-    Phi_norm = sum(phin[i][j] for i in range(N) for j in range(i+1, N)) if args.norm else 0.0
-
-    kappa = [0.0]*N
-    mean_phi = [0.0]*N
-    for i in range(N):
-        s = sum(phi[i][j] for j in range(N) if j != i)
-        d = N-1 if N>1 else 1
-        mean_phi[i] = s / d
-        kappa[i] = sum((phi[i][j] - mean_phi[i])**2 for j in range(N) if j != i)
-
-    outdir = Path(args.outdir); outdir.mkdir(parents=True, exist_ok=True)
-    with (outdir / "phi_matrix.csv").open("w", encoding="ascii", newline="\n") as f:
-        f.write(",".join(["node"] + names) + "\n")
-        for i in range(N):
-            f.write(",".join([names[i]] + [str(phi[i][j]) for j in range(N)]) + "\n")
-    with (outdir / "kappa.csv").open("w", encoding="ascii", newline="\n") as f:
-        f.write("node,kappa,degree,mean_phi,event_count\n")
-        for i in range(N):
-            f.write(f"{names[i]},{kappa[i]},{N-1},{mean_phi[i]},{counts[i]}\n")
-    summary = {
-        "label": args.label,
-        "nodes": names,
-        "Phi": Phi,
-        **({"Phi_norm": Phi_norm} if args.norm else {}),
-        "kappa": {names[i]: kappa[i] for i in range(N)},
-        "mean_phi": {names[i]: mean_phi[i] for i in range(N)},
-        "event_counts": {names[i]: counts[i] for i in range(N)}
-    }
-    with (outdir / "summary.json").open("w", encoding="ascii", newline="\n") as f:
-        json.dump(summary, f, indent=2, sort_keys=True, ensure_ascii=True); f.write("\n")
+    if args.shard:
+        k, m = args.shard
+        a, b = shard_span(N, k, m)
+        lo, hi = shard_span(n_pairs(N), k, m)
+    else:
+        a, b, lo, hi = 0, N, 0, n_pairs(N)
+    with telemetry.stage("events"):
+        ev = count_events_many(nodes[a:b], cache_path=None if args.no_events_cache else args.events_cache)
+
+    iu, ju = pair_range(N, lo, hi) if args.shard else triu(N)
+    with telemetry.stage("pairs"):
+        try:
+            phi, phin = backend.pairs(nodes, iu, ju, norm=args.norm)
+            # shards may only be merged if they all ran the same metric
+            fingerprint = getattr(backend, "backend", backend).fingerprint().hex() if args.shard else None
+        finally:
+            backend.close()
+    cache_stats = cache.stats() if cache else None
+
+    if args.shard:
+        path = Path(args.outdir) / SHARD_FILE.format(k=k, m=m)
+        with telemetry.stage("write"):
+            write_field(path, names, {"phi": phi, **({"phi_norm": phin} if args.norm else {})}, start=lo, count=hi - lo,
+                        meta={"label": args.label, "norm": args.norm, "backend": fingerprint,
+                              "shard": {"index": k, "of": m, "node_start": a, "node_count": b - a},
+                              "events": ev, **({"phi_cache": cache_stats} if cache_stats else {})})
+        print(json.dumps({"shard": f"{k}/{m}", "pairs": [lo, hi], "nodes": [a, b], "path": str(path)}, ensure_ascii=True))
+        return
+
+    summary = write_outputs(args.outdir, names, phi, phin, ev, args.label, args.norm, args.format, cache_stats)
     print(json.dumps(summary, sort_keys=True, ensure_ascii=True))
 
 if __name__ == "__main__":
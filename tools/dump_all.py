@@ -1,33 +1,116 @@
-import argparse, pathlib, subprocess, os, sys
+import argparse, pathlib, os, sys
+import collections, io, re, tarfile, tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 RUNS = ROOT / ".seventh_horizon" / "runs"
+sys.path.insert(0, str(ROOT))
+from tools.dump_run import COMPRESS, SUFFIX, add_bytes, add_dir_entry, add_run, collect_extras, open_compressed
+
+ARC_ROOT = "dump_all_runs"
+
+def _stamp(s: str) -> str:
+    # "epoch_20251014T103715Z", "20251014T103715Z" and "2025-10-14" all compare on the same digits
+    return re.sub(r"[^0-9A-Za-z]", "", s.removeprefix("epoch_")).upper()
+
+def select_runs(runs_dir=RUNS, since=None, last=None):
+    runs = [d for d in sorted(runs_dir.glob("epoch_*")) if d.is_dir()]
+    if since:
+        runs = [d for d in runs if _stamp(d.name) > _stamp(since)]
+    if last is not None:
+        runs = runs[-last:] if last > 0 else []
+    return runs
+
+def _fragment(tar_path, build):
+    # a tar member stream without the end-of-archive blocks, so fragments concatenate
+    with tarfile.open(tar_path, "w") as tar:
+        build(tar)
+        size = tar.offset
+    return size
+
+def _run_fragment(run_dir: str, tmp_dir: str):
+    """Pool worker: redact and archive one run into a temporary tar fragment."""
+    fd, path = tempfile.mkstemp(prefix=".dump_all_", suffix=".tar", dir=tmp_dir)
+    os.close(fd)
+    run = pathlib.Path(run_dir)
+    try:
+        return path, _fragment(path, lambda tar: add_run(tar, run, f"{ARC_ROOT}/{run.name}"))
+    except BaseException:
+        os.unlink(path)
+        raise
+
+def _copy_fragment(src, dst, size):
+    with open(src, "rb") as f:
+        while size:
+            b = f.read(min(size, 1 << 20))
+            if not b:
+                raise OSError(f"{src}: fragment truncated")
+            dst.write(b)
+            size -= len(b)
+
+def write_bundle(runs, out: pathlib.Path, extras: dict, compress="gz", level=None, jobs=None):
+    """One archive: shared env/system files, then each run in `runs` order, built in a process pool."""
+    head = io.BytesIO()
+    with tarfile.open(fileobj=head, mode="w") as tar:
+        add_dir_entry(tar, ARC_ROOT)
+        for name in sorted(extras):
+            add_bytes(tar, f"{ARC_ROOT}/{name}", extras[name].encode("utf-8"))
+        head_size = tar.offset
+    jobs = jobs or os.cpu_count() or 1
+    total = head_size
+    with open_compressed(out, compress, level) as z, ProcessPoolExecutor(max_workers=jobs) as ex:
+        z.write(head.getbuffer()[:head_size])
+        # keep at most 2*jobs fragments on disk ahead of the writer
+        pending, todo = collections.deque(), iter(runs)
+        def submit():
+            d = next(todo, None)
+            if d is not None:
+                pending.append((d, ex.submit(_run_fragment, str(d), str(out.parent))))
+        for _ in range(2 * jobs):
+            submit()
+        try:
+            while pending:
+                d, fut = pending[0]
+                path, size = fut.result()
+                pending.popleft()
+                try:
+                    _copy_fragment(path, z, size)
+                finally:
+                    os.unlink(path)
+                total += size
+                print(f"→ {d.name}")
+                submit()
+        finally:
+            for _, fut in pending:
+                if not fut.cancel() and fut.exception() is None:
+                    os.unlink(fut.result()[0])
+        # end-of-archive: two zero blocks, padded to a whole tar record
+        end = total + 2 * tarfile.BLOCKSIZE
+        z.write(b"\0" * (2 * tarfile.BLOCKSIZE + (-end) % tarfile.RECORDSIZE))
 
 def main():
-    ap = argparse.ArgumentParser(description="Dump all runs into a single tar.gz")
-    ap.add_argument("--out", default="./dump_all_runs.tar.gz", help="output tar.gz")
+    ap = argparse.ArgumentParser(description="Dump all runs into a single redacted tar archive")
+    ap.add_argument("--out", default=None, help="output archive (default ./dump_all_runs.tar.gz; suffix follows --compress)")
     ap.add_argument("--include-venv-freeze", action="store_true")
     ap.add_argument("--include-git-status", action="store_true")
+    ap.add_argument("--since", help="only epochs after this epoch id or timestamp (e.g. epoch_20251014T103727Z, 2025-10-14)")
+    ap.add_argument("--last", type=int, default=None, help="only the newest N epochs (after --since)")
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: cores)")
+    ap.add_argument("--compress", choices=COMPRESS, default="gz", help="compressor, as for dump-run")
+    ap.add_argument("--level", type=int, default=None, help="compression level (compressor default if omitted)")
     args = ap.parse_args()
 
-    # call dump-run for each epoch_* and pack outputs
-    dumps = []
-    for d in sorted(RUNS.glob("epoch_*")):
-        if not d.is_dir(): continue
-        out = f"./dump_{d.name}.tar.gz"
-        cmd = [sys.executable, "-m", "tools.dump_run", "--run-id", d.name, "--out", out]
-        if args.include_venv_freeze: cmd.append("--include-venv-freeze")
-        if args.include_git_status: cmd.append("--include-git-status")
-        print("→", " ".join(cmd))
-        subprocess.check_call(cmd)
-        dumps.append(out)
-
-    # bundle the per-run dumps
-    import tarfile
-    with tarfile.open(args.out, "w:gz") as tar:
-        for f in dumps:
-            tar.add(f, arcname=pathlib.Path(f).name)
-    print(f"✅ all runs bundle → {pathlib.Path(args.out).resolve()}")
+    runs = select_runs(RUNS, args.since, args.last)
+    if not runs:
+        sys.exit("No runs selected.")
+    out = pathlib.Path(args.out or f"./dump_all_runs{SUFFIX[args.compress]}").resolve()
+    extras = collect_extras(args.include_venv_freeze, args.include_git_status)
+    try:
+        write_bundle(runs, out, extras, args.compress, args.level, args.jobs)
+    except BaseException:
+        out.unlink(missing_ok=True)
+        raise
+    print(f"✅ all runs bundle → {out}")
 
 if __name__ == "__main__":
     main()
@@ -1,23 +1,90 @@
 #!/usr/bin/env python3
-import sys,re,json
-DATA=sys.stdin.read()
-def anyof(*ws): return any(re.search(r'\b'+re.escape(w)+r'\b',DATA,re.I) for w in ws)
-# Honor explicit markers if present
-if re.search(r'(?m)^#\s*path:\s+\S+',DATA): print(json.dumps({"mode":"explicit"})); sys.exit(0)
-target="misc"
-if anyof("kubebuilder","observatoryrun","controller-runtime","CRD","webhook"): target="observatory-operator"
-elif anyof("ansible","awx","playbook"): target="observatory-operator-lite"
-elif anyof("VEL_MANIFEST.schema.json","vel_validator","VEL"): target="vel"
-elif anyof("repro_auditor.py","repro ledger","deterministic") and "python" in DATA.lower(): target="repro-pack"
-elif anyof("governance_hash.sh","pin_actions.sh","audit_action_pins.sh","heartbeat","ascii-lint"): target="scripts"
-elif anyof("workflow_dispatch:","uses: actions/checkout","on: push","jobs:"): target=".github/workflows"
-elif anyof("Next.js","page.tsx","app/observer","timeline","public/field"): target="app/observer"
-elif anyof("phi_matrix","kappa","plot_field.py","compute_field.py","make_snapshot.py"): target="tools"
-print(json.dumps({"mode":"heuristic","target":target}))
+# Classify a code dump by keyword: one streaming pass over stdin with a single
+# compiled alternation (a prefix trie) of every keyword still able to change the answer.
+#
+# Results match the historical per-keyword scans of the whole text:
+#   an explicit "# path:" marker anywhere wins outright (and ends the scan);
+#   otherwise the first branch of TARGETS with a \bkeyword\b hit (re.I) wins,
+#   repro-pack additionally requiring "python" somewhere in the text.
+import functools,json,re,sys
 
+TARGETS=[
+  ("observatory-operator",("kubebuilder","observatoryrun","controller-runtime","CRD","webhook")),
+  ("observatory-operator-lite",("ansible","awx","playbook")),
+  ("vel",("VEL_MANIFEST.schema.json","vel_validator","VEL")),
+  ("repro-pack",("repro_auditor.py","repro ledger","deterministic")),
+  ("scripts",("governance_hash.sh","pin_actions.sh","audit_action_pins.sh","heartbeat","ascii-lint")),
+  (".github/workflows",("workflow_dispatch:","uses: actions/checkout","on: push","jobs:")),
+  ("app/observer",("Next.js","page.tsx","app/observer","timeline","public/field")),
+  ("tools",("phi_matrix","kappa","plot_field.py","compute_field.py","make_snapshot.py")),
+]
+NEEDS_PYTHON="repro-pack"
+CHUNK=1<<20
+MARKER=re.compile(r'(?m)^#\s*path:\s+\S')
+# a marker that may still complete in the next chunk: "#", whitespace, a prefix of "path:", whitespace
+PARTIAL=re.compile(r'(?m)^#\s*(?:p(?:a(?:t(?:h(?::\s*)?)?)?)?)?\Z')
+KEYWORDS=[w for _,ws in TARGETS for w in ws]
+SPAN=max(map(len,KEYWORDS+["python"]))+1  # tail kept so a cut keyword and its \b context reappear
+
+def _verdict(found):
+  for target,ws in TARGETS:
+    if any(w in found for w in ws) and (target!=NEEDS_PYTHON or "python" in found): return target
+  return "misc"
+
+def _pending(found):
+  """Keywords (and whether "python") that could still beat the current verdict."""
+  best=_verdict(found); ws=[]; py=False
+  for target,tws in TARGETS:
+    if target==best: break
+    ws+=[w for w in tws if w not in found]
+    py=py or (target==NEEDS_PYTHON and "python" not in found)
+  return tuple(ws),py
+
+def _trie(words):
+  # \bw1\b|\bw2\b|... factored on shared prefixes, so each position costs one branch per character
+  node={}
+  for w in words:
+    n=node
+    for ch in w.lower(): n=n.setdefault(ch,{})
+    n[""]=None
+  def rx(n):
+    alts=[r"\b" if ch=="" else re.escape(ch)+rx(n[ch]) for ch in sorted(n)]
+    return alts[0] if len(alts)==1 else "(?:"+"|".join(alts)+")"
+  return r"\b"+rx(node)
+
+@functools.lru_cache(maxsize=None)
+def _automaton(words):
+  """(pattern for lowercased ASCII text, case-insensitive pattern for anything else), or None."""
+  if not words: return None
+  p=_trie(words)
+  return re.compile(p),re.compile(p,re.I)
+
+def classify(stream,chunk=CHUNK):
+  """{"mode": "explicit"} or {"mode": "heuristic", "target": ...} for a text stream."""
+  found=set(); buf=""; base=0; eof=False
+  while not eof:
+    data=stream.read(chunk); eof=not data; buf+=data
+    if MARKER.search(buf,1 if base else 0): return {"mode":"explicit"}
+    words,py=_pending(found)
+    if py and "python" in buf.lower(): found.add("python"); words,py=_pending(found)
+    # ASCII text is lowercased once and scanned without IGNORECASE, which is much faster in re
+    fold=not buf.isascii(); text=buf if fold else buf.lower(); pos=0
+    while _automaton(words):
+      m=_automaton(words)[fold].search(text,pos)
+      if not m: break
+      # a hit at the buffer start lacks its left context (unless it is the stream start),
+      # one at the end lacks its right context (unless the stream ended); both reappear in the carry
+      if (m.start()==0 and base) or (m.end()==len(buf) and not eof): pos=m.start()+1; continue
+      found.add(next(w for w in words if re.fullmatch(re.escape(w),m.group(),re.I)))
+      words,py=_pending(found); pos=m.start()
+    keep=max(0,len(buf)-SPAN)
+    p=PARTIAL.search(buf,1 if base else 0)
+    if p: keep=min(keep,max(0,p.start()-1))  # keep the newline in front of a pending marker
+    base+=keep; buf=buf[keep:]
+  return {"mode":"heuristic","target":_verdict(found)}
 
 def main():
-    import sys; print('dump_classifier main placeholder')
+  print(json.dumps(classify(sys.stdin)))
 
 if __name__=='__main__':
-    main()
+  main()
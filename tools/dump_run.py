@@ -1,4 +1,5 @@
 import argparse, os, sys, tarfile, subprocess, datetime, re, pathlib, shutil, json
+import bz2, codecs, contextlib, gzip, io, lzma, time
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 RUNS = ROOT / ".seventh_horizon" / "runs"
@@ -13,16 +14,173 @@ def _safe(text: str) -> str:
         text = rx.sub(repl, text)
     return text
 
+# Chunked redaction: each REDACT pattern runs as its own streaming stage. Text
+# that could still grow into a match (a keyword prefix, a keyword waiting for
+# "=", or a value running up to the end of the buffer) is held back and joined
+# with the next chunk, and so is any complete match crossing that point, so a
+# cut never lands inside a match. The hold-back search looks at most HOLD_MAX
+# characters back; a single key/value run longer than that may be cut.
+def _prefixes(*words):
+    return "|".join(sorted({re.escape(w[:k]) for w in words for k in range(1, len(w) + 1)}, key=len, reverse=True))
+
+HOLD = [
+    re.compile(r'(?i)(?=[atsp])(?:(?:api[_-]?key|token|secret|password)\s*(?:=\s*[^ \n]*)?|'
+               + _prefixes("apikey", "api_key", "api-key", "token", "secret", "password") + r')\Z'),
+    re.compile(r'(?i)(?=b)(?:bearer(?:\s+[A-Za-z0-9\._\-]*)?|' + _prefixes("bearer") + r')\Z'),
+]
+HOLD_MAX = 1 << 16
+CHUNK = 1 << 20
+REDACT_FILES = {"stdall.log"}
+
+def _sub_stream(rx, repl, hold, chunks):
+    carry = ""
+    for chunk in chunks:
+        buf = carry + chunk
+        lo = max(0, len(buf) - HOLD_MAX)
+        m = hold.search(buf, lo)
+        cut = m.start() if m else len(buf)
+        # a complete match crossing the cut moves it back to that match's start
+        for m in rx.finditer(buf, max(0, cut - HOLD_MAX)):
+            if m.end() > cut:
+                cut = min(cut, m.start())
+                break
+        yield rx.sub(repl, buf[:cut])
+        carry = buf[cut:]
+    yield rx.sub(repl, carry)
+
+def safe_stream(chunks):
+    """Redact an iterable of text chunks; output joins to _safe("".join(chunks))."""
+    for (rx, repl), hold in zip(REDACT, HOLD):
+        chunks = _sub_stream(rx, repl, hold, chunks)
+    return chunks
+
+def _read_text(path, limit, chunk=None):
+    # same decoding as read_text(encoding="utf-8"), but bounded and lossless for bad bytes
+    dec = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")("surrogateescape"), translate=True)
+    with open(path, "rb") as f:
+        while limit > 0:
+            b = f.read(min(chunk or CHUNK, limit))
+            if not b:
+                break
+            limit -= len(b)
+            yield dec.decode(b)
+    yield dec.decode(b"", final=True)
+
+def _redacted_bytes(path, limit):
+    for t in safe_stream(_read_text(path, limit)):
+        yield t.encode("utf-8", "surrogateescape")
+
+class _GenReader(io.RawIOBase):
+    """Minimal read-only file object over an iterator of bytes (for tarfile.addfile)."""
+    def __init__(self, it):
+        self._it, self._buf = iter(it), b""
+    def readable(self):
+        return True
+    def readinto(self, b):
+        while not self._buf:
+            self._buf = next(self._it, None)
+            if self._buf is None:
+                self._buf = b""
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n], self._buf = self._buf[:n], self._buf[n:]
+        return n
+
+def add_redacted(tar, path, arcname):
+    """Two passes over `path`: size the redacted output, then stream it into the tar."""
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        ti = tar.gettarinfo(arcname=arcname, fileobj=f)
+    ti.size = sum(len(b) for b in _redacted_bytes(path, st.st_size))
+    tar.addfile(ti, io.BufferedReader(_GenReader(_redacted_bytes(path, st.st_size))))
+
+def add_bytes(tar, arcname, data: bytes, mode=0o644):
+    ti = tarfile.TarInfo(arcname)
+    ti.size, ti.mode, ti.mtime = len(data), mode, int(time.time())
+    tar.addfile(ti, io.BytesIO(data))
+
+def add_dir_entry(tar, arcname, src=None):
+    # from os.stat, so a symlinked directory is stored as the directory it points to
+    st = os.stat(src) if src else None
+    ti = tarfile.TarInfo(arcname)
+    ti.type = tarfile.DIRTYPE
+    ti.mode = st.st_mode & 0o7777 if st else 0o755
+    ti.mtime = int(st.st_mtime) if st else int(time.time())
+    if st:
+        ti.uid, ti.gid = st.st_uid, st.st_gid
+    tar.addfile(ti)
+
+def add_run(tar, run_dir: pathlib.Path, arcname: str):
+    """Stream a run directory into `tar`; symlinks are followed like shutil.copytree did."""
+    add_dir_entry(tar, arcname, run_dir)
+    for d, dirs, files in os.walk(run_dir, followlinks=True):
+        dirs.sort()
+        rel = pathlib.Path(d).relative_to(run_dir)
+        for name in sorted(dirs + files):
+            src = pathlib.Path(d) / name
+            arc = f"{arcname}/{(rel / name).as_posix()}"
+            if src.is_dir():
+                add_dir_entry(tar, arc, src)
+            elif d == str(run_dir) and name in REDACT_FILES:
+                add_redacted(tar, src, arc)
+            elif src.is_file():
+                with open(src, "rb") as f:
+                    tar.addfile(tar.gettarinfo(arcname=arc, fileobj=f), f)
+
+COMPRESS = ("gz", "pigz", "zst", "xz", "bz2", "none")
+SUFFIX = {"gz": ".tar.gz", "pigz": ".tar.gz", "zst": ".tar.zst", "xz": ".tar.xz", "bz2": ".tar.bz2", "none": ".tar"}
+
+@contextlib.contextmanager
+def _pipe(argv, raw):
+    exe = shutil.which(argv[0])
+    if not exe:
+        sys.exit(f"{argv[0]} not found on PATH")
+    proc = subprocess.Popen([exe, *argv[1:]], stdin=subprocess.PIPE, stdout=raw)
+    try:
+        yield proc.stdin
+    finally:
+        proc.stdin.close()
+        if proc.wait():
+            raise SystemExit(f"{argv[0]} exited with status {proc.returncode}")
+
+@contextlib.contextmanager
+def open_compressed(path: pathlib.Path, kind="gz", level=None):
+    """Binary write stream to `path` through the chosen compressor."""
+    with open(path, "wb") as raw:
+        if kind == "none":
+            yield raw
+        elif kind == "gz":
+            with gzip.GzipFile(filename=path.name, mode="wb", fileobj=raw, compresslevel=9 if level is None else level) as z:
+                yield z
+        elif kind == "bz2":
+            with bz2.BZ2File(raw, "wb", compresslevel=9 if level is None else level) as z:
+                yield z
+        elif kind == "xz":
+            with lzma.LZMAFile(raw, "wb", preset=level) as z:
+                yield z
+        elif kind == "pigz":
+            with _pipe(["pigz", "-c", f"-{6 if level is None else level}"], raw) as z:
+                yield z
+        elif kind == "zst":
+            try:
+                import zstandard
+            except ImportError:
+                zstandard = None
+            if zstandard:
+                with zstandard.ZstdCompressor(level=3 if level is None else level, threads=-1).stream_writer(raw, closefd=False) as z:
+                    yield z
+            else:
+                with _pipe(["zstd", "-q", "-c", "-T0", f"-{3 if level is None else level}"], raw) as z:
+                    yield z
+        else:
+            raise ValueError(f"unknown compressor {kind!r}")
+
 def _cmd(args, cwd=None):
     try:
         return subprocess.check_output(args, cwd=cwd, stderr=subprocess.STDOUT, text=True)
     except Exception as e:
         return f"[cmd error {args!r}: {e}]"
 
-def _write(path: pathlib.Path, content: str):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding="utf-8")
-
 def find_run(run_id: str|None):
     import os
     if run_id:
@@ -48,65 +206,70 @@ def find_run(run_id: str|None):
         sys.exit("No runs found.")
     return epochs[0]
 
-def make_archive(src_dir: pathlib.Path, out_path: pathlib.Path):
-    with tarfile.open(out_path, "w:gz") as tar:
-        tar.add(src_dir, arcname=src_dir.name)
-
-def main():
-    ap = argparse.ArgumentParser(description="Dump a Seventh Horizon run into a redacted tar.gz")
-    ap.add_argument("--run-id", help="epoch_* folder name; defaults to latest")
-    ap.add_argument("--out", help="output file path; default ./dump_<RUN_ID>.tar.gz")
-    ap.add_argument("--include-venv-freeze", action="store_true", help="capture pip freeze from current venv")
-    ap.add_argument("--include-git-status", action="store_true", help="capture git status/dirty state")
-    ap.add_argument("--force", action="store_true")
-    args = ap.parse_args()
-
-    run_dir = find_run(args.run_id)
-    run_id = run_dir.name
-    out = pathlib.Path(args.out) if args.out else pathlib.Path(f"./dump_{run_id}.tar.gz")
-
-    # Build a temp export dir
-    tmp = pathlib.Path(f"./.dump_tmp_{run_id}")
-    if tmp.exists(): shutil.rmtree(tmp)
-    tmp.mkdir(parents=True, exist_ok=True)
-
-    # Copy run dir
-    export_run = tmp / run_dir.name
-    shutil.copytree(run_dir, export_run)
+def make_archive(run_dir: pathlib.Path, out_path: pathlib.Path, extras: dict, compress="gz", level=None):
+    """Write the dump straight from `run_dir`; `extras` maps top-level file names to text."""
+    # keep the member layout of the old temp-dir archives: .dump_tmp_<id>/{<id>/..., env.txt, ...}
+    root = f".dump_tmp_{run_dir.name}"
+    with open_compressed(out_path, compress, level) as z, tarfile.open(fileobj=z, mode="w|") as tar:
+        add_dir_entry(tar, root)
+        for name in sorted([run_dir.name, *extras]):
+            if name == run_dir.name:
+                add_run(tar, run_dir, f"{root}/{name}")
+            else:
+                add_bytes(tar, f"{root}/{name}", extras[name].encode("utf-8"))
 
+def collect_extras(include_venv_freeze=False, include_git_status=False):
+    """env/system (and optional pip/git) text files that go next to the run in a dump."""
+    extras = {}
     # Capture environment snapshot
     env_txt = "\n".join(f"{k}={v}" for k,v in sorted(os.environ.items()))
-    _write(tmp / "env.txt", _safe(env_txt))
+    extras["env.txt"] = _safe(env_txt)
 
     # System + Python info
     sysinfo = []
     sysinfo.append(_cmd(["uname","-a"]))
     sysinfo.append(_cmd([sys.executable, "-V"]))
     sysinfo.append(_cmd([sys.executable, "-c", "import sys,platform;print(platform.platform());print(sys.version)"]))
-    _write(tmp / "system.txt", "\n".join(sysinfo))
+    extras["system.txt"] = "\n".join(sysinfo)
 
     # Optional: pip freeze
-    if args.include_venv_freeze:
-        _write(tmp / "pip_freeze.txt", _cmd([sys.executable, "-m", "pip", "freeze"]))
+    if include_venv_freeze:
+        extras["pip_freeze.txt"] = _cmd([sys.executable, "-m", "pip", "freeze"])
 
     # Optional: git status
-    if args.include_git_status:
+    if include_git_status:
         git = []
         git.append(_cmd(["git","rev-parse","--abbrev-ref","HEAD"]))
         git.append(_cmd(["git","rev-parse","--short","HEAD"]))
         git.append(_cmd(["git","status","--porcelain=v1"]))
-        _write(tmp / "git_status.txt", _safe("\n".join(git)))
+        extras["git_status.txt"] = _safe("\n".join(git))
+    return extras
 
-    # Redact stdall.log copy just in case
-    log = export_run / "stdall.log"
-    if log.exists():
-        log.write_text(_safe(log.read_text(encoding="utf-8")), encoding="utf-8")
+def main():
+    ap = argparse.ArgumentParser(description="Dump a Seventh Horizon run into a redacted tar archive")
+    ap.add_argument("--run-id", help="epoch_* folder name; defaults to latest")
+    ap.add_argument("--out", help="output file path; default ./dump_<RUN_ID>.tar.gz (suffix follows --compress)")
+    ap.add_argument("--include-venv-freeze", action="store_true", help="capture pip freeze from current venv")
+    ap.add_argument("--include-git-status", action="store_true", help="capture git status/dirty state")
+    ap.add_argument("--compress", choices=COMPRESS, default="gz",
+                    help="gz (default), pigz (multi-threaded gzip), zst (zstandard module or zstd binary), xz, bz2, none")
+    ap.add_argument("--level", type=int, default=None, help="compression level (compressor default if omitted)")
+    ap.add_argument("--force", action="store_true")
+    args = ap.parse_args()
+
+    run_dir = find_run(args.run_id)
+    run_id = run_dir.name
+    out = pathlib.Path(args.out) if args.out else pathlib.Path(f"./dump_{run_id}{SUFFIX[args.compress]}")
 
     out = out.resolve()
     if out.exists() and not args.force:
         sys.exit(f"Refusing to overwrite existing {out}. Use --force to override.")
-    make_archive(tmp, out)
-    shutil.rmtree(tmp)
+    extras = collect_extras(args.include_venv_freeze, args.include_git_status)
+    try:
+        make_archive(run_dir, out, extras, args.compress, args.level)
+    except BaseException:
+        out.unlink(missing_ok=True)
+        raise
     print(f"✅ dump created → {out}")
 
 if __name__ == "__main__":
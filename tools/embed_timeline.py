@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import argparse, json, os, sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tools import telemetry
+from tools.build_timeline_index import semver_key
+from tools.field_format import snapshot_matrix
+from tools.embedding import (MAX_ITER, TOL, deterministic_mds_2d, incremental_mds_2d,
+                             lock_embedding, raw_mds_2d)
+
+FIELD = Path("public/field/timeline")
+
+def load_snapshot(tag):
+    return json.loads((FIELD / f"{tag}.json").read_text(encoding="ascii"))
+
+def write_snapshot(tag, snap):
+    (FIELD / f"{tag}.json").write_text(json.dumps(snap, sort_keys=True, ensure_ascii=True, indent=2)+"\n", encoding="ascii")
+
+def all_tags():
+    return sorted((p.stem for p in FIELD.glob("v*.json")), key=semver_key)
+
+def previous_tags(tags):
+    """tag -> the tag before it in semver order (None for the first)."""
+    return {t: (tags[k-1] if k else None) for k, t in enumerate(tags)}
+
+def embed_one(snap, prev_embed, incremental=False, tol=TOL, max_iter=MAX_ITER):
+    """Embed one snapshot against the previous snapshot's embed block; returns (embed, info)."""
+    D, nodes = snapshot_matrix(snap, FIELD), snap["nodes"]
+    if incremental:
+        return incremental_mds_2d(D, nodes, prev_embed, tol=tol, max_iter=max_iter)
+    return deterministic_mds_2d(D, nodes, prev_embed), {}
+
+def _raw_job(tag):
+    # pool worker: the expensive, order-independent part of one tag's embedding
+    snap = load_snapshot(tag)
+    return snap["nodes"], raw_mds_2d(snapshot_matrix(snap, FIELD))
+
+def node_universe(node_lists):
+    """Sorted union of node names plus, per list, each node's column in that universe."""
+    universe = sorted(set().union(*map(set, node_lists))) if node_lists else []
+    col = {n: k for k, n in enumerate(universe)}
+    return universe, [[col[n] for n in nodes] for nodes in node_lists]
+
+def embed_batch(todo, prevs, jobs=None):
+    """Embed `todo` (semver order): raw MDS in a process pool, then _axis_lock8 chained in order."""
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as ex:
+        raws = list(ex.map(_raw_job, todo, chunksize=max(1, len(todo) // (4 * (jobs or os.cpu_count() or 1)))))
+    embeds = {}
+    for tag, (nodes, X) in zip(todo, raws):
+        prev = prevs[tag]
+        prev_embed = embeds[prev] if prev in embeds else (load_snapshot(prev).get("embed") if prev else None)
+        embeds[tag] = lock_embedding(X, nodes, prev_embed)
+    return embeds, [nodes for nodes, _ in raws]
+
+def write_universe(path, todo, embeds, node_lists):
+    universe, cols = node_universe(node_lists)
+    coords = {}
+    for tag, nodes, idx in zip(todo, node_lists, cols):
+        row = [None] * len(universe)
+        for name, k in zip(nodes, idx):
+            row[k] = embeds[tag][name]
+        coords[tag] = row
+    Path(path).write_text(json.dumps({"version": 1, "nodes": universe, "tags": todo, "coords": coords},
+                                     sort_keys=True, ensure_ascii=True) + "\n", encoding="ascii")
+
+def main():
+    ap = argparse.ArgumentParser(description="Recompute snapshot embeddings in public/field/timeline")
+    ap.add_argument("tags", nargs="*", help="tags to embed in semver order (default: latest tag)")
+    ap.add_argument("--all", action="store_true", help="embed every snapshot (full backfill)")
+    ap.add_argument("--jobs", type=int, default=None, help="process pool size for batch embedding (default: cores; 1 = sequential)")
+    ap.add_argument("--universe-out", help="also write all tags' coordinates aligned to the shared node universe")
+    ap.add_argument("--incremental", action="store_true", help="warm-start from the previous snapshot's embed")
+    ap.add_argument("--tol", type=float, default=TOL, help="relative eigenvalue tolerance for --incremental")
+    ap.add_argument("--max-iter", type=int, default=MAX_ITER, help="iteration cap for --incremental")
+    ap.add_argument("--write", action="store_true", help="store the new embed block in each snapshot")
+    telemetry.add_arguments(ap)
+    args = ap.parse_args()
+    telemetry.start("embed_timeline", args.profile)
+
+    tags = all_tags()
+    prevs = previous_tags(tags)
+    if not tags:
+        sys.exit(f"no snapshots under {FIELD}")
+    todo = tags if args.all else sorted(args.tags, key=semver_key) if args.tags else tags[-1:]
+    missing = [t for t in todo if t not in tags]
+    if missing:
+        sys.exit(f"unknown tags: {', '.join(missing)}")
+
+    with telemetry.stage("embed"):
+        if args.incremental or args.jobs == 1 or len(todo) == 1:
+            # warm starts chain tag to tag, so this path is inherently sequential
+            embeds, infos, node_lists = {}, {}, []
+            for tag in todo:
+                snap = load_snapshot(tag)
+                prev = prevs[tag]
+                prev_embed = embeds[prev] if prev in embeds else (load_snapshot(prev).get("embed") if prev else None)
+                embeds[tag], infos[tag] = embed_one(snap, prev_embed, args.incremental, args.tol, args.max_iter)
+                node_lists.append(snap["nodes"])
+        else:
+            embeds, node_lists = embed_batch(todo, prevs, args.jobs)
+            infos = {}
+
+    with telemetry.stage("write"):
+        for tag in todo:
+            if args.write:
+                snap = load_snapshot(tag)
+                if snap.get("embed") != embeds[tag]:
+                    snap["embed"] = embeds[tag]
+                    write_snapshot(tag, snap)
+            print(json.dumps({"tag": tag, "prev": prevs[tag], **infos.get(tag, {})}, sort_keys=True, ensure_ascii=True))
+        if args.universe_out:
+            write_universe(args.universe_out, todo, embeds, node_lists)
+
+if __name__ == "__main__":
+    main()
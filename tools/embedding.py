@@ -1,3 +1,4 @@
+import sys
 import numpy as np
 from .mds_tie_break import deterministic_rotate_first_snapshot
 from .constants import EPS
@@ -8,11 +9,163 @@ def _err_scaled(Z, prev):
     if s < 0: s = -s
     return float(((s * Z - prev) ** 2).sum())
 
+DENSE_MAX = 500        # auto: exact eigh up to here (keeps small fields bit-stable)
+LANDMARK_MIN = 20000   # auto: landmark MDS from here on
+LANDMARKS = 512
+SUBSPACE = 10          # 2 wanted eigenpairs + oversampling
+TOL = 1e-10            # Ritz value change between sweeps
+RES_TOL = 1e-9         # residual ||B v - w v|| of the top-2 pairs, relative to |w_1|
+MAX_ITER = 300
+LANCZOS_STEPS = 40     # for the lambda_min estimate behind the subspace shift
+
 def _double_center(D):
     n = D.shape[0]
     J = np.eye(n) - np.ones((n, n))/n
     return -0.5 * J @ (D**2) @ J
 
+def _double_center_inplace(M):
+    # B = -1/2 J D^2 J using row/column means; M is overwritten with B
+    M *= M
+    r = M.mean(axis=1)
+    c = M.mean(axis=0)
+    g = float(r.mean())
+    M -= r[:, None]
+    M -= c[None, :]
+    M += g
+    M *= -0.5
+    return M
+
+def _start_block(n, k):
+    # fixed seed: the same start block on every run and every machine
+    return np.random.default_rng(0x5EC7).standard_normal((n, k))
+
+def _shift(B, steps=LANCZOS_STEPS):
+    """-lambda_min(B) estimated by a short Lanczos run, or 0 when B looks positive semidefinite.
+
+    The smallest Ritz value of the Lanczos tridiagonal approaches lambda_min from
+    above and gets close quickly. It does not need to be exact: once the shift
+    exceeds (-lambda_min - lambda_2) / 2, no negative eigenvalue of B + shift*I
+    outweighs the second largest.
+    """
+    n = B.shape[0]
+    m = min(n, steps)
+    V = np.zeros((m, n))
+    alpha, beta = np.zeros(m), np.zeros(m)
+    v = _start_block(n, 1)[:, 0]
+    V[0] = v / np.linalg.norm(v)
+    for j in range(m):
+        w = B @ V[j]
+        alpha[j] = V[j] @ w
+        for _ in range(2):  # full reorthogonalisation, twice: m is small
+            w -= V[:j + 1].T @ (V[:j + 1] @ w)
+        beta[j] = np.linalg.norm(w)
+        # an invariant subspace (B of low rank): T already holds its eigenvalues
+        if j + 1 == m or beta[j] <= 1e-10 * max(np.abs(alpha[:j + 1]).max(), beta[:j].max(initial=0.0), EPS):
+            m = j + 1
+            break
+        V[j + 1] = w / beta[j]
+    T = np.diag(alpha[:m]) + np.diag(beta[:m - 1], 1) + np.diag(beta[:m - 1], -1)
+    return max(0.0, -float(np.linalg.eigvalsh(T)[0]))
+
+def _ritz(B, Q, shift=0.0):
+    Z = B @ Q
+    if shift:
+        Z += shift * Q
+    w, U = np.linalg.eigh((Q.T @ Z + Z.T @ Q) / 2)
+    order = np.argsort(w)[::-1]
+    return w[order], U[:, order], Z
+
+def _top2_subspace(B, Q=None, tol=TOL, max_iter=MAX_ITER, res_tol=RES_TOL):
+    """Top-2 eigenpairs of symmetric B by block subspace iteration with Rayleigh-Ritz.
+
+    Returns (w2, V2, iterations, converged). Q seeds the subspace (warm start);
+    it is padded with the deterministic start block up to SUBSPACE columns.
+    Subspace iteration finds the eigenvalues largest in magnitude, and a
+    double-centred phi field can have negative ones larger than its top two, so
+    it runs on B + sigma*I with sigma >= -lambda_min(B), which makes the
+    algebraically largest pairs dominant; the returned values are unshifted.
+    Converged means the top-2 Ritz values stopped moving (tol) and their vectors'
+    residuals are small (res_tol): values settle long before vectors when the
+    eigengap is small, as it is for noisy, non-Euclidean fields.
+    """
+    n = B.shape[0]
+    k = min(n, SUBSPACE)
+    sigma = _shift(B)
+    Q0 = _start_block(n, k)
+    if Q is not None:
+        Q0[:, :Q.shape[1]] = Q[:, :k]
+    Q, _ = np.linalg.qr(Q0)
+    prev = None
+    it, converged = 0, False
+    for it in range(1, max_iter + 1):
+        w, U, Z = _ritz(B, Q, sigma)
+        BV = Z @ U
+        top = w[:2] - sigma
+        scale = max(float(np.abs(top).max()), EPS)
+        done = prev is not None and float(np.abs(top - prev).max()) <= tol * scale
+        if done:
+            # (B + sigma) (Q U) = Z U, so the residuals cost no extra product with B
+            res = np.linalg.norm(BV[:, :2] - (Q @ U[:, :2]) * w[:2], axis=0)
+            done = float(res.max()) <= res_tol * scale
+        Q, _ = np.linalg.qr(BV)
+        if done:
+            converged = True
+            break
+        prev = top
+    w, U, _ = _ritz(B, Q)
+    return w[:2], (Q @ U)[:, :2], it, converged
+
+def _dense_top2(B):
+    w, V = np.linalg.eigh(B)
+    idx = np.argsort(w)[::-1]
+    return w[idx][:2], V[:, idx][:, :2]
+
+def _top2(B, Q=None, tol=TOL, max_iter=MAX_ITER):
+    """_top2_subspace, falling back to dense eigh when it does not converge; returns (w2, V2, iterations, converged)."""
+    w2, V2, it, converged = _top2_subspace(B, Q, tol=tol, max_iter=max_iter)
+    if not converged:
+        print(f"warning: subspace iteration did not converge in {it} sweeps (n={B.shape[0]}); using dense eigh",
+              file=sys.stderr)
+        w2, V2 = _dense_top2(B)
+    return w2, V2, it, converged
+
+def _classical(M, method):
+    """Top-2 (eigenvalues, eigenvectors) of the double-centered squared distances."""
+    if method == "dense":
+        return _dense_top2(_double_center(M))
+    # M is always a private copy here, so center it in place
+    w2, V2, _, _ = _top2(_double_center_inplace(M))
+    return w2, V2
+
+def _landmark_indices(n, m):
+    # evenly spaced over the node order: deterministic and O(1) to pick
+    return np.unique(np.linspace(0, n - 1, m).round().astype(np.intp))
+
+def _landmark_mds(M, landmarks=LANDMARKS):
+    """Landmark MDS (de Silva & Tenenbaum): classical MDS on L landmarks, triangulate the rest."""
+    n = M.shape[0]
+    L = _landmark_indices(n, min(n, landmarks))
+    return landmark_mds(lambda rows: M[np.ix_(rows, L)], n, L)
+
+def landmark_mds(cols, n, L):
+    """Landmark MDS from `cols(rows)` -> distances from `rows` to the landmarks `L` (len(rows)×len(L))."""
+    DL = cols(L)
+    DL2 = DL ** 2
+    w2, V2 = _classical(np.array(DL), "dense" if len(L) <= DENSE_MAX else "iterative")
+    w2 = np.clip(w2, 0, None)
+    inv = np.divide(1.0, np.sqrt(w2), out=np.zeros_like(w2), where=w2 > EPS)
+    mu = DL2.mean(axis=0)
+    # rows are (delta_a - mu) for every node a, in blocks to bound memory
+    X = np.empty((n, 2))
+    for s in range(0, n, 4096):
+        d2 = cols(np.arange(s, min(n, s + 4096))) ** 2
+        X[s:s + 4096] = -0.5 * (d2 - mu) @ V2 * inv
+    # triangulated coordinates are relative to the landmark centroid and axes;
+    # re-center and rotate onto the principal axes of the whole configuration
+    X -= X.mean(axis=0)
+    _, _, Vt = np.linalg.svd(X, full_matrices=False)
+    return X @ Vt.T
+
 def _sign_fix(X):
     Y = X.copy()
     for j in range(Y.shape[1]):
@@ -42,22 +195,17 @@ def _axis_lock8(Y, prev_coords, nodes):
                     best = (Y[:, [1,0]] if swap else Y) * np.array([sx, sy])
     return best
 
-def deterministic_mds_2d(D, nodes, prev=None):
-    import math
-    nodes = list(nodes)
-    n = len(nodes)
-    M = np.array(D, dtype=float)
-    if n == 0:
-        return {}
-    if n == 1:
-        return {nodes[0]: [0.0, 0.0]}
-    B = _double_center(M)
-    w, V = np.linalg.eigh(B)
-    idx = np.argsort(w)[::-1]
-    w2 = np.clip(w[idx][:2], 0, None)
-    V2 = V[:, idx][:, :2]
-    L = np.diag(np.sqrt(w2))
-    X = V2 @ L
+def _resolve_method(method, n):
+    if method not in ("auto", "dense", "iterative", "landmark"):
+        raise ValueError(f"unknown MDS method: {method}")
+    if method != "auto":
+        return method
+    if n <= DENSE_MAX:
+        return "dense"
+    return "iterative" if n < LANDMARK_MIN else "landmark"
+
+def lock_embedding(X, nodes, prev=None):
+    """Sign fix, then axis lock against prev (or the first-snapshot rotation), rounded to 4 dp."""
     X = _sign_fix(X)
     if prev:
         X = _axis_lock8(X, prev, nodes)
@@ -68,3 +216,58 @@ def deterministic_mds_2d(D, nodes, prev=None):
     for i, name in enumerate(nodes):
         out[name] = [float(f"{X[i, 0]:.4f}"), float(f"{X[i, 1]:.4f}")]
     return out
+
+def raw_mds_2d(D, method="auto"):
+    """Unlocked 2-D classical MDS coordinates (n×2); see deterministic_mds_2d for methods."""
+    M = np.array(D, dtype=float)
+    n = M.shape[0] if M.ndim == 2 else 0
+    if n < 2:
+        return np.zeros((n, 2))
+    method = _resolve_method(method, n)
+    if method == "landmark":
+        return _landmark_mds(M)
+    w2, V2 = _classical(M, method)
+    return V2 @ np.diag(np.sqrt(np.clip(w2, 0, None)))
+
+def deterministic_mds_2d(D, nodes, prev=None, method="auto"):
+    """2-D classical MDS with deterministic signs, rotation and axis lock.
+
+    method: "dense" (full eigh), "iterative" (in-place centering + top-2 subspace
+    iteration), "landmark" (landmark MDS for very large N) or "auto".
+    """
+    nodes = list(nodes)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: [0.0, 0.0]}
+    return lock_embedding(raw_mds_2d(D, method), nodes, prev)
+
+def _warm_block(nodes, prev):
+    # previous coordinates (centered) for carried-over nodes, zero rows for new ones
+    prev = prev or {}
+    idx = [i for i, name in enumerate(nodes) if name in prev]
+    if len(idx) < 2:
+        return None, len(idx)
+    Q = np.zeros((len(nodes), 2))
+    Q[idx] = [prev[nodes[i]][:2] for i in idx]
+    Q[idx] -= Q[idx].mean(axis=0)
+    return Q, len(idx)
+
+def incremental_mds_2d(D, nodes, prev, tol=TOL, max_iter=MAX_ITER):
+    """Warm-started MDS: seed subspace iteration with the previous snapshot's embed.
+
+    Returns (coords, info) with info = {"iterations", "converged", "warm_nodes"};
+    when the iteration does not converge the coordinates come from dense eigh.
+    Output goes through the same sign fix and axis lock as deterministic_mds_2d.
+    """
+    nodes = list(nodes)
+    n = len(nodes)
+    if n < 2:
+        return deterministic_mds_2d(D, nodes, prev), {"iterations": 0, "converged": True, "warm_nodes": 0}
+    Q, hit = _warm_block(nodes, prev)
+    B = _double_center_inplace(np.array(D, dtype=float))
+    w2, V2, it, converged = _top2(B, Q, tol=tol, max_iter=max_iter)
+    X = V2 @ np.diag(np.sqrt(np.clip(w2, 0, None)))
+    info = {"iterations": it, "converged": converged, "warm_nodes": hit}
+    return lock_embedding(X, nodes, prev), info
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# Binary field artifact: packed upper triangle(s) of float64 behind a JSON header.
+#
+#   bytes 0..7    magic b"HZFIELD1"
+#   bytes 8..11   header length H (uint32, little endian)
+#   bytes 12..    H bytes of ASCII JSON: nodes, dtype, arrays, start, count,
+#                 payload offset and sha256 of the payload
+#   offset..      one little-endian float64 block of `count` values per array,
+#                 aligned to ALIGN bytes so np.memmap views need no copy
+#
+# A full field has start=0 and count=N*(N-1)/2 in tools.packed order; shards
+# carry a contiguous [start, start+count) slice of that pair space.
+import hashlib, json, struct
+from pathlib import Path
+
+import numpy as np
+
+from tools import telemetry
+from tools.packed import n_pairs, to_dense
+
+MAGIC = b"HZFIELD1"
+VERSION = 1
+DTYPE = "<f8"
+ALIGN = 64
+FIELD_FILE = "phi_field.bin"
+
+class FieldFormatError(ValueError):
+    pass
+
+def write_field(path, nodes, arrays, start=0, count=None, meta=None):
+    """Write `arrays` ({name: packed float64 values}) for `nodes`; returns the header dict."""
+    nodes = [str(n) for n in nodes]
+    if count is None:
+        count = n_pairs(len(nodes)) - start
+    blocks = {}
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a, dtype=DTYPE)
+        if a.shape != (count,):
+            raise FieldFormatError(f"array {name!r} has shape {a.shape}, expected ({count},)")
+        blocks[name] = a
+    h = hashlib.sha256()
+    for a in blocks.values():
+        h.update(memoryview(a).cast("B")); telemetry.count("bytes_hashed", a.nbytes)
+    header = {"version": VERSION, "dtype": DTYPE, "layout": "triu-packed", "nodes": nodes,
+              "arrays": list(blocks), "start": start, "count": count,
+              "sha256": h.hexdigest(), **(meta or {})}
+    # the offset is part of the header, so settle it by iterating to a fixpoint
+    offset = 0
+    while True:
+        raw = json.dumps({**header, "offset": offset}, sort_keys=True, ensure_ascii=True).encode("ascii")
+        need = -(-(len(MAGIC) + 4 + len(raw)) // ALIGN) * ALIGN
+        if need == offset:
+            break
+        offset = need
+    header["offset"] = offset
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(raw)) + raw)
+        f.write(b"\0" * (offset - f.tell()))
+        for a in blocks.values():
+            f.write(memoryview(a).cast("B"))
+    return header
+
+def read_header(path):
+    with Path(path).open("rb") as f:
+        head = f.read(len(MAGIC) + 4)
+        if len(head) < len(MAGIC) + 4 or head[:len(MAGIC)] != MAGIC:
+            raise FieldFormatError(f"{path}: not a field file")
+        (size,) = struct.unpack("<I", head[len(MAGIC):])
+        try:
+            header = json.loads(f.read(size).decode("ascii"))
+        except ValueError as e:
+            raise FieldFormatError(f"{path}: corrupt header: {e}")
+    if header.get("version") != VERSION or header.get("dtype") != DTYPE:
+        raise FieldFormatError(f"{path}: unsupported field version/dtype")
+    return header
+
+class Field:
+    """Read-only view of a field file; arrays are zero-copy np.memmap slices."""
+
+    def __init__(self, path, verify=False):
+        self.path = Path(path)
+        self.header = read_header(self.path)
+        self.nodes = self.header["nodes"]
+        self.n = len(self.nodes)
+        self.start, self.count = self.header["start"], self.header["count"]
+        total = self.count * len(self.header["arrays"])
+        self._mm = np.memmap(self.path, dtype=DTYPE, mode="r", offset=self.header["offset"], shape=(total,)) \
+            if total else np.zeros(0, dtype=DTYPE)
+        if verify:
+            self.verify()
+
+    @property
+    def complete(self):
+        return self.start == 0 and self.count == n_pairs(self.n)
+
+    def array(self, name="phi"):
+        k = self.header["arrays"].index(name)
+        return self._mm[k * self.count:(k + 1) * self.count]
+
+    def dense(self, name="phi"):
+        if not self.complete:
+            raise FieldFormatError(f"{self.path}: partial field (pairs {self.start}..{self.start + self.count})")
+        return to_dense(self.array(name), self.n)
+
+    def verify(self):
+        h = hashlib.sha256(memoryview(np.ascontiguousarray(self._mm)).cast("B")).hexdigest()
+        telemetry.count("bytes_hashed", self._mm.nbytes)
+        if h != self.header["sha256"]:
+            raise FieldFormatError(f"{self.path}: payload sha256 mismatch")
+
+def read_field(path, verify=False):
+    return Field(path, verify=verify)
+
+def preferred_field(outdir, csv_name="phi_matrix.csv"):
+    """The binary field in outdir if it exists and is at least as new as the CSV export."""
+    b, c = Path(outdir) / FIELD_FILE, Path(outdir) / csv_name
+    if not b.exists():
+        return None
+    if c.exists() and c.stat().st_mtime_ns > b.stat().st_mtime_ns:
+        return None
+    return b
+
+def snapshot_matrix(snap, base_dir):
+    """phi matrix of a timeline snapshot: inline `phi_matrix`, or a `phi_field` file next to it."""
+    ref = snap.get("phi_field")
+    if ref and not snap.get("phi_matrix"):
+        f = read_field(Path(base_dir) / ref)
+        if f.nodes != list(snap.get("nodes") or []):
+            raise FieldFormatError(f"{ref}: nodes do not match snapshot nodes")
+        return f.dense()
+    return snap.get("phi_matrix") or []
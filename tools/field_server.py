@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# Timeline field server: JSON endpoints over public/field plus static files.
+#
+#   GET /api/index                       timeline.index.json
+#   GET /api/tags/<tag>                  one snapshot, byte-for-byte
+#   GET /api/range?from=<tag>&to=<tag>   {"tags": [snapshot, ...]} in index order, inclusive
+#   GET /api/nodes/<node>/series[?from=&to=]
+#                                        per-tag Phi, mean_phi and kappa of one node
+#                                        (from timeline.store when it is current)
+#   GET /<path>                          static file under the server root; a directory
+#                                        serves its index.html, else an http.server-style
+#                                        listing (the dashboard's runs browser reads one)
+#
+# Snapshots are kept in an LRU; their gzip (and brotli, if installed) encodings
+# are built on the first request that accepts one, in a worker thread so the
+# event loop keeps serving, and kept with the snapshot. Range and series bodies
+# are computed per request, so they are only gzipped per request (and the
+# snapshots they read are never compressed). ETags are strong: the snapshot's
+# sha256 (the index's snapshot_sha256), suffixed per encoding; If-None-Match
+# answers 304.
+import argparse, asyncio, gzip, hashlib, html, json, mimetypes, sys
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.timeline_store import StoreError, TimelineStore
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FIELD = Path("public/field")
+LRU_SIZE = 256
+STATIC_MAX = 8 << 20  # static files above this are read per request, not cached
+BROTLI_QUALITY = 5   # the default (11) costs ~10x the CPU of gzip -9 for a few % smaller bodies
+PER_REQUEST_MIN = 1024  # per-request bodies smaller than this are sent uncompressed
+REASONS = {200: "OK", 301: "Moved Permanently", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+class Entity:
+    """A response body with its strong ETag and lazily built encodings.
+
+    compress="cached" keeps each encoding once built (gzip -9, brotli if installed);
+    "per-request" gzips bodies above PER_REQUEST_MIN afresh each time; None never compresses.
+    """
+
+    def __init__(self, body: bytes, tag: str, ctype="application/json", compress="cached"):
+        self.body, self.tag, self.ctype, self.compress = body, tag, ctype, compress
+        self.enc = {}
+        if compress == "cached":
+            self.codings = ("br", "gzip") if brotli else ("gzip",)
+        elif compress == "per-request" and len(body) > PER_REQUEST_MIN:
+            self.codings = ("gzip",)
+        else:
+            self.codings = ()
+
+    def etag(self, coding=None):
+        return f'"{self.tag}-{coding}"' if coding else f'"{self.tag}"'
+
+    def negotiate(self, accept):
+        """The coding to send for an Accept-Encoding header value, or None."""
+        offered = {c.split(";")[0].strip().lower() for c in (accept or "").split(",")}
+        return next((c for c in self.codings if c in offered), None)
+
+    def ready(self, coding):
+        return coding is None or coding in self.enc
+
+    def payload(self, coding=None):
+        """The body in `coding`, compressing (and, for cached entities, keeping) it if needed."""
+        if coding is None:
+            return self.body
+        out = self.enc.get(coding)
+        if out is None:
+            if coding == "br":
+                out = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            else:
+                out = gzip.compress(self.body, 9 if self.compress == "cached" else 6, mtime=0)
+            if self.compress == "cached":
+                self.enc[coding] = out
+        return out
+
+def _stat_key(p: Path):
+    st = p.stat()
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+def _etag_matches(header, entity):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return any(entity.etag(c) in tags for c in (None, "gzip", "br"))
+
+class FieldStore:
+    """Index and snapshot access with stat-checked reloads and an LRU of parsed snapshots."""
+
+    def __init__(self, field=FIELD, lru_size=LRU_SIZE):
+        self.field = Path(field)
+        self.lru_size = lru_size
+        self.snaps = OrderedDict()  # tag -> (stat key, Entity, parsed dict)
+        self._index = None
+        self.hits = self.misses = 0
+
+    @property
+    def index_path(self):
+        return self.field / "timeline.index.json"
+
+    def index(self):
+        """(Entity, parsed index); reloaded when the file changes."""
+        key = _stat_key(self.index_path)
+        if self._index is None or self._index[0] != key:
+            raw = self.index_path.read_bytes()
+            idx = json.loads(raw.decode("ascii"))
+            tag = idx.get("chain_root") or hashlib.sha256(raw).hexdigest()
+            self._index = (key, Entity(raw, tag), idx)
+        return self._index[1], self._index[2]
+
+    def tags(self):
+        return [e["tag"] for e in self.index()[1].get("tags", [])]
+
+    def snapshot(self, tag):
+        """(Entity, parsed snapshot) for `tag`, or None if there is no such snapshot."""
+        p = self.field / "timeline" / f"{tag}.json"
+        if "/" in tag or "\\" in tag or not p.is_file():
+            return None
+        key = _stat_key(p)
+        hit = self.snaps.get(tag)
+        if hit and hit[0] == key:
+            self.hits += 1
+            self.snaps.move_to_end(tag)
+            return hit[1], hit[2]
+        self.misses += 1
+        raw = p.read_bytes()
+        ent = Entity(raw, hashlib.sha256(raw).hexdigest())
+        self.snaps[tag] = (key, ent, json.loads(raw.decode("ascii")))
+        self.snaps.move_to_end(tag)
+        while len(self.snaps) > self.lru_size:
+            self.snaps.popitem(last=False)
+        return ent, self.snaps[tag][2]
+
+    def select(self, lo=None, hi=None):
+        """Index tags from `lo` to `hi` inclusive (either end open); None if a bound is unknown."""
+        tags = self.tags()
+        try:
+            a = tags.index(lo) if lo else 0
+            b = tags.index(hi) + 1 if hi else len(tags)
+        except ValueError:
+            return None
+        return tags[a:b]
+
+    def range(self, lo=None, hi=None):
+        tags = self.select(lo, hi)
+        if tags is None:
+            return None
+        parts = [self.snapshot(t) for t in tags]
+        if any(p is None for p in parts):
+            return None
+        etag = hashlib.sha256("\n".join(["range", *(e.tag for e, _ in parts)]).encode("ascii")).hexdigest()
+        # splice the stored bytes; no re-serialisation of the snapshots
+        body = b'{"tags": [' + b", ".join(e.body.rstrip() for e, _ in parts) + b"]}\n"
+        return Entity(body, etag, compress="per-request")
+
+    def _store_series(self, node, tags):
+        # columnar store, when it covers exactly the current index
+        try:
+            st = TimelineStore(self.field / "timeline.store")
+        except StoreError:
+            return None
+        entries = self.index()[1].get("tags", [])
+        if st.header["sha256"] != [e["snapshot_sha256"] for e in entries]:
+            return None
+        a = st.tags.index(tags[0]) if tags else 0
+        sl = slice(a, a + len(tags))
+        def col(name):
+            if node not in st.nodes:
+                return [None] * len(tags)
+            return [None if v != v else v for v in st.series(name, node)[sl].tolist()]
+        return {"node": node, "tags": tags, "tag_date_utc": [e.get("tag_date_utc") for e in entries[sl]],
+                "Phi": [None if v != v else v for v in st.series("Phi")[sl].tolist()],
+                "mean_phi": col("mean_phi"), "kappa": col("kappa")}, ["series-store", node, *st.header["sha256"][sl]]
+
+    def series(self, node, lo=None, hi=None):
+        tags = self.select(lo, hi)
+        if tags is None:
+            return None
+        got = self._store_series(node, tags)
+        if got:
+            out, shas = got
+            body = (json.dumps(out, sort_keys=True, ensure_ascii=True) + "\n").encode("ascii")
+            return Entity(body, hashlib.sha256("\n".join(shas).encode("utf-8")).hexdigest(), compress="per-request")
+        # a different ETag namespace from the store path: the two bodies need not be byte-identical
+        out = {"node": node, "tags": [], "tag_date_utc": [], "Phi": [], "mean_phi": [], "kappa": []}
+        shas = ["series-snapshots", node]
+        for t in tags:
+            got = self.snapshot(t)
+            if got is None:
+                return None
+            ent, snap = got
+            shas.append(ent.tag)
+            out["tags"].append(t)
+            out["tag_date_utc"].append(snap.get("tag_date_utc"))
+            out["Phi"].append(snap.get("Phi"))
+            out["mean_phi"].append((snap.get("mean_phi") or {}).get(node))
+            out["kappa"].append((snap.get("kappa") or {}).get(node))
+        body = (json.dumps(out, sort_keys=True, ensure_ascii=True) + "\n").encode("ascii")
+        return Entity(body, hashlib.sha256("\n".join(shas).encode("utf-8")).hexdigest(), compress="per-request")
+
+class FieldServer:
+    def __init__(self, root=".", field=FIELD, lru_size=LRU_SIZE):
+        self.root = Path(root).resolve()
+        self.store = FieldStore(self.root / field, lru_size)
+        self.static = OrderedDict()  # path -> (stat key, Entity)
+
+    def route(self, path, query):
+        """Entity for a request path, an int status on failure, or (301, location) for a directory without its slash."""
+        q = {k: v[-1] for k, v in parse_qs(query).items()}
+        parts = [unquote(p) for p in path.split("/") if p]
+        if parts[:1] == ["api"]:
+            rest = parts[1:]
+            if rest == ["index"]:
+                return self.store.index()[0]
+            if len(rest) == 2 and rest[0] == "tags":
+                got = self.store.snapshot(rest[1])
+                return got[0] if got else 404
+            if rest == ["range"]:
+                return self.store.range(q.get("from"), q.get("to")) or 404
+            if len(rest) == 3 and rest[0] == "nodes" and rest[2] == "series":
+                return self.store.series(rest[1], q.get("from"), q.get("to")) or 404
+            return 404
+        return self.static_file(parts, path, query)
+
+    def static_file(self, parts, path="/", query=""):
+        p = (self.root.joinpath(*parts)).resolve() if parts else self.root
+        if p != self.root and self.root not in p.parents:
+            return 404
+        if p.is_dir():
+            if not path.endswith("/"):
+                # as http.server: relative links in the page resolve against the slashed URL
+                return 301, path + "/" + (f"?{query}" if query else "")
+            if not (p / "index.html").is_file():
+                return self.listing(p, path)
+            p = p / "index.html"
+        if not p.is_file():
+            return 404
+        key = _stat_key(p)
+        hit = self.static.get(p)
+        if hit and hit[0] == key:
+            self.static.move_to_end(p)
+            return hit[1]
+        ctype = mimetypes.guess_type(p.name)[0] or "application/octet-stream"
+        compressible = ctype.startswith("text/") or ctype in ("application/json", "application/javascript", "image/svg+xml")
+        ent = Entity(p.read_bytes(), "%x-%x-%x" % key, ctype, compress="cached" if compressible and key[0] <= STATIC_MAX else None)
+        if key[0] <= STATIC_MAX:
+            self.static[p] = (key, ent)
+            while len(self.static) > self.store.lru_size:
+                self.static.popitem(last=False)
+        return ent
+
+    def listing(self, d: Path, path):
+        """Directory listing in http.server's markup: one <a href="name/"> per entry, directories slashed."""
+        title = html.escape(f"Directory listing for {unquote(path)}", quote=False)
+        items = []
+        for e in sorted(d.iterdir(), key=lambda e: e.name.lower()):
+            name = e.name + ("/" if e.is_dir() else "@" if e.is_symlink() else "")
+            link = e.name + ("/" if e.is_dir() else "")
+            items.append(f'<li><a href="{quote(link, errors="surrogatepass")}">{html.escape(name, quote=False)}</a></li>')
+        body = "\n".join(['<!DOCTYPE HTML>', '<html lang="en">', '<head>', '<meta charset="utf-8">',
+                          f'<title>{title}</title>', '</head>', '<body>', f'<h1>{title}</h1>', '<hr>', '<ul>',
+                          *items, '</ul>', '<hr>', '</body>', '</html>', '']).encode("utf-8", "surrogateescape")
+        return Entity(body, hashlib.sha256(body).hexdigest(), "text/html; charset=utf-8", compress="per-request")
+
+    def prepare(self, method, target, headers):
+        """(status, headers, body or None, Entity or None, coding) for one request; `headers` keys are lower-case.
+
+        A None body still has to be produced by ent.payload(coding).
+        """
+        if method not in ("GET", "HEAD"):
+            return 405, {"Allow": "GET, HEAD"}, b"", None, None
+        url = urlsplit(target)
+        try:
+            ent = self.route(url.path, url.query)
+        except (OSError, ValueError):
+            ent = 404
+        if isinstance(ent, tuple):
+            return ent[0], {"Location": ent[1]}, b"", None, None
+        if isinstance(ent, int):
+            body = (json.dumps({"error": REASONS[ent]}) + "\n").encode("ascii")
+            return ent, {"Content-Type": "application/json"}, body, None, None
+        coding = ent.negotiate(headers.get("accept-encoding"))
+        out = {"Content-Type": ent.ctype, "ETag": ent.etag(coding), "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if coding:
+            out["Content-Encoding"] = coding
+        if _etag_matches(headers.get("if-none-match"), ent):
+            return 304, out, b"", None, None
+        return 200, out, None, ent, coding
+
+    def respond(self, method, target, headers):
+        """(status, headers, body) for one request, compressing in the calling thread."""
+        status, out, body, ent, coding = self.prepare(method, target, headers)
+        return status, out, body if ent is None else ent.payload(coding)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                status, out, body, ent, coding = self.prepare(method, target, headers)
+                if ent is not None:
+                    # compression runs off the event loop; a cached encoding is sent as is
+                    body = ent.payload(coding) if ent.ready(coding) else \
+                        await asyncio.get_running_loop().run_in_executor(None, ent.payload, coding)
+                conn = headers.get("connection", "").lower()
+                keep = conn == "keep-alive" if version == "HTTP/1.0" else conn != "close"
+                # a 304 has no body and must not claim a length for one
+                head = [f"HTTP/1.1 {status} {REASONS[status]}", *([] if status == 304 else [f"Content-Length: {len(body)}"]),
+                        f"Connection: {'keep-alive' if keep else 'close'}", *(f"{k}: {v}" for k, v in out.items())]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host, port, root=".", lru_size=LRU_SIZE, ready=None):
+    app = FieldServer(root, lru_size=lru_size)
+    server = await asyncio.start_server(app.handle, host, port)
+    if ready:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the timeline API and static files (replaces python -m http.server)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--root", default=".", help="directory served for static paths (default: cwd)")
+    ap.add_argument("--lru", type=int, default=LRU_SIZE, help="snapshots/static files kept in memory")
+    args = ap.parse_args()
+    print(f"serving {Path(args.root).resolve()} on http://{args.host}:{args.port}/ (brotli: {'yes' if brotli else 'no'})", flush=True)
+    try:
+        asyncio.run(serve(args.host, args.port, args.root, args.lru))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
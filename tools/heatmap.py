@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# Large-N phi heatmaps: block aggregation of the packed field onto a pixel grid,
+# node orderings that bring structure together, and a tile pyramid.
+#
+# Node k of the chosen order lands in bin k*m//n of an m-bin grid (m <= n), so
+# every bin covers ceil(n/m) or floor(n/m) nodes; rows stream through
+# packed.row_block and the N×N matrix is never materialized.
+import numpy as np
+from tools.embedding import _landmark_indices, _sign_fix, landmark_mds, LANDMARKS
+from tools.packed import gather, iter_rows
+
+AGGS = ("mean", "max")
+ORDERS = ("none", "mds", "cluster")
+TILE = 256
+MAX_PX = 4096   # finest pyramid level; three float64 grids of this size stay under 400 MB
+
+def _bins(n, m, order):
+    pos = np.arange(n, dtype=np.int64)
+    if order is not None:
+        pos[order] = np.arange(n, dtype=np.int64)
+    return pos * m // n
+
+def block_sums(tri, n, m, order=None):
+    """(sum, max, count) grids (m×m) of the matrix in `order`, node k of the order in bin k*m//n."""
+    m = max(1, min(n, m))
+    bins = _bins(n, m, order)
+    starts = -(-np.arange(m, dtype=np.int64) * n // m)
+    cnt = np.diff(np.append(starts, n))
+    S = np.zeros((m, m)); X = np.full((m, m), -np.inf)
+    for r0, R in iter_rows(tri, n):
+        if order is not None:
+            R = R[:, order]
+        rb = bins[r0:r0 + len(R)]
+        np.add.at(S, rb, np.add.reduceat(R, starts, axis=1))
+        np.maximum.at(X, rb, np.maximum.reduceat(R, starts, axis=1))
+    return S, X, np.outer(cnt, cnt).astype(float)
+
+def block_reduce(tri, n, m, order=None, agg="mean"):
+    """The m×m image of the field: block mean or max over each bin pair."""
+    if agg not in AGGS:
+        raise ValueError(f"unknown aggregation: {agg}")
+    S, X, K = block_sums(tri, n, m, order)
+    return S / K if agg == "mean" else X
+
+def _kmeans(X, k, iters=25):
+    # deterministic: seeds evenly spaced along the first axis, no random restarts
+    idx = np.argsort(X[:, 0], kind="stable")
+    C = X[idx[(np.arange(k) * len(X)) // k]].copy()
+    lab = None
+    for _ in range(iters):
+        new = np.argmin(((X[:, None, :] - C[None, :, :]) ** 2).sum(axis=2), axis=1)
+        if lab is not None and np.array_equal(new, lab):
+            break
+        lab = new
+        for j in range(k):
+            sel = lab == j
+            if sel.any():
+                C[j] = X[sel].mean(axis=0)
+    return lab, C
+
+def node_order(tri, n, how="mds", landmarks=LANDMARKS):
+    """Permutation of 0..n-1 (None for "none"): sorted along the first MDS axis, or by
+    k-means cluster on the 2-D MDS coordinates, clusters laid out along that axis."""
+    if how not in ORDERS:
+        raise ValueError(f"unknown node order: {how}")
+    if how == "none" or n < 3:
+        return None
+    L = _landmark_indices(n, min(n, landmarks))
+    X = _sign_fix(landmark_mds(lambda rows: gather(tri, n, rows, L), n, L))
+    if how == "mds":
+        return np.argsort(X[:, 0], kind="stable")
+    k = max(1, min(64, int(np.sqrt(n))))
+    lab, C = _kmeans(X, k)
+    rank = np.empty(k, dtype=np.int64)
+    rank[np.argsort(C[:, 0], kind="stable")] = np.arange(k)
+    return np.lexsort((np.arange(n), X[:, 0], rank[lab]))
+
+def _coarsen(S, X, K):
+    # merge 2×2 bin blocks; odd edges pad with empty bins
+    m = S.shape[0]
+    p = m % 2
+    S, K = (np.pad(a, ((0, p), (0, p))) for a in (S, K))
+    X = np.pad(X, ((0, p), (0, p)), constant_values=-np.inf)
+    h = (m + p) // 2
+    f = lambda a, op: op(op(a.reshape(h, 2, h, 2), axis=3), axis=1)
+    return f(S, np.sum), f(X, np.max), f(K, np.sum)
+
+def pyramid(tri, n, order=None, agg="mean", tile=TILE, max_px=MAX_PX):
+    """Images of every zoom level, coarsest (fits one tile) first; each level merges 2×2 bins of the next."""
+    if agg not in AGGS:
+        raise ValueError(f"unknown aggregation: {agg}")
+    S, X, K = block_sums(tri, n, min(n, max_px), order)
+    levels = [S / K if agg == "mean" else X]
+    while levels[-1].shape[0] > tile:
+        S, X, K = _coarsen(S, X, K)
+        levels.append(S / K if agg == "mean" else X)
+    return levels[::-1]
+
+def tiles(img, tile=TILE):
+    """(ty, tx, block) for every tile of one level image, row-major."""
+    m = img.shape[0]
+    for ty in range(0, m, tile):
+        for tx in range(0, m, tile):
+            yield ty // tile, tx // tile, img[ty:ty + tile, tx:tx + tile]
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# Ingest a code dump from stdin (what scripts/ingest_dump.sh used to do with awk and find).
+#
+# A dump with "# path: <file>" lines is split in one streaming pass: each marker
+# starts <file> (parents created as needed; trailing whitespace and CR dropped
+# from the name) with a blank first line, and every following line is copied
+# until the next marker; lines before the first marker are dropped, and a path
+# that appears twice keeps its last section. Any other
+# dump is classified (tools.dump_classifier) and copied whole to that module's
+# drop file. Only the files written are then checked: CR bytes are stripped and
+# any byte outside printable ASCII (0x20-0x7E, plus newline) is an error.
+# --normalize-all extends the check to every file under the root.
+import argparse, io, os, re, shutil, sys, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tools.dump_classifier import classify
+
+# grep -E '^#\s*path:\s+' decided whether a dump is split; awk split on the stricter form
+ANY_MARKER = re.compile(rb"#\s*path:\s+")
+MARKER = re.compile(rb"# path:[ \t\n\r\f\v]+")
+DROPS = {
+    "observatory-operator": "observatory-operator/README_DROP.md",
+    "observatory-operator-lite": "observatory-operator-lite/README_DROP.md",
+    "vel": "vel/README_DROP.md",
+    "repro-pack": "repro-pack/README_DROP.md",
+    "scripts": "scripts/DROP.sh",
+    ".github/workflows": ".github/workflows/drop.yml",
+    "app/observer": "app/observer/timeline/DROP.txt",
+    "tools": "tools/DROP.txt",
+}
+DEFAULT_DROP = "drops/DROP.txt"
+OK_BYTES = bytes(range(0x20, 0x7F)) + b"\n"
+EXECUTABLE = re.compile(r"(.*\.sh|scripts/[^/]*\.py|tools/[^/]*\.py)")
+CHUNK = 1 << 20
+
+class IngestError(ValueError):
+    pass
+
+def _target(root: Path, name: bytes) -> Path:
+    rel = os.fsdecode(name)
+    parts = Path(rel).parts
+    if not rel or Path(rel).is_absolute() or ".." in parts:
+        raise IngestError(f"refusing dump path outside the tree: {rel!r}")
+    return root / rel
+
+def split_dump(stream, root=".", spool=None):
+    """Write the "# path:" sections of a binary stream under root; returns (split?, written paths).
+
+    Lines are also copied to `spool` (if given) until the dump turns out to be split,
+    so a dump without markers can be filed whole.
+    """
+    root = Path(root)
+    written, made, out, split = [], set(), None, False
+    try:
+        for line in stream:
+            body = line[:-1] if line.endswith(b"\n") else line
+            split = split or ANY_MARKER.match(body) is not None
+            if spool is not None and not split:
+                spool.write(line)
+            m = MARKER.match(body)
+            if m:
+                if out:
+                    out.close()
+                p = _target(root, body[m.end():].rstrip())  # CRLF dumps: no "\r" in file names
+                if p.parent not in made:
+                    p.parent.mkdir(parents=True, exist_ok=True); made.add(p.parent)
+                out = open(p, "wb")
+                out.write(b"\n")
+                if p not in written:
+                    written.append(p)
+            elif out:
+                out.write(body + b"\n")
+    finally:
+        if out:
+            out.close()
+    return split, written
+
+def file_dump(spool, root=".", classify_fn=classify):
+    """Copy an unsplit dump to the drop file of its classified target; returns that path."""
+    spool.seek(0)
+    text = io.TextIOWrapper(spool, encoding="utf-8", errors="surrogateescape")
+    try:
+        target = classify_fn(text).get("target")
+    finally:
+        text.detach()
+    p = Path(root) / DROPS.get(target, DEFAULT_DROP)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    spool.seek(0)
+    with open(p, "wb") as f:
+        shutil.copyfileobj(spool, f, CHUNK)
+    return p
+
+def check_file(path: Path):
+    """One bytes scan: strip CR in place if present; return True if the rest is printable ASCII."""
+    has_cr, ascii_ok = False, True
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(CHUNK), b""):
+            rest = b.translate(None, OK_BYTES)
+            if rest:
+                has_cr = has_cr or b"\r" in rest
+                ascii_ok = ascii_ok and not rest.replace(b"\r", b"")
+    if has_cr:
+        tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            for b in iter(lambda: src.read(CHUNK), b""):
+                dst.write(b.replace(b"\r", b""))
+        shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    return ascii_ok
+
+def walk_files(root="."):
+    for d, dirs, files in os.walk(root):
+        dirs[:] = sorted(x for x in dirs if x != ".git")
+        for name in sorted(files):
+            p = Path(d) / name
+            if p.is_file() and not p.is_symlink():
+                yield p
+
+def validate(paths, root=".", jobs=None):
+    """Normalize and check `paths` in a thread pool; returns the non-ASCII ones, in input order."""
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=jobs or min(32, (os.cpu_count() or 1) * 2)) as ex:
+        ok = list(ex.map(check_file, paths))
+    root = Path(root)
+    for p, good in zip(paths, ok):
+        rel = p.relative_to(root).as_posix() if p.is_relative_to(root) else p.as_posix()
+        if good and EXECUTABLE.fullmatch(rel):
+            p.chmod(0o755)
+    return [p for p, good in zip(paths, ok) if not good]
+
+def ingest(stream, root=".", normalize_all=False, jobs=None):
+    """Split or file a dump read from a binary stream, then validate; returns (written, bad)."""
+    with tempfile.TemporaryFile() as spool:
+        split, written = split_dump(stream, root, spool)
+        if not split:
+            written = [file_dump(spool, root)]
+    bad = validate(walk_files(root) if normalize_all else written, root, jobs)
+    return written, bad
+
+def main():
+    ap = argparse.ArgumentParser(description="Ingest a code dump from stdin: split '# path:' sections or file it by classification")
+    ap.add_argument("--root", default=".", help="tree the dump is written into (default: cwd)")
+    ap.add_argument("--normalize-all", action="store_true", help="strip CR and check ASCII in every file under --root, not just the ones written")
+    ap.add_argument("--jobs", type=int, default=None, help="validation threads")
+    args = ap.parse_args()
+    os.umask(0o022)
+    try:
+        written, bad = ingest(sys.stdin.buffer, Path(args.root), args.normalize_all, args.jobs)
+    except IngestError as e:
+        sys.exit(f"ERROR: {e}")
+    for p in bad:
+        print(f"Non-ASCII in {p}", file=sys.stderr)
+    if bad:
+        sys.exit(1)
+    print(f"OK: dump ingested ({len(written)} file(s)).")
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,156 @@
 # tools/make_snapshot.py
-import csv, sys, argparse
+import csv, sys, argparse, itertools
 from pathlib import Path
 
-def load_square_matrix(path: str, expect_nodes: list[str] | None):
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tools import telemetry
+from tools.field_format import preferred_field, read_field
+
+def _floats(cells):
+    try:
+        return list(map(float, cells))
+    except Exception:
+        out = []
+        for x in cells:
+            try:
+                out.append(float(x))
+            except Exception:
+                out.append(0.0)
+        return out
+
+def _alloc(n, mmap_path):
+    if mmap_path:
+        return np.lib.format.open_memmap(mmap_path, mode="w+", dtype=np.float64, shape=(n, n))
+    return np.zeros((n, n), dtype=np.float64)
+
+def load_square_matrix(path: str, expect_nodes: list[str] | None, mmap_path: str | None = None):
+    """Parse a headered or headerless square CSV straight into an n×n float64 array.
+
+    Rows are streamed, never held as a list. With mmap_path the array is an .npy
+    memmap on disk instead of anonymous memory.
+    """
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(f"Required CSV not found: {path}")
 
     with p.open(newline="", encoding="utf-8-sig") as f:
         rdr = csv.reader(f)
-        rows = list(rdr)
-
-    if not rows or len(rows) < 2:
-        raise ValueError(f"{path} has no data")
-
-    header = rows[0]
-
-    # Case 1: Headered CSV: first cell is "node"
-    if len(header) >= 2 and isinstance(header[0], str) and header[0].strip().lower() == "node":
-        cols = header[1:]
-
-        # If nodes were provided via CLI, enforce exact match & order
-        if expect_nodes:
-            if cols != expect_nodes:
-                raise ValueError(
-                    f"{path} header columns {cols} do not match --nodes {expect_nodes}"
-                )
-            nodes = expect_nodes
-        else:
-            nodes = cols
-
-        # Build a mapping from node -> position in header
-        col_index = {name: i for i, name in enumerate(cols)}
+        header = next(rdr, None)
+        first = next(rdr, None)
+
+        if header is None or first is None:
+            raise ValueError(f"{path} has no data")
+
+        # Case 1: Headered CSV: first cell is "node"
+        if len(header) >= 2 and isinstance(header[0], str) and header[0].strip().lower() == "node":
+            cols = header[1:]
+
+            # If nodes were provided via CLI, enforce exact match & order
+            if expect_nodes:
+                if cols != expect_nodes:
+                    raise ValueError(
+                        f"{path} header columns {cols} do not match --nodes {expect_nodes}"
+                    )
+                nodes = expect_nodes
+            else:
+                nodes = cols
+
+            n = len(nodes)
+            # label -> row (first occurrence, like list.index); a repeated column
+            # name takes the value of its last occurrence, like the old dict did
+            row_of = {}
+            for i, name in enumerate(nodes):
+                row_of.setdefault(name, i)
+            last_col = {name: k for k, name in enumerate(cols)}
+            src = np.array([last_col[name] for name in nodes], dtype=np.intp)
+            same = np.array([row_of[name] for name in nodes], dtype=np.intp)
+            D = _alloc(n, mmap_path)
+            seen = np.zeros(n, dtype=bool)
+
+            for r in itertools.chain([first], rdr):
+                if not r:
+                    continue
+                i = row_of.get(r[0])
+                if i is None:
+                    # Unknown row label; skip it (or raise). We choose to skip.
+                    continue
+                seen[i] = True
+                # short rows leave trailing columns at 0.0
+                vals = np.zeros(len(cols))
+                cells = r[1:len(cols) + 1]
+                vals[:len(cells)] = _floats(cells)
+                row = vals[src]
+                row[same == i] = 0.0
+                D[i] = row
+
+            seen_names = {nodes[i] for i in np.flatnonzero(seen)}
+            if len(seen_names) != n:
+                missing = [x for x in nodes if x not in seen_names]
+                raise ValueError(f"{path}: missing rows for nodes: {missing}")
+
+            return nodes, D
+
+        # Case 2: Headerless numeric matrix (only allowed if expect_nodes provided)
+        if not expect_nodes:
+            raise ValueError(f"{path} header must be: node,<col1>,<col2>,...")
+
+        nodes = expect_nodes
         n = len(nodes)
 
-        # Build full n×n numeric matrix in node order
-        D = [[0.0] * n for _ in range(n)]
-        seen = set()
-
-        for r in rows[1:]:
-            if not r:
-                continue
-            row_node = r[0]
-            if row_node not in nodes:
-                # Unknown row label; skip it (or raise). We choose to skip.
-                continue
-            i = nodes.index(row_node)
-            seen.add(row_node)
-
-            # Convert row cells into a dict col_name->value
-            vals = {}
-            for j_name, raw in zip(cols, r[1:]):
-                try:
-                    vals[j_name] = float(raw)
-                except Exception:
-                    vals[j_name] = 0.0
-
-            # Fill D[i][j] in nodes order; default 0 for missing
-            for j, name in enumerate(nodes):
-                if name == row_node:
-                    D[i][j] = 0.0
+        # Parse all rows as numeric and require exactly n rows of length >= n
+        D = _alloc(n, mmap_path)
+        count, short = 0, False
+        for r in itertools.chain([header, first], rdr):
+            if count < n and not short:
+                # convert first n entries to float
+                nums = _floats(r[:n])
+                if len(nums) != n:
+                    short = True
                 else:
-                    D[i][j] = float(vals.get(name, 0.0))
-
-            if len(D[i]) != n:
-                raise AssertionError("internal rectangularization failed")
-
-        if len(seen) != n:
-            missing = [x for x in nodes if x not in seen]
-            raise ValueError(f"{path}: missing rows for nodes: {missing}")
-
-        return nodes, D
-
-    # Case 2: Headerless numeric matrix (only allowed if expect_nodes provided)
-    if not expect_nodes:
-        raise ValueError(f"{path} header must be: node,<col1>,<col2>,...")
-
-    nodes = expect_nodes
-    n = len(nodes)
-
-    # Parse all rows as numeric and require exactly n rows of length >= n
-    body = rows
-    if len(body) != n:
-        raise ValueError(f"{path}: expected {n} rows, found {len(body)} (headerless mode)")
-
-    D = []
-    for r in body:
-        # convert first n entries to float
-        try:
-            nums = [float(x) for x in r[:n]]
-        except Exception:
-            nums = []
-            for x in r[:n]:
-                try:
-                    nums.append(float(x))
-                except Exception:
-                    nums.append(0.0)
-        if len(nums) != n:
+                    D[count] = nums
+            count += 1
+        # the row count is checked before row widths, as when all rows were buffered
+        if count != n:
+            raise ValueError(f"{path}: expected {n} rows, found {count} (headerless mode)")
+        if short:
             raise ValueError(f"{path}: row has insufficient columns for n={n}")
-        D.append(nums)
 
     return nodes, D
 
 def mean_phi_per_node(nodes, D):
     n = len(nodes)
     # Validate rectangular shape once (defensive)
-    for r in D:
-        if len(r) != n:
-            raise ValueError(f"matrix not rectangular: expected {n} columns, got {len(r)}")
-    out = []
-    for i in range(n):
-        # sum off-diagonal safely
-        s = 0.0
-        for j in range(n):
-            if j != i:
-                s += D[i][j]
-        out.append(s / (n - 1) if n > 1 else 0.0)
-    return out
+    if isinstance(D, np.ndarray):
+        if D.ndim != 2 or D.shape[1] != n:
+            raise ValueError(f"matrix not rectangular: expected {n} columns, got {D.shape[-1] if D.ndim else 0}")
+    else:
+        for r in D:
+            if len(r) != n:
+                raise ValueError(f"matrix not rectangular: expected {n} columns, got {len(r)}")
+        D = np.array(D, dtype=float).reshape(len(D), n)
+    out = np.zeros(n)
+    for r0 in range(0, n, 256):
+        # off-diagonal only: the zeroed diagonal adds +0.0, so the running sum
+        # matches the old left-to-right loop exactly
+        rows = np.array(D[r0:r0 + 256], dtype=float)
+        k = np.arange(len(rows))
+        rows[k, r0 + k] = 0.0
+        out[r0:r0 + len(rows)] = np.cumsum(rows, axis=1)[:, -1]
+    return (out / (n - 1)).tolist() if n > 1 else [0.0] * n
 
 def validate_square(nodes, D):
     n = len(nodes)
+    if isinstance(D, np.ndarray):
+        if D.ndim == 2 and D.shape == (n, n):
+            return
+        rows = D.shape[0] if D.ndim else 0
+        sizes = [D.shape[1] if D.ndim == 2 else 0] * rows
+        raise SystemExit(
+            f"node/matrix size mismatch: nodes={n}, "
+            f"D has {rows} rows with row lengths={sizes}"
+        )
     if len(D) != n or any(len(row) != n for row in D):
         sizes = [len(row) for row in D]
         raise SystemExit(
@@ -127,29 +158,42 @@ def validate_square(nodes, D):
             f"D has {len(D)} rows with row lengths={sizes}"
         )
 
-def parse_nodes():
-    """Parse optional --nodes argument and return a list of node names or None."""
+def load_phi(outdir: str, expect_nodes: list[str] | None):
+    """phi from the binary field when it is current, else from phi_matrix.csv."""
+    b = preferred_field(outdir)
+    if b is None:
+        return load_square_matrix(f"{outdir}/phi_matrix.csv", expect_nodes)
+    f = read_field(b)
+    if expect_nodes and f.nodes != expect_nodes:
+        raise ValueError(f"{b} nodes {f.nodes} do not match --nodes {expect_nodes}")
+    return f.nodes, f.dense()
+
+def parse_args():
     parser = argparse.ArgumentParser(description="Create snapshot from phi/kappa CSVs")
     parser.add_argument("--nodes", nargs="*", help="Explicit node order (e.g. A B C)")
-    args = parser.parse_args()
-    # Return None if not provided, otherwise a list (possibly empty)
-    return args.nodes if args.nodes else None
+    telemetry.add_arguments(parser)
+    return parser.parse_args()
 
 def main():
     try:
         # parse args, e.g. --nodes A B C
-        nodes_cli = parse_nodes()
+        args = parse_args()
+        telemetry.start("make_snapshot", args.profile)
+        # None if not provided, otherwise a list (possibly empty)
+        nodes_cli = args.nodes if args.nodes else None
 
         # Load phi/kappa; accept headered or headerless CSVs
-        nodes, D = load_square_matrix("tools/out/phi_matrix.csv", nodes_cli)
-        _, K = load_square_matrix("tools/out/kappa.csv", nodes_cli)
+        with telemetry.stage("load"):
+            nodes, D = load_phi("tools/out", nodes_cli)
+            _, K = load_square_matrix("tools/out/kappa.csv", nodes_cli)
 
         # validate shapes before further processing
-        validate_square(nodes, D)
-        validate_square(nodes, K)
+        with telemetry.stage("validate"):
+            validate_square(nodes, D)
+            validate_square(nodes, K)
 
-        # compute something simple so the script has a side-effect-free success path
-        _ = mean_phi_per_node(nodes, D)
+            # compute something simple so the script has a side-effect-free success path
+            _ = mean_phi_per_node(nodes, D)
 
         # Exit success
         return 0
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Merge the partial field files of `compute_field.py --shard K/M` runs.
+#
+# The M partials must agree on nodes, label, norm flag and backend fingerprint,
+# carry each shard index 1..M exactly once, and tile both the packed pair space
+# [0, N*(N-1)/2) and the node list (for event counts) with no gap or overlap.
+# Their payloads are sha256-verified, copied into one packed triangle and
+# written through compute_field.write_outputs, so phi_matrix.csv, phi_field.bin,
+# kappa.csv and summary.json match a single-machine run byte for byte (with
+# --cache, summary.json's phi_cache holds the shards' summed hit/miss/evicted
+# counts and the largest entry count).
+import argparse, json, sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import numpy as np
+from tools import telemetry
+from tools.compute_field import SHARD_FILE, write_outputs
+from tools.field_format import FIELD_FILE, FieldFormatError, read_field
+from tools.packed import n_pairs
+
+class MergeError(ValueError):
+    pass
+
+def shard_paths(paths):
+    """Expand directories to the shard files inside them."""
+    out = []
+    for p in map(Path, paths):
+        out += sorted(p.glob(SHARD_FILE.format(k="*", m="*"))) if p.is_dir() else [p]
+    return out
+
+def _spans(parts, key, total, what):
+    """Check that (start, count) of every part tiles [0, total) exactly."""
+    at = 0
+    for f in sorted(parts, key=key):
+        start, count = key(f)
+        if start > at:
+            raise MergeError(f"{what} {at}..{start} not covered by any shard")
+        if start < at:
+            raise MergeError(f"{f.path}: {what} {start}..{start + count} overlap another shard")
+        at = start + count
+    if at != total:
+        raise MergeError(f"{what} {at}..{total} not covered by any shard")
+
+def load_shards(paths):
+    """Read and cross-check the partial fields; returns them in shard order."""
+    if not paths:
+        raise MergeError("no shard files given")
+    parts = []
+    for p in paths:
+        try:
+            f = read_field(p, verify=True)
+        except (OSError, FieldFormatError) as e:
+            raise MergeError(str(e))
+        if "shard" not in f.header:
+            raise MergeError(f"{p}: not a compute_field --shard output")
+        parts.append(f)
+    first = parts[0]
+    for f in parts[1:]:
+        if f.nodes != first.nodes:
+            raise MergeError(f"{f.path}: node list differs from {first.path}")
+        for k in ("label", "norm", "backend", "arrays"):
+            if f.header.get(k) != first.header.get(k):
+                raise MergeError(f"{f.path}: {k} differs from {first.path}")
+    m = first.header["shard"]["of"]
+    seen = {}
+    for f in parts:
+        sh = f.header["shard"]
+        if sh["of"] != m:
+            raise MergeError(f"{f.path}: shard {sh['index']}/{sh['of']} mixed with /{m} shards")
+        if sh["index"] in seen:
+            raise MergeError(f"{f.path}: shard {sh['index']}/{m} already read from {seen[sh['index']].path}")
+        seen[sh["index"]] = f
+    missing = sorted(set(range(1, m + 1)) - set(seen))
+    if missing:
+        raise MergeError(f"missing shard(s) {', '.join(f'{k}/{m}' for k in missing)}")
+    _spans(parts, lambda f: (f.start, f.count), n_pairs(first.n), "pairs")
+    _spans(parts, lambda f: (f.header["shard"]["node_start"], f.header["shard"]["node_count"]), first.n, "nodes")
+    for f in parts:
+        if len(f.header["events"]) != f.header["shard"]["node_count"]:
+            raise MergeError(f"{f.path}: event stats for {len(f.header['events'])} nodes, expected {f.header['shard']['node_count']}")
+    return [seen[k] for k in range(1, m + 1)]
+
+def merge(paths, outdir, fmt="both"):
+    """Combine shard files into the outputs of a single compute_field run; returns the summary."""
+    with telemetry.stage("load"):
+        parts = load_shards(shard_paths(paths))
+        first = parts[0]
+        norm = bool(first.header["norm"])
+        P = n_pairs(first.n)
+        phi = np.empty(P); phin = np.zeros(P)
+        for f in parts:
+            phi[f.start:f.start + f.count] = f.array("phi")
+            if norm:
+                phin[f.start:f.start + f.count] = f.array("phi_norm")
+        ev = [e for f in parts for e in f.header["events"]]
+        stats = [f.header["phi_cache"] for f in parts if "phi_cache" in f.header]
+        cache_stats = {**{k: sum(s[k] for s in stats) for k in ("hits", "misses", "evicted")},
+                       "entries": max(s["entries"] for s in stats)} if stats else None
+    return write_outputs(outdir, first.nodes, phi, phin, ev, first.header["label"], norm, fmt, cache_stats)
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge compute_field --shard K/M partial fields into the full field outputs")
+    ap.add_argument("shards", nargs="+", help=f"shard files, or directories holding {SHARD_FILE.format(k='K', m='M')} files")
+    ap.add_argument("--outdir", default="tools/out", help="output dir for CSV/JSON")
+    ap.add_argument("--format", choices=("csv", "bin", "both"), default="both",
+                    help=f"phi matrix as phi_matrix.csv, binary {FIELD_FILE}, or both")
+    telemetry.add_arguments(ap)
+    args = ap.parse_args()
+    telemetry.start("merge_field", args.profile)
+    try:
+        summary = merge(args.shards, args.outdir, args.format)
+    except MergeError as e:
+        sys.exit(f"ERROR: {e}")
+    print(json.dumps(summary, sort_keys=True, ensure_ascii=True))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Packed strict upper triangle of a symmetric N×N matrix with a zero diagonal.
+#
+# Pair (i, j), i < j, lives at index i*(2N-i-1)//2 + (j-i-1): the same row-major
+# order as np.triu_indices(N, k=1) and as the historical `for i: for j > i` loops.
+import numpy as np
+
+ROW_BLOCK = 256
+
+def n_pairs(n):
+    return n * (n - 1) // 2
+
+def triu(n):
+    return np.triu_indices(n, k=1)
+
+def pair_range(n, lo, hi):
+    """(i, j) index arrays of packed pairs lo..hi-1, without enumerating the whole triangle."""
+    r = np.arange(n, dtype=np.int64)
+    starts = r * (2 * n - r - 1) // 2
+    k = np.arange(lo, hi, dtype=np.int64)
+    i = np.searchsorted(starts, k, side="right") - 1
+    return i, k - starts[i] + i + 1
+
+def pair_index(i, j, n):
+    i = np.asarray(i, dtype=np.int64); j = np.asarray(j, dtype=np.int64)
+    lo, hi = np.minimum(i, j), np.maximum(i, j)
+    return lo * (2 * n - lo - 1) // 2 + (hi - lo - 1)
+
+def row_block(tri, n, r0, r1):
+    """Dense rows r0..r1-1 of the symmetric matrix (diagonal 0.0) without materializing N×N."""
+    if n < 2:
+        return np.zeros((r1 - r0, n))
+    rows = np.arange(r0, r1, dtype=np.int64)[:, None]
+    cols = np.arange(n, dtype=np.int64)[None, :]
+    diag = rows == cols
+    out = np.asarray(tri)[np.where(diag, 0, pair_index(rows, cols, n))]
+    out[diag] = 0.0
+    return out
+
+def gather(tri, n, rows, cols):
+    """Dense submatrix M[rows][:, cols] (len(rows)×len(cols)) read straight from the packed pairs."""
+    r = np.asarray(rows, dtype=np.int64)[:, None]
+    c = np.asarray(cols, dtype=np.int64)[None, :]
+    diag = r == c
+    out = np.asarray(tri)[np.where(diag, 0, pair_index(r, c, n))] if n > 1 else np.zeros(diag.shape)
+    out[diag] = 0.0
+    return out
+
+def iter_rows(tri, n, block=ROW_BLOCK):
+    for r0 in range(0, n, block):
+        r1 = min(n, r0 + block)
+        yield r0, row_block(tri, n, r0, r1)
+
+def to_dense(tri, n):
+    out = np.zeros((n, n))
+    iu, ju = triu(n)
+    out[iu, ju] = out[ju, iu] = tri
+    return out
+
+def from_dense(M):
+    M = np.asarray(M, dtype=float)
+    return M[triu(M.shape[0])]
+
+def seqsum(a, block=1 << 20):
+    """Left-to-right running sum: bit-identical to a plain `for x in a: total += x` loop.
+
+    Not to builtin sum() on Python >= 3.12, which compensates float rounding.
+    """
+    a = np.asarray(a, dtype=float).ravel()
+    total = np.float64(0.0)
+    for s in range(0, a.size, block):
+        total = np.cumsum(np.concatenate(([total], a[s:s + block])))[-1]
+    return float(total)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# Pluggable phi backends for compute_field.
+#
+# InProcessBackend evaluates the horizon_ref.py metric directly (vectorized over
+# pair index arrays); ScriptBackend drives external scripts, either through a
+# pool of long-lived `--serve` workers or one subprocess per pair. All paths
+# return bit-identical values for the reference script.
+import hashlib, json, os, subprocess, sys, tempfile, threading
+from pathlib import Path
+
+import numpy as np
+
+from tools import telemetry
+
+ENV = dict(os.environ, LC_ALL="C", TZ="UTC")
+
+def sh(*args):
+    cp = subprocess.run(args, capture_output=True, text=True, env=ENV)
+    if cp.returncode != 0:
+        sys.stderr.write(cp.stderr or cp.stdout)
+        sys.exit(cp.returncode)
+    return cp.stdout
+
+def phi_between(script, a, b, norm=False):
+    cmd = [sys.executable, str(script), "phi", str(a), str(b)]
+    if norm: cmd.append("--norm")
+    out = sh(*cmd)
+    data = json.loads(out)
+    return (float(data["phi"]), float(data.get("phi_norm", 0.0)))
+
+def phi(a, b, norm=False):
+    """Reference phi for one pair; same contract as `horizon_ref.py phi A B [--norm]`."""
+    a, b = str(a), str(b)
+    seed = (sum(map(ord, (a + "|" + b))) % 101) / 10.0
+    return (seed, seed / max(1.0, len(a) + len(b)) if norm else 0.0)
+
+def phi_pairs(nodes, iu, ju, norm=False):
+    """Vectorized `phi` for pairs (nodes[iu[k]], nodes[ju[k]]); returns (raw, norm) float64 arrays."""
+    names = [str(n) for n in nodes]
+    ords = np.fromiter((sum(map(ord, s)) for s in names), dtype=np.int64, count=len(names))
+    lens = np.fromiter((len(s) for s in names), dtype=np.int64, count=len(names))
+    iu = np.asarray(iu, dtype=np.intp); ju = np.asarray(ju, dtype=np.intp)
+    # a + "|" + b: ord sums are additive, and the modulus keeps everything exact in int64
+    raw = ((ords[iu] + ords[ju] + ord("|")) % 101) / 10.0
+    if not norm:
+        return raw, np.zeros_like(raw)
+    return raw, raw / np.maximum(1.0, lens[iu] + lens[ju])
+
+class InProcessBackend:
+    name = "inprocess"
+
+    def pairs(self, nodes, iu, ju, norm=False):
+        telemetry.count("phi_evals", len(iu))
+        return phi_pairs(nodes, iu, ju, norm=norm)
+
+    def fingerprint(self):
+        return hashlib.sha256(Path(__file__).read_bytes()).digest()
+
+    def close(self):
+        pass
+
+class WorkerError(RuntimeError):
+    def __init__(self, message, returncode=1):
+        super().__init__(message)
+        self.returncode = returncode if returncode and returncode > 0 else 1
+
+class _Worker:
+    # One `script --serve` process speaking line-delimited JSON on stdin/stdout.
+    # Requests are written in windows of WINDOW lines so neither pipe can fill up
+    # while the other side is blocked.
+    WINDOW = 64
+
+    def __init__(self, script):
+        self.stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen([sys.executable, str(script), "--serve"], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, stderr=self.stderr, text=True, env=ENV)
+
+    def _fail(self, why):
+        self.proc.kill(); rc = self.proc.wait()
+        self.stderr.seek(0)
+        msg = self.stderr.read().decode("utf-8", "replace")
+        raise WorkerError(msg or f"phi worker {why}\n", rc)
+
+    def run(self, names, iu, ju, norm, raw, normv, lo, hi):
+        for w in range(lo, hi, self.WINDOW):
+            end = min(w + self.WINDOW, hi)
+            try:
+                self.proc.stdin.write("".join(
+                    json.dumps({"a": names[iu[k]], "b": names[ju[k]], "norm": norm}, ensure_ascii=True) + "\n"
+                    for k in range(w, end)))
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self._fail("exited")
+            for k in range(w, end):
+                line = self.proc.stdout.readline()
+                if not line:
+                    self._fail("exited")
+                try:
+                    data = json.loads(line)
+                    raw[k], normv[k] = float(data["phi"]), float(data.get("phi_norm", 0.0))
+                except (ValueError, KeyError, TypeError):
+                    self._fail(f"sent a malformed reply: {line.strip()!r}")
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill(); self.proc.wait()
+        self.stderr.close()
+
+class WorkerPool:
+    """Long-lived `--serve` workers (one per core by default) fed the pair list in chunks."""
+
+    def __init__(self, script, workers=None, chunk=1024):
+        self.script = Path(script).resolve()
+        self.size = max(1, workers or os.cpu_count() or 1)
+        self.chunk = chunk
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for w in self._workers:
+            w.close()
+        self._workers = []
+
+    def pairs(self, nodes, iu, ju, norm=False):
+        names = [str(n) for n in nodes]
+        total = len(iu)
+        raw = np.zeros(total); normv = np.zeros(total)
+        if total == 0:
+            return raw, normv
+        need = min(self.size, -(-total // self.chunk))
+        while len(self._workers) < need:
+            self._workers.append(_Worker(self.script))
+        # Results land at their pair index, so output order never depends on scheduling.
+        chunks = iter(range(0, total, self.chunk))
+        lock = threading.Lock()
+        errors = []
+
+        def drive(worker):
+            while not errors:
+                with lock:
+                    lo = next(chunks, None)
+                if lo is None:
+                    return
+                try:
+                    worker.run(names, iu, ju, norm, raw, normv, lo, min(lo + self.chunk, total))
+                except WorkerError as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=drive, args=(w,)) for w in self._workers[:need]]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        if errors:
+            raise errors[0]
+        return raw, normv
+
+class ScriptBackend:
+    name = "script"
+
+    def __init__(self, script, workers=None):
+        self.script = Path(script).resolve()
+        # workers == 0 keeps the legacy one-interpreter-per-pair contract
+        self.pool = WorkerPool(self.script, workers) if workers != 0 else None
+
+    def fingerprint(self):
+        return hashlib.sha256(self.script.read_bytes()).digest()
+
+    def close(self):
+        if self.pool: self.pool.close()
+
+    def pairs(self, nodes, iu, ju, norm=False):
+        telemetry.count("phi_evals", len(iu))
+        if self.pool:
+            try:
+                return self.pool.pairs(nodes, iu, ju, norm=norm)
+            except WorkerError as e:
+                self.pool.close()
+                sys.stderr.write(str(e))
+                sys.exit(e.returncode)
+        raw = np.zeros(len(iu)); normv = np.zeros(len(iu))
+        for k, (i, j) in enumerate(zip(iu, ju)):
+            raw[k], normv[k] = phi_between(self.script, nodes[i], nodes[j], norm=norm)
+        return raw, normv
+
+def get_backend(script=None, workers=None):
+    """In-process reference backend by default; an explicit script selects the subprocess backend."""
+    return ScriptBackend(script, workers=workers) if script else InProcessBackend()
+
+def phi_matrix(nodes, norm=False, backend=None):
+    """Evaluate the whole i<j upper triangle in one call; returns symmetric (phi, phi_norm) N×N arrays."""
+    backend = backend or InProcessBackend()
+    n = len(nodes)
+    iu, ju = np.triu_indices(n, k=1)
+    raw, normv = backend.pairs(nodes, iu, ju, norm=norm)
+    phi_m = np.zeros((n, n)); phin_m = np.zeros((n, n))
+    phi_m[iu, ju] = phi_m[ju, iu] = raw
+    phin_m[iu, ju] = phin_m[ju, iu] = normv
+    return phi_m, phin_m
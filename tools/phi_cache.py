@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# Content-addressed on-disk cache of per-pair phi values.
+#
+# Key = sha256(backend fingerprint, node A digest, node B digest, norm flag), where
+# a node digest covers its path (the reference metric is path-dependent) plus the
+# sha256 of charter.json and events.jsonl. Those file hashes are kept in a
+# StatCache next to the table and trusted while (size, mtime_ns, inode) match, so
+# an all-hit run stats the node files instead of reading them. Entries are
+# evicted least-recently-used once the table grows past max_entries.
+import hashlib, sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from tools import telemetry
+from tools.stat_cache import StatCache
+
+DEFAULT_PATH = ".seventh_horizon/cache/phi.sqlite"
+DEFAULT_MAX_ENTRIES = 1_000_000
+NODE_FILES = ("charter.json", "events.jsonl")
+_BATCH = 900  # stay under SQLITE_MAX_VARIABLE_NUMBER on old builds
+
+def _file_sha(p, files=None):
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return None
+    key = p.resolve()
+    hit = files.fresh(key, st) if files else None
+    if hit:
+        return hit["sha256"]
+    h = hashlib.sha256()
+    with p.open("rb") as f:
+        for b in iter(lambda: f.read(1 << 20), b""):
+            h.update(b); telemetry.count("bytes_hashed", len(b))
+    if files:
+        files.put(key, st, sha256=h.hexdigest())
+    return h.hexdigest()
+
+def node_digest(node, files=None):
+    """Digest of a node's path and files; `files` is a StatCache of file hashes to reuse."""
+    h = hashlib.sha256(str(node).encode("utf-8", "surrogateescape"))
+    for name in NODE_FILES:
+        sha = _file_sha(Path(node) / name, files)
+        h.update(b"\0" + name.encode("ascii") + b"\0" + (sha.encode("ascii") if sha else b"-"))
+    return h.digest()
+
+def pair_key(fingerprint, da, db, norm):
+    return hashlib.sha256(fingerprint + da + db + (b"\1" if norm else b"\0")).digest()
+
+class PhiCache:
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.files = StatCache(self.path.with_name(self.path.name + ".files.json"))
+        self.hits = self.misses = self.evicted = 0
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("CREATE TABLE IF NOT EXISTS phi (key BLOB PRIMARY KEY, phi REAL, phi_norm REAL, used INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS phi_used ON phi(used)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v INTEGER)")
+        row = self.db.execute("SELECT v FROM meta WHERE k='clock'").fetchone()
+        # one logical tick per run: everything touched in this run shares a recency
+        self.clock = (row[0] if row else 0) + 1
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('clock', ?)", (self.clock,))
+
+    def get_many(self, keys):
+        found = {}
+        for s in range(0, len(keys), _BATCH):
+            part = keys[s:s + _BATCH]
+            q = ",".join("?" * len(part))
+            for k, a, b in self.db.execute(f"SELECT key, phi, phi_norm FROM phi WHERE key IN ({q})", part):
+                found[k] = (a, b)
+            self.db.execute(f"UPDATE phi SET used=? WHERE key IN ({q})", (self.clock, *part))
+        self.hits += len(found)
+        telemetry.count("cache_hits", len(found))
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        self.db.executemany("INSERT OR REPLACE INTO phi VALUES (?, ?, ?, ?)",
+                            ((k, float(a), float(b), self.clock) for k, (a, b) in items))
+
+    def entries(self):
+        return self.db.execute("SELECT COUNT(*) FROM phi").fetchone()[0]
+
+    def evict(self):
+        extra = self.entries() - self.max_entries
+        if extra > 0:
+            self.db.execute("DELETE FROM phi WHERE key IN (SELECT key FROM phi ORDER BY used ASC LIMIT ?)", (extra,))
+            self.evicted += extra
+
+    def stats(self):
+        entries = self.entries() if self.db else self._entries
+        return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted, "entries": entries}
+
+    def close(self):
+        if not self.db:
+            return
+        self.evict()
+        self._entries = self.entries()
+        self.db.commit()
+        self.files.save()
+        self.db.close()
+        self.db = None
+
+class CachedBackend:
+    """Wraps any phi backend; only pairs missing from the cache reach the inner backend."""
+
+    def __init__(self, backend, cache):
+        self.backend, self.cache = backend, cache
+        self.name = f"cached:{backend.name}"
+
+    def close(self):
+        self.backend.close()
+        self.cache.close()
+
+    def pairs(self, nodes, iu, ju, norm=False):
+        fp = self.backend.fingerprint()
+        digests = [node_digest(n, self.cache.files) for n in nodes]
+        iu = np.asarray(iu, dtype=np.intp); ju = np.asarray(ju, dtype=np.intp)
+        keys = [pair_key(fp, digests[i], digests[j], norm) for i, j in zip(iu.tolist(), ju.tolist())]
+        found = self.cache.get_many(keys)
+        raw = np.zeros(len(keys)); normv = np.zeros(len(keys))
+        miss = []
+        for k, key in enumerate(keys):
+            hit = found.get(key)
+            if hit is None:
+                miss.append(k)
+            else:
+                raw[k], normv[k] = hit
+        if miss:
+            m = np.asarray(miss, dtype=np.intp)
+            r, nv = self.backend.pairs(nodes, iu[m], ju[m], norm=norm)
+            raw[m], normv[m] = r, nv
+            self.cache.put_many((keys[k], (raw[k], normv[k])) for k in miss)
+        return raw, normv
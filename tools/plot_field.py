@@ -1,50 +1,134 @@
 #!/usr/bin/env python3
-import os, csv, glob, json, tempfile
-os.environ["LC_ALL"]="C"; os.environ["TZ"]="UTC"
-os.environ["MPLCONFIGDIR"]=tempfile.mkdtemp(prefix="mplcfg_")
-
-import matplotlib
-matplotlib.use("Agg")
-matplotlib.rcParams["path.simplify"] = False
-matplotlib.rcParams["figure.autolayout"] = False
-matplotlib.rcParams["font.family"] = ["DejaVu Sans"]
-
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse, csv, glob, hashlib, json, os, sys, tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tools import telemetry
+from tools.field_format import preferred_field, read_field
+from tools.stat_cache import CACHE_DIR
 
 OUT = Path("tools/out")
-OUT.mkdir(parents=True, exist_ok=True)
+CACHE_PATH = CACHE_DIR / "plot_field.json"
+LARGE_N = 300      # auto heatmap mode: block-aggregate above this many nodes
+HEATMAP_PX = 512   # bins per side of a block-aggregated heatmap
+# this script plus the modules its renderers import; any change invalidates the cached figures
+SOURCES = [Path(__file__).resolve().parent / f for f in ("plot_field.py", "heatmap.py", "packed.py", "embedding.py")]
 
-def _save(fig, path):
+def _mpl():
+    # deterministic backend/fonts/metadata; imported lazily so cache hits never load matplotlib
+    os.environ["LC_ALL"]="C"; os.environ["TZ"]="UTC"
+    if "MPLCONFIGDIR" not in os.environ:  # setdefault would create a temp dir on every call
+        os.environ["MPLCONFIGDIR"] = tempfile.mkdtemp(prefix="mplcfg_")
+    import matplotlib
+    matplotlib.use("Agg")
+    matplotlib.rcParams["path.simplify"] = False
+    matplotlib.rcParams["figure.autolayout"] = False
+    matplotlib.rcParams["font.family"] = ["DejaVu Sans"]
+    import matplotlib.pyplot as plt
+    return plt
+
+def _save(plt, fig, path):
     fig.savefig(path, dpi=120, metadata={"Software": "HorizonPlot/1"}, bbox_inches=None)
     plt.close(fig)
 
-# φ heatmap
-with (OUT / "phi_matrix.csv").open() as f:
-    r = list(csv.reader(f))
-nodes, data = r[0][1:], np.array([[float(x) for x in row[1:]] for row in r[1:]])
-fig, ax = plt.subplots()
-im = ax.imshow(data, cmap="viridis")
-ax.set_xticks(range(len(nodes))); ax.set_yticks(range(len(nodes)))
-ax.set_xticklabels(nodes, rotation=90); ax.set_yticklabels(nodes)
-ax.set_title("Pairwise Drift φ"); fig.colorbar(im, ax=ax)
-fig.tight_layout(); _save(fig, OUT / "phi_heatmap.png")
-
-# κ bar chart
-kappa, nodes2 = [], []
-with (OUT / "kappa.csv").open() as f:
-    next(f)
-    for row in csv.reader(f):
-        nodes2.append(row[0]); kappa.append(float(row[1]))
-fig, ax = plt.subplots()
-ax.bar(nodes2, kappa)
-ax.set_title("Curvature κ per Node"); ax.set_ylabel("κ"); ax.set_xlabel("Node")
-fig.tight_layout(); _save(fig, OUT / "kappa_bar.png")
-
-# Φ over time
-summaries = sorted(glob.glob(str(OUT / "summary*.json")))
-if summaries:
+def heatmap_inputs(outdir):
+    return [preferred_field(outdir) or outdir / "phi_matrix.csv"]
+
+def _packed_phi(outdir):
+    """(nodes, packed φ) from the binary field if present, else from the CSV's upper triangle."""
+    import numpy as np
+    from tools.packed import from_dense
+    _field = preferred_field(outdir)
+    if _field:
+        _f = read_field(_field)
+        return _f.nodes, _f.array("phi")
+    with (outdir / "phi_matrix.csv").open() as f:
+        r = csv.reader(f)
+        nodes = next(r)[1:]
+        return nodes, from_dense(np.array([[float(x) for x in row[1:]] for row in r]))
+
+def render_heatmap(outdir, mode="auto", agg="mean", order="none", px=HEATMAP_PX):
+    # φ heatmap; large fields are block-aggregated onto a px×px grid without per-node ticks
+    import numpy as np
+    plt = _mpl()
+    _field = preferred_field(outdir)
+    if _field:
+        n = len(read_field(_field).nodes)
+    else:
+        with (outdir / "phi_matrix.csv").open() as f:
+            n = len(next(csv.reader(f))) - 1
+    if mode == "large" or (mode == "auto" and n > LARGE_N):
+        from tools.heatmap import block_reduce, node_order
+        nodes, tri = _packed_phi(outdir)
+        img = block_reduce(tri, n, px, node_order(tri, n, order), agg)
+        fig, ax = plt.subplots()
+        im = ax.imshow(img, cmap="viridis", interpolation="nearest", extent=(0, n, n, 0))
+        ax.set_xlabel("node" if order == "none" else f"node ({order} order)")
+        ax.set_title(f"Pairwise Drift φ (N={n}, block {agg})"); fig.colorbar(im, ax=ax)
+        fig.tight_layout(); _save(plt, fig, outdir / "phi_heatmap.png")
+        return
+    if _field:
+        _f = read_field(_field); nodes, data = _f.nodes, _f.dense()
+    else:
+        with (outdir / "phi_matrix.csv").open() as f:
+            r = list(csv.reader(f))
+        nodes, data = r[0][1:], np.array([[float(x) for x in row[1:]] for row in r[1:]])
+    fig, ax = plt.subplots()
+    im = ax.imshow(data, cmap="viridis")
+    ax.set_xticks(range(len(nodes))); ax.set_yticks(range(len(nodes)))
+    ax.set_xticklabels(nodes, rotation=90); ax.set_yticklabels(nodes)
+    ax.set_title("Pairwise Drift φ"); fig.colorbar(im, ax=ax)
+    fig.tight_layout(); _save(plt, fig, outdir / "phi_heatmap.png")
+
+def write_tiles(outdir, tiles_dir, agg="mean", order="none", tile=None, max_px=None):
+    """φ tile pyramid for the dashboard: <z>/<ty>_<tx>.png per level, nodes.json, tiles.json last."""
+    from tools.heatmap import MAX_PX, TILE, node_order, pyramid, tiles
+    _mpl()
+    from matplotlib.image import imsave
+    tile, max_px = tile or TILE, max_px or MAX_PX
+    nodes, tri = _packed_phi(Path(outdir))
+    n = len(nodes)
+    perm = node_order(tri, n, order)
+    levels = pyramid(tri, n, perm, agg, tile, max_px)
+    vmin, vmax = min(float(l.min()) for l in levels), max(float(l.max()) for l in levels)
+    tiles_dir = Path(tiles_dir)
+    for z, img in enumerate(levels):
+        (tiles_dir / str(z)).mkdir(parents=True, exist_ok=True)
+        for ty, tx, block in tiles(img, tile):
+            imsave(tiles_dir / str(z) / f"{ty}_{tx}.png", block, vmin=vmin, vmax=vmax, cmap="viridis",
+                   metadata={"Software": "HorizonPlot/1"})
+    ordered = nodes if perm is None else [nodes[i] for i in perm.tolist()]
+    (tiles_dir / "nodes.json").write_text(json.dumps(ordered, ensure_ascii=True) + "\n", encoding="ascii")
+    manifest = {"version": 1, "n": n, "tile": tile, "agg": agg, "order": order, "vmin": vmin, "vmax": vmax,
+                "cmap": "viridis", "nodes": "nodes.json",
+                "levels": [{"z": z, "size": int(img.shape[0]), "tiles": -(-int(img.shape[0]) // tile)}
+                           for z, img in enumerate(levels)]}
+    (tiles_dir / "tiles.json").write_text(json.dumps(manifest, sort_keys=True, ensure_ascii=True) + "\n", encoding="ascii")
+    return manifest
+
+def kappa_inputs(outdir):
+    return [outdir / "kappa.csv"]
+
+def render_kappa(outdir):
+    # κ bar chart
+    plt = _mpl()
+    kappa, nodes2 = [], []
+    with (outdir / "kappa.csv").open() as f:
+        next(f)
+        for row in csv.reader(f):
+            nodes2.append(row[0]); kappa.append(float(row[1]))
+    fig, ax = plt.subplots()
+    ax.bar(nodes2, kappa)
+    ax.set_title("Curvature κ per Node"); ax.set_ylabel("κ"); ax.set_xlabel("Node")
+    fig.tight_layout(); _save(plt, fig, outdir / "kappa_bar.png")
+
+def trend_inputs(outdir):
+    return [Path(s) for s in sorted(glob.glob(str(outdir / "summary*.json")))]
+
+def render_trend(outdir):
+    # Φ over time
+    plt = _mpl()
+    summaries = trend_inputs(outdir)
     labels, Phi = [], []
     for s in summaries:
         d = json.load(open(s))
@@ -55,4 +139,103 @@ if summaries:
     ax.set_xticks(range(len(Phi))); ax.set_xticklabels(labels, rotation=45, ha="right")
     ax.set_ylabel("Φ"); ax.set_xlabel("Snapshot")
     ax.set_title("Global Drift Φ over Time")
-    fig.tight_layout(); _save(fig, OUT / "phi_trend.png")
+    fig.tight_layout(); _save(plt, fig, outdir / "phi_trend.png")
+
+# name -> (inputs, render, output); a figure with no inputs is skipped
+FIGURES = {
+    "heatmap": (heatmap_inputs, render_heatmap, "phi_heatmap.png"),
+    "kappa": (kappa_inputs, render_kappa, "kappa_bar.png"),
+    "trend": (trend_inputs, render_trend, "phi_trend.png"),
+}
+
+def _sha_file(p):
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for b in iter(lambda: f.read(1 << 20), b""):
+            h.update(b); telemetry.count("bytes_hashed", len(b))
+    return h.hexdigest()
+
+def input_key(name, outdir, opts=None):
+    """Hash of the figure name, its options, the SOURCES and every input file's name and bytes; None if no inputs."""
+    paths = FIGURES[name][0](outdir)
+    if not paths:
+        return None
+    h = hashlib.sha256(f"{name}\n".encode())
+    for p in SOURCES:
+        h.update(f"{p.name}\n{_sha_file(p)}\n".encode())
+    if opts:
+        h.update(f"{json.dumps(opts, sort_keys=True)}\n".encode())
+    for p in paths:
+        h.update(f"{Path(p).name}\n{_sha_file(p)}\n".encode())
+    return h.hexdigest()
+
+def _load_cache(path):
+    try:
+        return json.loads(Path(path).read_text(encoding="ascii"))
+    except (OSError, ValueError):
+        return {}
+
+def _render(name, outdir, opts=None):
+    FIGURES[name][1](outdir, **(opts or {}))
+    return _sha_file(outdir / FIGURES[name][2])
+
+def plot(outdir=OUT, only=None, force=False, jobs=None, cache_path=CACHE_PATH, options=None):
+    """Render the selected figures whose inputs changed; returns {name: "rendered"|"cached"|"skipped"}.
+
+    `options` maps a figure name to keyword arguments of its renderer (e.g. heatmap mode/agg/order/px).
+    """
+    outdir = Path(outdir)
+    options = options or {}
+    outdir.mkdir(parents=True, exist_ok=True)
+    cache = {} if force else _load_cache(cache_path)
+    status, todo = {}, {}
+    for name in only or FIGURES:
+        key = input_key(name, outdir, options.get(name))
+        png = outdir / FIGURES[name][2]
+        hit = cache.get(f"{outdir.resolve()}:{name}")
+        if key is None:
+            status[name] = "skipped"
+        elif hit and hit["key"] == key and png.exists() and _sha_file(png) == hit["png"]:
+            status[name] = "cached"
+            telemetry.count("cache_hits")
+        else:
+            todo[name] = key
+    if len(todo) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=min(len(todo), jobs or os.cpu_count() or 1)) as ex:
+            shas = dict(zip(todo, ex.map(_render, todo, [outdir] * len(todo), [options.get(k) for k in todo])))
+    else:
+        shas = {name: _render(name, outdir, options.get(name)) for name in todo}
+    for name, key in todo.items():
+        cache[f"{outdir.resolve()}:{name}"] = {"key": key, "png": shas[name]}
+        status[name] = "rendered"
+    if todo and cache_path:
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(cache_path).write_text(json.dumps(cache, sort_keys=True, ensure_ascii=True) + "\n", encoding="ascii")
+    return status
+
+def main():
+    ap = argparse.ArgumentParser(description="Render phi/kappa/trend figures into tools/out")
+    ap.add_argument("--only", nargs="+", choices=list(FIGURES), help="render just these figures")
+    ap.add_argument("--outdir", default=str(OUT))
+    ap.add_argument("--force", action="store_true", help="ignore the render cache")
+    ap.add_argument("--jobs", type=int, default=None, help="process pool size (1 = render in-process)")
+    ap.add_argument("--heatmap-mode", choices=("auto", "full", "large"), default="auto",
+                    help=f"large = block-aggregated, no per-node ticks (auto: above {LARGE_N} nodes)")
+    ap.add_argument("--agg", choices=("mean", "max"), default="mean", help="block aggregation for large heatmaps/tiles")
+    ap.add_argument("--order", choices=("none", "mds", "cluster"), default="none", help="node order for large heatmaps/tiles")
+    ap.add_argument("--px", type=int, default=HEATMAP_PX, help="bins per side of a large heatmap")
+    ap.add_argument("--tiles", metavar="DIR", help="also write a φ tile pyramid for the dashboard (e.g. tools/out/phi_tiles)")
+    telemetry.add_arguments(ap)
+    args = ap.parse_args()
+    telemetry.start("plot_field", args.profile)
+    heatmap = {"mode": args.heatmap_mode, "agg": args.agg, "order": args.order, "px": args.px}
+    with telemetry.stage("figures"):
+        status = plot(args.outdir, args.only, args.force, args.jobs, options={"heatmap": heatmap})
+    print(" ".join(f"{k}={v}" for k, v in status.items()))
+    if args.tiles:
+        with telemetry.stage("tiles"):
+            m = write_tiles(args.outdir, args.tiles, args.agg, args.order)
+        print(f"tiles: {len(m['levels'])} level(s) → {args.tiles}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# Small JSON-backed cache of per-file facts keyed by path and guarded by stat().
+#
+# An entry is only trusted while the file's (size, mtime_ns, inode) still match
+# what was recorded; callers store whatever derived data they need alongside.
+import json, os
+from pathlib import Path
+
+from tools import telemetry
+
+CACHE_DIR = Path(".seventh_horizon/cache")
+
+def stat_key(st):
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+
+class StatCache:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.dirty = False
+        try:
+            self.entries = json.loads(self.path.read_text(encoding="ascii"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(str(key))
+
+    def fresh(self, key, st):
+        e = self.get(key)
+        if e and all(e.get(k) == v for k, v in stat_key(st).items()):
+            telemetry.count("cache_hits")
+            return e
+        return None
+
+    def put(self, key, st, **data):
+        self.entries[str(key)] = {**stat_key(st), **data}
+        self.dirty = True
+
+    def set(self, key, entry):
+        if self.entries.get(str(key)) != entry:
+            self.entries[str(key)] = entry
+            self.dirty = True
+
+    def drop(self, key):
+        if self.entries.pop(str(key), None) is not None:
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + f".tmp{os.getpid()}")
+        tmp.write_text(json.dumps(self.entries, sort_keys=True, ensure_ascii=True) + "\n", encoding="ascii")
+        os.replace(tmp, self.path)
+        self.dirty = False
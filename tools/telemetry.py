@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# Stage timers, counters and peak memory for the tools/* entry points.
+#
+# An entry point calls start(tool, args.profile) once after parsing its arguments
+# and wraps its phases in `with stage(name):`; library code bumps counters with
+# count("phi_evals" | "cache_hits" | "bytes_hashed", n) whether or not a session
+# is active. Each stage becomes one row of the current run's telemetry.csv (wall
+# and CPU seconds including waited-for children, peak RSS during the stage, and
+# the counters bumped meanwhile), plus a "total" row for the whole process; the
+# rows are appended once, at exit, so a failing stage is still recorded (with
+# status=error in Tags).
+#
+# The current run is .seventh_horizon/runs/$EPOCH_ID (else $TAG), the same lookup
+# dump_run uses; outside an existing run directory nothing is written. Rows carry
+# the dashboard's columns (RunID, UTC, Tags, CWD, GitBranch, GitCommit, Python)
+# filled from the run's metadata.env, with space-separated key=value Tags because
+# the dashboard splits lines on every comma. A telemetry.csv with another header
+# gets rows mapped onto its columns.
+#
+# --profile also runs each outermost stage under cProfile and writes
+# <run>/profile/<tool>.<pid>.<seq>.<stage>.prof and a .txt summary by cumulative
+# time (.seventh_horizon/cache/profile/ outside a run).
+import atexit, collections, contextlib, csv, io, os, platform, re, resource, sys, threading, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RUNS = ROOT / ".seventh_horizon" / "runs"
+PROFILE_FALLBACK = ROOT / ".seventh_horizon" / "cache" / "profile"
+CSV_NAME = "telemetry.csv"
+HEADER = ["RunID", "UTC", "Tags", "CWD", "GitBranch", "GitCommit", "Python",
+          "Tool", "Stage", "WallSec", "CPUSec", "PeakRSSMB", "Counters"]
+PROFILE_LINES = 40
+
+COUNTERS = collections.Counter()
+_lock = threading.Lock()
+_session = None
+_hwm_before_reset = 0.0
+
+def count(name, n=1):
+    with _lock:
+        COUNTERS[name] += n
+
+def _own_peak_mb():
+    # VmHWM rather than ru_maxrss: on Linux ru_maxrss carries the parent's peak across fork/exec
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            return next(int(l.split()[1]) for l in f if l.startswith("VmHWM:")) / 1024
+    except (OSError, StopIteration):
+        # no procfs (macOS): ru_maxrss, which is in bytes there
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return own / (1 << 20 if sys.platform == "darwin" else 1024)
+
+def _children_peak_mb():
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1024)
+
+def peak_rss_mb():
+    """High-water RSS of this process and its waited-for children (pool workers), in MiB.
+
+    Not lowered by the per-stage resets below.
+    """
+    return max(_own_peak_mb(), _hwm_before_reset, _children_peak_mb())
+
+def _reset_peak():
+    # Linux resets VmHWM to the current RSS; elsewhere a stage reports the peak so far
+    global _hwm_before_reset
+    _hwm_before_reset = max(_hwm_before_reset, _own_peak_mb())
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _cpu():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+def current_run():
+    """The current run directory, or None."""
+    run_id = os.environ.get("EPOCH_ID") or os.environ.get("TAG")
+    p = RUNS / run_id if run_id else None
+    return p if p and p.is_dir() else None
+
+def _metadata(run_dir):
+    meta = {}
+    try:
+        for line in (run_dir / "metadata.env").read_text(encoding="utf-8", errors="replace").splitlines():
+            k, sep, v = line.partition("=")
+            if sep:
+                meta[k.strip()] = v.strip()
+    except OSError:
+        pass
+    return meta
+
+def _utc(t):
+    return datetime.fromtimestamp(t, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _field(s):
+    return re.sub(r"[,\r\n]+", " ", str(s)).strip()
+
+class _Frame:
+    def __init__(self, name):
+        self.name, self.error, self.child_peak = name, False, 0.0
+        self.utc, self.t0, self.cpu0 = time.time(), time.perf_counter(), _cpu()
+        self.children0 = _children_peak_mb()
+        with _lock:
+            self.counters0 = COUNTERS.copy()
+
+    def finish(self):
+        wall, cpu = time.perf_counter() - self.t0, _cpu() - self.cpu0
+        # the children's figure is a maximum over all of them, so it only speaks for this stage if it grew
+        children = _children_peak_mb()
+        peak = max(_own_peak_mb(), children if children > self.children0 else 0.0, self.child_peak)
+        with _lock:
+            delta = {k: v - self.counters0.get(k, 0) for k, v in COUNTERS.items() if v != self.counters0.get(k, 0)}
+        return {"name": self.name, "utc": self.utc, "wall": wall, "cpu": cpu,
+                "peak": peak, "counters": delta, "error": self.error}
+
+class Session:
+    def __init__(self, tool, run_dir=None, profile=False):
+        self.tool, self.run_dir, self.profile = tool, run_dir, profile
+        self.rows, self.stack, self.seq, self.profiling = [], [], 0, False
+        self.total = _Frame("total")
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        # the enclosing frame keeps the high-water mark so far before this stage resets it
+        outer = self.stack[-1] if self.stack else self.total
+        outer.child_peak = max(outer.child_peak, _own_peak_mb())
+        _reset_peak()
+        frame = _Frame(name)
+        self.stack.append(frame)
+        prof = None
+        if self.profile and not self.profiling:
+            import cProfile
+            prof, self.profiling = cProfile.Profile(), True
+            prof.enable()
+        try:
+            yield frame
+        except BaseException as e:
+            frame.error = not (isinstance(e, SystemExit) and e.code in (0, None))
+            raise
+        finally:
+            if prof:
+                prof.disable()
+                self.profiling = False
+                self._dump_profile(prof, name)
+            self.stack.pop()
+            row = frame.finish()
+            outer.child_peak = max(outer.child_peak, row["peak"])
+            self.total.error = self.total.error or row["error"]
+            self.rows.append(row)
+
+    def _dump_profile(self, prof, name):
+        import pstats
+        d = (self.run_dir / "profile") if self.run_dir else PROFILE_FALLBACK
+        d.mkdir(parents=True, exist_ok=True)
+        self.seq += 1
+        base = d / f"{self.tool}.{os.getpid()}.{self.seq:02d}.{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}"
+        prof.dump_stats(f"{base}.prof")
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        Path(f"{base}.txt").write_text(out.getvalue(), encoding="utf-8")
+
+    def records(self):
+        """Finished stage rows plus the total row, as dicts keyed by HEADER."""
+        meta = _metadata(self.run_dir) if self.run_dir else {}
+        run_id = self.run_dir.name if self.run_dir else ""
+        base_tags = " ".join(_field(meta.get("tags", "")).split())
+        python = meta.get("python") or f"Python {platform.python_version()}"
+        out = []
+        for r in [*self.rows, self.total.finish()]:
+            tags = [base_tags, f"tool={self.tool}", f"stage={r['name']}"] + (["status=error"] if r["error"] else [])
+            out.append({
+                "RunID": run_id, "UTC": _utc(r["utc"]), "Tags": " ".join(t for t in tags if t),
+                "CWD": _field(os.getcwd()), "GitBranch": _field(meta.get("git_branch", "")),
+                "GitCommit": _field(meta.get("git_commit", "")), "Python": _field(python),
+                "Tool": self.tool, "Stage": _field(r["name"]), "WallSec": f"{r['wall']:.6f}",
+                "CPUSec": f"{r['cpu']:.6f}", "PeakRSSMB": f"{r['peak']:.1f}",
+                "Counters": " ".join(f"{k}={v}" for k, v in sorted(r["counters"].items())),
+            })
+        return out
+
+    def close(self):
+        if self.run_dir:
+            append_rows(self.run_dir / CSV_NAME, self.records())
+
+def append_rows(path, rows):
+    """Append rows to a telemetry CSV in one write, creating it with HEADER if needed."""
+    path = Path(path)
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            fields = next(csv.reader(f), None)
+    except OSError:
+        fields = None
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=fields or HEADER, extrasaction="ignore", restval="", lineterminator="\n")
+    if not fields:
+        w.writeheader()
+    w.writerows(rows)
+    # one O_APPEND write per process, so concurrent tools in a run do not interleave rows
+    with open(path, "ab", buffering=0) as f:
+        f.write(buf.getvalue().encode("utf-8"))
+
+def add_arguments(ap):
+    ap.add_argument("--profile", action="store_true",
+                    help="write cProfile stats for each stage to the run's profile/ directory")
+
+def start(tool, profile=False, run_dir=None):
+    """Begin this process's telemetry session; rows are written at exit."""
+    global _session
+    run_dir = Path(run_dir) if run_dir else current_run()
+    _close()
+    _session = Session(tool, run_dir, profile)
+    return _session
+
+def _close():
+    global _session
+    s, _session = _session, None
+    if s:
+        try:
+            s.close()
+        except OSError as e:
+            print(f"warning: telemetry not written: {e}", file=sys.stderr)
+
+def stage(name):
+    """Time a stage of the active session; a no-op context outside one."""
+    return _session.stage(name) if _session else contextlib.nullcontext()
+
+atexit.register(_close)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# Columnar, append-only store of per-tag timeline values next to timeline.index.json.
+#
+#   public/field/timeline.store/
+#     header.json      tags, snapshot_sha256s, node universe, column specs, generation
+#     <column>.<G>.bin one little-endian row per tag, in index order, for generation G
+#                      (generation 0 is plain <column>.bin):
+#                      Phi, Phi_norm            float64 scalars
+#                      kappa, mean_phi          float64 x nodes (NaN where a tag lacks the node)
+#                      event_counts             int64 x nodes (-1 where a tag lacks the node)
+#
+# Rows are appended and header.json is replaced last, so a reader that sizes its
+# memmaps from the header never sees a half-written row. Anything that would
+# change bytes a published header already covers -- a tag whose snapshot changed
+# or a tag inserted before existing ones (truncate back to that row and rebuild
+# from there), a new node (widen the per-node columns), --rebuild -- writes the
+# columns of a new generation instead and publishes them with the header's one
+# os.replace; the previous generation's files are removed afterwards. Readers
+# map every column when they open the store, so they keep a consistent snapshot.
+import argparse, json, os, sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import numpy as np
+from tools import telemetry
+
+FIELD = Path("public/field")
+STORE = FIELD / "timeline.store"
+VERSION = 1
+SCALARS = {"Phi": "<f8", "Phi_norm": "<f8"}
+PER_NODE = {"kappa": "<f8", "mean_phi": "<f8", "event_counts": "<i8"}
+MISSING = {"<f8": np.nan, "<i8": -1}
+OPEN_RETRIES = 5
+
+class StoreError(ValueError):
+    pass
+
+def _empty_header():
+    return {"version": VERSION, "tags": [], "sha256": [], "nodes": [],
+            "columns": {**{k: {"dtype": v, "per_node": False} for k, v in SCALARS.items()},
+                        **{k: {"dtype": v, "per_node": True} for k, v in PER_NODE.items()}}}
+
+def _read_header(store: Path):
+    try:
+        h = json.loads((store / "header.json").read_text(encoding="ascii"))
+    except (OSError, ValueError):
+        return None
+    return h if h.get("version") == VERSION else None
+
+def _col_path(store: Path, name, gen):
+    return store / (f"{name}.bin" if not gen else f"{name}.{gen}.bin")
+
+def _write_header(store: Path, header):
+    tmp = store / f"header.json.tmp{os.getpid()}"
+    tmp.write_text(json.dumps(header, sort_keys=True, ensure_ascii=True) + "\n", encoding="ascii")
+    os.replace(tmp, store / "header.json")
+
+class TimelineStore:
+    """Read-only view; columns are np.memmap arrays shaped (tags,) or (tags, nodes)."""
+
+    def __init__(self, store=STORE):
+        self.path = Path(store)
+        # a writer may publish a new generation and unlink the old one between
+        # reading the header and opening its files: read the header again
+        for _ in range(OPEN_RETRIES):
+            self.header = _read_header(self.path)
+            if self.header is None:
+                raise StoreError(f"{self.path}: no timeline store")
+            try:
+                self._cols = {name: self._map(name, spec) for name, spec in self.header["columns"].items()}
+                break
+            except FileNotFoundError:
+                continue
+        else:
+            raise StoreError(f"{self.path}: store kept changing while opening it")
+        self.tags, self.nodes = self.header["tags"], self.header["nodes"]
+        self._col = {n: k for k, n in enumerate(self.nodes)}
+        self._row = {t: k for k, t in enumerate(self.tags)}
+
+    def _map(self, name, spec):
+        h = self.header
+        shape = (len(h["tags"]), len(h["nodes"])) if spec["per_node"] else (len(h["tags"]),)
+        if not shape[0] or not np.prod(shape):
+            return np.zeros(shape, dtype=spec["dtype"])
+        return np.memmap(_col_path(self.path, name, h.get("generation", 0)), dtype=spec["dtype"], mode="r", shape=shape)
+
+    def column(self, name):
+        return self._cols[name]
+
+    def series(self, name, node=None):
+        """One column over all tags; per-node columns need `node` and return a strided view."""
+        col = self.column(name)
+        if col.ndim == 1:
+            return col
+        if node not in self._col:
+            raise KeyError(node)
+        return col[:, self._col[node]]
+
+    def row(self, tag):
+        k = self._row[tag]
+        return {name: (self.column(name)[k] if not spec["per_node"] else
+                       dict(zip(self.nodes, self.column(name)[k].tolist())))
+                for name, spec in self.header["columns"].items()}
+
+def _row_values(snap, nodes, name, dtype):
+    vals = snap.get(name) or {}
+    fill = MISSING[dtype]
+    return np.array([fill if vals.get(n) is None else vals[n] for n in nodes], dtype=dtype)
+
+def _scalar(snap, name):
+    v = snap.get(name)
+    return np.nan if v is None else float(v)
+
+def _next_generation(store: Path, header, keep, nodes):
+    """Write the first `keep` rows of every column, widened to `nodes`, as a new generation."""
+    gen, old, rows = header.get("generation", 0), header["nodes"], len(header["tags"])
+    new_gen = gen + 1
+    col = {n: k for k, n in enumerate(nodes)}
+    idx = [col[n] for n in old]
+    for name, dtype in SCALARS.items():
+        out = np.fromfile(_col_path(store, name, gen), dtype=dtype, count=keep) if keep else np.empty(0, dtype)
+        out.tofile(_col_path(store, name, new_gen))
+    for name, dtype in PER_NODE.items():
+        out = np.full((keep, len(nodes)), MISSING[dtype], dtype=dtype)
+        if keep and old:
+            out[:, idx] = np.fromfile(_col_path(store, name, gen), dtype=dtype,
+                                      count=rows * len(old)).reshape(rows, len(old))[:keep]
+        out.tofile(_col_path(store, name, new_gen))
+    header["generation"], header["nodes"] = new_gen, nodes
+
+def _drop_other_generations(store: Path, gen):
+    keep = {_col_path(store, name, gen).name for name in [*SCALARS, *PER_NODE]}
+    for name in [*SCALARS, *PER_NODE]:
+        for p in store.glob(f"{name}.*bin"):
+            if p.name not in keep:
+                try:
+                    p.unlink()
+                except OSError:
+                    pass  # still mapped (Windows); the next update retries
+
+def update_store(field=FIELD, store=None, rebuild=False):
+    """Bring the store in line with timeline.index.json; returns the number of rows (re)written."""
+    field = Path(field)
+    store = Path(store) if store else field / "timeline.store"
+    index = json.loads((field / "timeline.index.json").read_text(encoding="ascii"))
+    entries = index.get("tags") or []
+    store.mkdir(parents=True, exist_ok=True)
+    current = _read_header(store)
+    header = current if current and not rebuild else {**_empty_header(), "generation": (current or {}).get("generation", 0)}
+    # keep the longest prefix whose (tag, sha) still matches the index
+    keep = 0
+    for (t, s), e in zip(zip(header["tags"], header["sha256"]), entries):
+        if (t, s) != (e["tag"], e["snapshot_sha256"]):
+            break
+        keep += 1
+    todo = entries[keep:]
+    snaps = [json.loads((field / "timeline" / f"{e['tag']}.json").read_text(encoding="ascii")) for e in todo]
+    new = sorted(set().union(*(s.get("nodes") or [] for s in snaps)) - set(header["nodes"]))
+    rewrite = header is not current or keep < len(header["tags"]) or bool(new)
+    if rewrite:
+        _next_generation(store, header, keep, sorted(header["nodes"] + new))
+    else:
+        # only drops bytes past the header left by an interrupted append
+        gen, width = header.get("generation", 0), len(header["nodes"])
+        for name in SCALARS:
+            os.truncate(_col_path(store, name, gen), keep * 8)
+        for name in PER_NODE:
+            os.truncate(_col_path(store, name, gen), keep * width * 8)
+    gen, nodes = header.get("generation", 0), header["nodes"]
+    header["tags"], header["sha256"] = header["tags"][:keep], header["sha256"][:keep]
+    if todo:
+        for name in SCALARS:
+            with _col_path(store, name, gen).open("ab") as f:
+                np.array([_scalar(s, name) for s in snaps], dtype=SCALARS[name]).tofile(f)
+        for name, dtype in PER_NODE.items():
+            with _col_path(store, name, gen).open("ab") as f:
+                np.stack([_row_values(s, nodes, name, dtype) for s in snaps]).tofile(f)
+        header["tags"] += [e["tag"] for e in todo]
+        header["sha256"] += [e["snapshot_sha256"] for e in todo]
+    _write_header(store, header)
+    if rewrite:
+        _drop_other_generations(store, gen)
+    return len(todo)
+
+def main():
+    ap = argparse.ArgumentParser(description="Update or query the columnar timeline store")
+    ap.add_argument("--rebuild", action="store_true", help="rewrite the store from scratch")
+    ap.add_argument("--series", nargs="+", metavar=("COLUMN", "NODE"), help="print one column over all tags")
+    telemetry.add_arguments(ap)
+    args = ap.parse_args()
+    telemetry.start("timeline_store", args.profile)
+    if args.series:
+        with telemetry.stage("series"):
+            st = TimelineStore(STORE)
+            vals = st.series(args.series[0], args.series[1] if len(args.series) > 1 else None)
+        print(json.dumps({"tags": st.tags, args.series[0]: [None if v != v else v for v in vals.tolist()]}, ensure_ascii=True))
+        return
+    with telemetry.stage("update"):
+        n = update_store(FIELD, STORE, rebuild=args.rebuild)
+    print(f"{STORE}: {n} row(s) written")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,93 @@
 #!/usr/bin/env python3
-import json, os, re, sys, hashlib, subprocess
+import argparse, json, os, re, sys, hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import sys, pathlib
-sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import numpy as np
+from tools import telemetry
 from tools.constants import EPS
+from tools.field_format import read_header, snapshot_matrix
+from tools.stat_cache import CACHE_DIR
 
 FIELD_DIR = Path("public/field/timeline")
+VERIFIED = CACHE_DIR / "timeline_verified.json"
 
 def err(msg):
     print(f"ERROR: {msg}", file=sys.stderr); sys.exit(1)
 
-def main():
+def matrix_error(D, n):
+    """First phi_matrix problem in the order the old row-by-row loop reported it, or None."""
+    diag = np.abs(np.diagonal(D)) > EPS
+    upper = np.triu(np.ones((n, n), dtype=bool), 1)
+    neg = ((D < 0.0) | (D.T < 0.0)) & upper
+    asym = (D != D.T) & upper
+    bad = neg | asym
+    rows = np.flatnonzero(diag | bad.any(axis=1))
+    if not len(rows):
+        return None
+    i = int(rows[0])
+    if diag[i]:
+        return f"phi_matrix diagonal non-zero at ({i},{i})"
+    j = int(np.flatnonzero(bad[i])[0])
+    if neg[i, j]:
+        return f"negative phi at ({i},{j}) or ({j},{i})"
+    return f"asymmetry phi[{i},{j}]={float(D[i, j])} vs phi[{j},{i}]={float(D[j, i])}"
+
+def snapshot_key(file_sha: str, ref=None) -> str:
+    """sha256 of the snapshot file, plus the name and payload sha of a referenced phi_field."""
+    if not ref:
+        return file_sha
+    try:
+        field_sha = read_header(FIELD_DIR / ref)["sha256"]
+    except (OSError, ValueError):
+        field_sha = "?"
+    return f"{file_sha}+{ref}:{field_sha}"
+
+def still_verified(file_sha: str, verified_key) -> bool:
+    """Whether `verified_key` holds for a snapshot file with this sha; reads only a referenced field's header."""
+    if not isinstance(verified_key, str):
+        return False
+    sha, plus, rest = verified_key.partition("+")
+    if sha != file_sha:
+        return False
+    return not plus or snapshot_key(file_sha, rest.rpartition(":")[0]) == verified_key
+
+def check_snapshot(tag, verified_key=None):
+    """Validate one snapshot; returns (key, error message or None).
+
+    A snapshot whose bytes (and referenced phi_field payload) still match
+    `verified_key` is neither decoded nor parsed.
+    """
+    snap_path = FIELD_DIR / f"{tag}.json"
+    raw = snap_path.read_bytes()
+    file_sha = hashlib.sha256(raw).hexdigest()
+    telemetry.count("bytes_hashed", len(raw))
+    if still_verified(file_sha, verified_key):
+        return verified_key, None
+    snap = json.loads(raw.decode("ascii"))
+    ref = snap.get("phi_field") if isinstance(snap, dict) else None
+    key = snapshot_key(file_sha, ref if isinstance(ref, str) else None)
+    if snap.get("tag") != tag:
+        return key, f"{snap_path}: tag mismatch"
+    nodes = snap.get("nodes") or []
+    try:
+        D = snapshot_matrix(snap, FIELD_DIR)
+    except (OSError, ValueError) as e:
+        return key, f"{snap_path}: {e}"
+    if not nodes or not len(D) or len(D) != len(nodes) or any(len(row)!=len(nodes) for row in D):
+        return key, f"{snap_path}: phi_matrix shape mismatch with nodes"
+    try:
+        D = np.asarray(D, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        return key, f"{snap_path}: non-numeric phi_matrix: {e}"
+    msg = matrix_error(D, len(nodes))
+    return key, (f"{snap_path}: {msg}" if msg else None)
+
+def _check_job(args):
+    return check_snapshot(*args)
+
+def check_index():
+    """Index-level checks: tag order and uniqueness, snapshot files present, chain_root."""
     idxp = Path("public/field/timeline.index.json")
     if not idxp.exists():
         err("timeline.index.json not found")
@@ -51,27 +128,53 @@ def main():
     chain = hashlib.sha256("\n".join(entry["snapshot_sha256"] for entry in tags).encode("ascii")).hexdigest()
     if chain != idx.get("chain_root"):
         err("chain_root mismatch")
+    return indexed
 
-    for tag in indexed:
-        snap_path = FIELD_DIR / f"{tag}.json"
-        snap = json.loads(snap_path.read_text(encoding="ascii"))
-        if snap.get("tag") != tag:
-            err(f"{snap_path}: tag mismatch")
-        nodes = snap.get("nodes") or []
-        D = snap.get("phi_matrix") or []
-        if not nodes or not D or len(D) != len(nodes) or any(len(row)!=len(nodes) for row in D):
-            err(f"{snap_path}: phi_matrix shape mismatch with nodes")
-        n = len(nodes)
-        for i in range(n):
-            if abs(float(D[i][i])) > EPS:
-                err(f"{snap_path}: phi_matrix diagonal non-zero at ({i},{i})")
-            for j in range(i+1, n):
-                a = float(D[i][j]); b = float(D[j][i])
-                if a < 0.0 or b < 0.0:
-                    err(f"{snap_path}: negative phi at ({i},{j}) or ({j},{i})")
-                if a != b:
-                    err(f"{snap_path}: asymmetry phi[{i},{j}]={a} vs phi[{j},{i}]={b}")
+def check_snapshots(indexed, jobs=None, verified_path=None):
+    """Check every indexed snapshot (in a process pool unless jobs == 1); exits on the first failure."""
+    verified_path = Path(verified_path) if verified_path else None
+    verified = {}
+    if verified_path:
+        try:
+            verified = json.loads(verified_path.read_text(encoding="ascii"))
+        except (OSError, ValueError):
+            verified = {}
+    jobs = min(jobs or os.cpu_count() or 1, len(indexed))
+    work = [(tag, verified.get(tag)) for tag in indexed]
+    ex = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    # results come back in index order, so the first error reported is the same as a sequential run's
+    results = ex.map(_check_job, work, chunksize=max(1, len(work) // (4 * jobs))) if ex else map(_check_job, work)
+    failure = None
+    try:
+        for tag, (key, msg) in zip(indexed, results):
+            if msg:
+                failure = msg
+                break
+            if verified.get(tag) == key:
+                telemetry.count("cache_hits")
+            verified[tag] = key
+    finally:
+        if ex:
+            ex.shutdown(cancel_futures=True)
+    if verified_path:
+        keep = {t: verified[t] for t in indexed if t in verified}
+        verified_path.parent.mkdir(parents=True, exist_ok=True)
+        verified_path.write_text(json.dumps(keep, sort_keys=True, ensure_ascii=True)+"\n", encoding="ascii")
+    if failure:
+        err(failure)
 
+def main():
+    ap = argparse.ArgumentParser(description="Validate public/field/timeline against its index")
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes for snapshot checks (default: cores; 1 = in-process)")
+    ap.add_argument("--verified", nargs="?", const=str(VERIFIED), default=None, metavar="PATH",
+                    help=f"skip snapshots whose (tag, sha256) were already verified, recording new ones in PATH (default {VERIFIED})")
+    telemetry.add_arguments(ap)
+    args = ap.parse_args()
+    telemetry.start("validate_timeline", args.profile)
+    with telemetry.stage("index"):
+        indexed = check_index()
+    with telemetry.stage("snapshots"):
+        check_snapshots(indexed, args.jobs, args.verified)
     print("TIMELINE VALIDATION: ALL GREEN")
 
 if __name__ == "__main__":